@@ -0,0 +1,197 @@
+"""
+Compares bdecode with the previous decoder, which used a function call for
+every value, on large multi-file torrents and resume files.
+Lazy decoding only checks the structure and is included for comparison.
+
+It also times decoding, modifying and encoding again, where lazy decoding
+copies the parts that were not modified as they are, and the same with
+the info dict of a torrent kept as Bencached by the eager decoder.
+
+Usage: python benchmarks/bench_bencode.py [number of files]
+
+libtc must be importable, e.g. installed with pip install -e .
+"""
+
+import os
+import sys
+import timeit
+
+from libtc.bencode import bdecode, bencode
+
+
+def legacy_decode_int(x, f):
+    f += 1
+    newf = x.find(b"e", f)
+    n = int(x[f:newf])
+    return (n, newf + 1)
+
+
+def legacy_decode_string(x, f):
+    colon = x.find(b":", f)
+    n = int(x[f:colon])
+    colon += 1
+    return (x[colon : colon + n], colon + n)
+
+
+def legacy_decode_list(x, f):
+    r, f = [], f + 1
+    while x[f] != 101:
+        v, f = legacy_decode_func[x[f]](x, f)
+        r.append(v)
+    return (r, f + 1)
+
+
+def legacy_decode_dict(x, f):
+    r, f = {}, f + 1
+    while x[f] != 101:
+        k, f = legacy_decode_string(x, f)
+        r[k], f = legacy_decode_func[x[f]](x, f)
+    return (r, f + 1)
+
+
+legacy_decode_func = {
+    108: legacy_decode_list,
+    100: legacy_decode_dict,
+    105: legacy_decode_int,
+}
+for i in range(48, 59):
+    legacy_decode_func[i] = legacy_decode_string
+
+
+def legacy_bdecode(x):
+    return legacy_decode_func[x[0]](x, 0)[0]
+
+
+def create_torrent(num_files):
+    files = [
+        {
+            b"length": 1000000 + i,
+            b"path": [b"Season %02d" % (i // 100), b"Some.Show.S01E%05d.mkv" % i],
+        }
+        for i in range(num_files)
+    ]
+    num_pieces = sum(f[b"length"] for f in files) // 2**20 + 1
+    return {
+        b"announce": b"https://tracker.example.com/announce",
+        b"creation date": 1590000000,
+        b"info": {
+            b"name": b"Some.Show.Complete",
+            b"piece length": 2**20,
+            b"pieces": os.urandom(20 * num_pieces),
+            b"files": files,
+        },
+    }
+
+
+def create_qbittorrent_fastresume(num_files):
+    return {
+        b"file-format": b"libtorrent resume file",
+        b"file-version": 1,
+        b"info-hash": os.urandom(20),
+        b"file_priority": [1] * num_files,
+        b"mapped_files": [
+            b"Some.Show.Complete/Some.Show.S01E%05d.mkv" % i for i in range(num_files)
+        ],
+        b"pieces": b"\x01" * num_files,
+        b"peers": os.urandom(6 * 200),
+        b"trackers": [[b"https://tracker.example.com/announce"]],
+        b"qBt-category": b"tv",
+        b"qBt-savePath": b"/downloads/",
+        b"total_uploaded": 123456789,
+    }
+
+
+def create_rtorrent_resume(num_files):
+    return {
+        b"libtorrent_resume": {
+            b"bitfield": num_files,
+            b"files": [
+                {b"completed": 2, b"mtime": 1590000000 + i, b"priority": 1}
+                for i in range(num_files)
+            ],
+            b"trackers": {b"https://tracker.example.com/announce": {b"enabled": 1}},
+        },
+        b"rtorrent": {
+            b"custom1": b"tv",
+            b"directory": b"/downloads/Some.Show.Complete",
+            b"state": 1,
+            b"total_uploaded": 123456789,
+        },
+    }
+
+
+def add_resume_data(torrent, info=None):
+    """Adds resume data to a torrent the same way RTorrentClient.add does."""
+    info = info or torrent[b"info"]
+    torrent[b"libtorrent_resume"] = {
+        b"files": [
+            {b"completed": 1, b"mtime": 1590000000, b"priority": 1}
+            for _ in info[b"files"]
+        ],
+        b"bitfield": len(info[b"pieces"]) // 20,
+    }
+    return torrent
+
+
+def add_resume_data_bencached(torrent):
+    """Reads the info dict kept as Bencached, it is encoded without changes."""
+    return add_resume_data(torrent, bdecode(torrent[b"info"].bencoded))
+
+
+def change_directory(session):
+    session[b"rtorrent"][b"directory"] = b"/new/downloads/Some.Show.Complete"
+    return session
+
+
+def bench(name, data, func, number=5):
+    duration = min(timeit.repeat(lambda: func(data), number=number, repeat=5))
+    duration /= number
+    print(
+        f"{name:<40} {duration * 1000:10.1f} ms"
+        f" {len(data) / duration / 1024 / 1024:8.1f} MiB/s"
+    )
+
+
+def main():
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{num_files} files")
+    for name, obj in [
+        ("torrent", create_torrent(num_files)),
+        ("qbittorrent fastresume", create_qbittorrent_fastresume(num_files)),
+        ("rtorrent resume", create_rtorrent_resume(num_files)),
+    ]:
+        data = bencode(obj)
+        assert bdecode(data) == legacy_bdecode(data) == obj
+        bench(f"{name} legacy", data, legacy_bdecode)
+        bench(f"{name} bdecode", data, bdecode)
+        bench(f"{name} bdecode lazy", data, lambda x: bdecode(x, lazy=True))
+
+    print("Decode, modify and encode")
+    for name, obj, modify in [
+        ("torrent add resume data", create_torrent(num_files), add_resume_data),
+        ("rtorrent resume move", create_rtorrent_resume(num_files), change_directory),
+    ]:
+        data = bencode(obj)
+        assert bencode(modify(bdecode(data))) == bencode(
+            modify(bdecode(data, lazy=True))
+        )
+        bench(f"{name}", data, lambda x: bencode(modify(bdecode(x))))
+        bench(
+            f"{name} lazy",
+            data,
+            lambda x: bencode(modify(bdecode(x, lazy=True))),
+        )
+
+    data = bencode(create_torrent(num_files))
+    assert bencode(add_resume_data(bdecode(data))) == bencode(
+        add_resume_data_bencached(bdecode(data, bencached=[b"info"]))
+    )
+    bench(
+        "torrent add resume data bencached info",
+        data,
+        lambda x: bencode(add_resume_data_bencached(bdecode(x, bencached=[b"info"]))),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compares building the rTorrent fast resume bitfield with the previous
+per-piece loop on a large synthetic torrent where every tenth file is missing.
+
+Usage: python benchmarks/bench_bitfield.py [number of pieces]
+
+libtc must be importable, e.g. installed with pip install -e .
+"""
+
+import sys
+import timeit
+
+from libtc.clients.rtorrent import bitfield_to_string, build_bitfield
+
+
+def legacy_build_bitfield(piece_length, pieces, files):
+    bitfield = [True] * pieces
+    current_position = 0
+    for size, exists in files:
+        last_position = current_position + size
+        first_piece = current_position // piece_length
+        last_piece = (last_position + piece_length - 1) // piece_length
+        for piece in range(first_piece, last_piece):
+            bitfield[piece] *= exists
+        current_position = last_position
+    return bitfield
+
+
+def legacy_bitfield_to_string(bitfield):
+    retval = bytearray((len(bitfield) + 7) // 8)
+    for piece, bit in enumerate(bitfield):
+        if bit:
+            retval[piece // 8] |= 1 << (7 - piece % 8)
+    return bytes(retval)
+
+
+def bench(name, func, number=5):
+    duration = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{name:<40} {duration * 1000:10.2f} ms")
+
+
+def main():
+    pieces = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    piece_length = 2**18
+    num_files = max(pieces // 50, 1)
+    file_size = pieces * piece_length // num_files - 12345
+    files = [(file_size, i % 10 != 0) for i in range(num_files)]
+    pieces = (file_size * num_files + piece_length - 1) // piece_length
+    print(f"{pieces} pieces, {num_files} files")
+
+    legacy = legacy_bitfield_to_string(
+        legacy_build_bitfield(piece_length, pieces, files)
+    )
+    assert bitfield_to_string(build_bitfield(piece_length, pieces, files)) == legacy
+
+    bench(
+        "legacy",
+        lambda: legacy_bitfield_to_string(
+            legacy_build_bitfield(piece_length, pieces, files)
+        ),
+        number=1,
+    )
+    bench(
+        "build_bitfield",
+        lambda: bitfield_to_string(build_bitfield(piece_length, pieces, files)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Compares move_files with the previous version, which walked the parent
+folders of every file, on wide and deep trees of empty files.
+Everything is renamed within the same filesystem, so the time is spent on
+creating folders and checking paths.
+
+Usage: python benchmarks/bench_move_files.py [number of files]
+
+libtc must be importable, e.g. installed with pip install -e .
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from libtc.torrent import TorrentFile
+from libtc.utils import move_files
+
+
+def legacy_move_files(source_path, target_path, files, preserve_parent_folder=False):
+    source_path = Path(source_path)
+    target_path = Path(target_path)
+
+    if not target_path.exists():
+        target_path.mkdir()
+        shutil.copystat(source_path, target_path)
+
+    potential_removal_folders = set()
+    if not preserve_parent_folder:
+        potential_removal_folders.add(source_path)
+
+    for f in files:
+        source_file = source_path / f.path
+        target_file = target_path / f.path
+
+        while not target_file.parent.exists():
+            source_file_parent = source_file.parent
+            target_file_parent = target_file.parent
+
+            while not (
+                target_file_parent.parent.exists() and not target_file_parent.exists()
+            ):
+                source_file_parent = source_file_parent.parent
+                target_file_parent = target_file_parent.parent
+
+            if target_path not in Path(os.path.abspath(target_file_parent)).parents:
+                raise Exception()
+            target_file_parent.mkdir()
+            shutil.copystat(source_file_parent, target_file_parent)
+
+        source_parent_folder = source_file.parent
+        while (
+            source_path in source_parent_folder.parents
+            and source_parent_folder not in potential_removal_folders
+        ):
+            potential_removal_folders.add(source_parent_folder)
+            source_parent_folder = source_parent_folder.parent
+
+        if target_path not in Path(os.path.abspath(target_file)).parents:
+            raise Exception()
+
+        source_file.rename(target_file)
+
+    potential_removal_folders = sorted(potential_removal_folders, reverse=True)
+    for folder in potential_removal_folders:
+        if not list(folder.iterdir()):
+            folder.rmdir()
+
+
+def create_wide_tree(num_files):
+    return [
+        TorrentFile(
+            f"Season {i // 1000:02}/Episode {i // 20:04}/file {i}.bin", 0, 100.0
+        )
+        for i in range(num_files)
+    ]
+
+
+def create_deep_tree(num_files):
+    return [
+        TorrentFile(
+            os.path.join(*[f"level {i // 100 % 10} {d}" for d in range(10)])
+            + f"/file {i}.bin",
+            0,
+            100.0,
+        )
+        for i in range(num_files)
+    ]
+
+
+def bench(name, files, func, number=3):
+    durations = []
+    for _ in range(number):
+        with tempfile.TemporaryDirectory() as tmp_path:
+            source_path = Path(tmp_path) / "source"
+            target_path = Path(tmp_path) / "target"
+            for f in files:
+                (source_path / f.path).parent.mkdir(parents=True, exist_ok=True)
+                (source_path / f.path).touch()
+
+            start = time.perf_counter()
+            func(source_path, target_path, files)
+            durations.append(time.perf_counter() - start)
+            assert not source_path.exists()
+            shutil.rmtree(target_path)
+    print(f"{name:<40} {min(durations) * 1000:10.1f} ms")
+
+
+def main():
+    num_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{num_files} files")
+    for name, files in [
+        ("wide tree", create_wide_tree(num_files)),
+        ("deep tree", create_deep_tree(num_files)),
+    ]:
+        bench(f"{name} legacy", files, legacy_move_files)
+        bench(f"{name} move_files", files, move_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compares reading a large SCGI reply the old way, concatenating 1024 byte chunks
+and splitting off the headers, with read_response.
+
+Usage: python benchmarks/bench_scgitransport.py [megabytes]
+
+libtc must be importable, e.g. installed with pip install -e .
+"""
+
+import socket
+import sys
+import threading
+import time
+import xmlrpc.client
+from io import BytesIO
+
+from libtc.scgitransport import SCGITransport, read_response
+
+
+def create_reply(megabytes):
+    row = [
+        "0123456789ABCDEF0123456789ABCDEF01234567",
+        "Some.Torrent.Name.2020.1080p",
+        1,
+        "",
+        1234567890,
+        1234567890,
+        987654321,
+        0,
+        0,
+        1590000000,
+        [["https://tracker.example.com/announce"]],
+        "label",
+    ]
+    row_size = len(xmlrpc.client.dumps(([row],), methodresponse=True))
+    rows = [row] * (megabytes * 1024 * 1024 // row_size)
+    body = xmlrpc.client.dumps((rows,), methodresponse=True).encode()
+    return b"Status: 200 OK\r\nContent-Type: text/xml\r\n\r\n" + body
+
+
+def send_reply(reply):
+    a, b = socket.socketpair()
+    t = threading.Thread(target=lambda: (a.sendall(reply), a.close()))
+    t.start()
+    return b, t
+
+
+def legacy_read(s):
+    response = b""
+    while True:
+        r = s.recv(1024)
+        if not r:
+            break
+        response += r
+    return BytesIO(b"\r\n\r\n".join(response.split(b"\r\n\r\n")[1:]))
+
+
+def bench(name, reply, func):
+    s, t = send_reply(reply)
+    start = time.perf_counter()
+    func(s)
+    duration = time.perf_counter() - start
+    t.join()
+    s.close()
+    print(f"{name:<32} {duration * 1000:10.1f} ms")
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    reply = create_reply(megabytes)
+    transport = SCGITransport()
+    transport.verbose = False
+    print(f"Reply size {len(reply) / 1024 / 1024:.1f} MiB")
+    bench("legacy read", reply, legacy_read)
+    bench("read_response", reply, read_response)
+    bench(
+        "legacy read + parse",
+        reply,
+        lambda s: transport.parse_response(legacy_read(s)),
+    )
+    bench(
+        "read_response + parse",
+        reply,
+        lambda s: transport.parse_body(read_response(s)[0]),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 from .bencode import BTFailure, bdecode, bencode
-from .clients import *
+from .clientgroup import ClientGroup, ClientGroupResult
+from .clients import LAZY_ATTRIBUTES, parse_libtc_url
 from .exceptions import FailedToExecuteException, LibTorrentClientException
-from .management import move_torrent
+from .management import move_torrent, move_torrents
 from .parse_clients import parse_clients_from_toml_dict
+from .placement import place_torrent
 from .torrent import *
-from .utils import TorrentProblems
+from .utils import TorrentProblems, infohash_from_bytes
 
 __version__ = "1.3.4"
 
@@ -19,13 +21,34 @@ __all__ = [
     "TorrentData",
     "TorrentState",
     "TorrentFile",
+    "TorrentChanges",
     "bencode",
     "bdecode",
     "LibTorrentClientException",
     "FailedToExecuteException",
     "move_torrent",
+    "move_torrents",
+    "place_torrent",
     "parse_libtc_url",
     "TorrentProblems",
+    "infohash_from_bytes",
     "parse_clients_from_toml_dict",
     "BTFailure",
+    "AsyncClient",
+    "AsyncRTorrentClient",
+    "make_async_client",
+    "ClientGroup",
+    "ClientGroupResult",
 ]
+
+
+def __getattr__(name):
+    if name not in LAZY_ATTRIBUTES and name != "TORRENT_CLIENT_MAPPING":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from . import clients
+
+    return getattr(clients, name)
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_ATTRIBUTES) | {"TORRENT_CLIENT_MAPPING"})
@@ -1,7 +1,6 @@
 import click
-from tabulate import tabulate
 
-from libtc import move_torrent, parse_libtc_url
+from libtc import move_torrent, move_torrents, parse_libtc_url
 
 
 @click.group()
@@ -16,11 +15,13 @@ def cli(ctx, client_url):
 @click.option("--active", is_flag=True, help="Show only active torrents")
 @click.pass_context
 def list(ctx, active):
+    from tabulate import tabulate
+
     client = ctx.obj["client"]
     if active:
-        torrents = client.list_active()
+        torrents = client.list_active(fields=["name"])
     else:
-        torrents = client.list()
+        torrents = client.list(fields=["name"])
     torrents = sorted(
         [(t.infohash, t.name) for t in torrents], key=lambda x: x[1].lower()
     )
@@ -75,5 +76,28 @@ def move(ctx, infohash, target_client_url):
     print(f"Moved {infohash}")
 
 
+@cli.command()
+@click.argument("target_client_url")
+@click.argument("infohashes", nargs=-1, required=True)
+@click.option("--concurrency", default=4, help="Torrents to move at the same time")
+@click.option("--journal", help="File to record progress in so a move can be resumed")
+@click.pass_context
+def move_many(ctx, target_client_url, infohashes, concurrency, journal):
+    source_client = ctx.obj["client"]
+    target_client = parse_libtc_url(target_client_url)
+    results = move_torrents(
+        infohashes,
+        source_client,
+        target_client,
+        concurrency=concurrency,
+        journal_path=journal,
+    )
+    for result in results:
+        if result.error:
+            print(f"{result.infohash} {result.status}: {result.error}")
+        else:
+            print(f"{result.infohash} {result.status}")
+
+
 if __name__ == "__main__":
     cli()
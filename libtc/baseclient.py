@@ -1,5 +1,9 @@
+import uuid
 from abc import ABCMeta, abstractmethod, abstractproperty
 
+from .exceptions import FailedToExecuteException
+from .torrent import TorrentChanges
+
 
 class BaseClient(metaclass=ABCMeta):
     @abstractproperty
@@ -15,17 +19,53 @@ class BaseClient(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    def list():
+    def list(fields=None):
         """
         Return a list of `TorrentData`
+
+        fields limits which `TorrentData` fields are fetched from the client,
+        the other fields are not set. infohash is always included.
         """
 
     @abstractmethod
-    def list_active():
+    def list_active(fields=None):
         """
-        Return a list of `TorrentData` with active torrents
+        Return a list of `TorrentData` with active torrents,
+        fields works as with `list`.
         """
 
+    def list_changes(self, since_token=None):
+        """
+        Return a `TorrentChanges` with the torrents added, updated and removed
+        since the call that returned since_token.
+
+        Without a token, or with a token that is no longer known,
+        every torrent is returned as added.
+
+        This implementation compares with the previous list,
+        only the latest token is remembered.
+        """
+        snapshot = {}
+        added, updated = [], []
+        previous_token, previous_snapshot = getattr(
+            self, "_list_changes_snapshot", (None, {})
+        )
+        if since_token is None or since_token != previous_token:
+            previous_snapshot = {}
+
+        for torrent in self.list():
+            values = tuple(getattr(torrent, k) for k in torrent.__slots__)
+            snapshot[torrent.infohash] = values
+            previous_values = previous_snapshot.pop(torrent.infohash, None)
+            if previous_values is None:
+                added.append(torrent)
+            elif previous_values != values:
+                updated.append(torrent)
+
+        token = uuid.uuid4().hex
+        self._list_changes_snapshot = (token, snapshot)
+        return TorrentChanges(added, updated, list(previous_snapshot), token)
+
     @abstractmethod
     def start(infohash):
         """
@@ -38,6 +78,41 @@ class BaseClient(metaclass=ABCMeta):
         Stop a torrent with a given infohash
         """
 
+    def start_many(self, infohashes):
+        """
+        Start torrents with the given infohashes.
+
+        Returns a dict of infohash and if it succeeded.
+        """
+        return self._call_many(self.start, infohashes)
+
+    def stop_many(self, infohashes):
+        """
+        Stop torrents with the given infohashes.
+
+        Returns a dict of infohash and if it succeeded.
+        """
+        return self._call_many(self.stop, infohashes)
+
+    def remove_many(self, infohashes):
+        """
+        Remove torrents with the given infohashes.
+
+        Returns a dict of infohash and if it succeeded.
+        """
+        return self._call_many(self.remove, infohashes)
+
+    def _call_many(self, func, infohashes):
+        result = {}
+        for infohash in infohashes:
+            try:
+                func(infohash)
+            except FailedToExecuteException:
+                result[infohash] = False
+            else:
+                result[infohash] = True
+        return result
+
     @abstractmethod
     def test_connection():
         """
@@ -58,10 +133,12 @@ class BaseClient(metaclass=ABCMeta):
 
         torrent: decoded torrentfile
         destination_path: path where to store the data
-        fast_resume: Try to fast-resume
+        fast_resume: Try to fast-resume, "verify" hashes the local data first
+          to only resume the pieces that match, supported by rtorrent
         add_name_to_folder: add name from torrent to the folder, only multifile torrent
         minimum_expected_data: check local data and make sure minimum is there.
-          Choices are: none, partial, full
+          Choices are: none, partial, full, verified
+          verified hashes the data and compares it with the torrent
         stopped: add torrent in stopped state
         """
 
@@ -109,3 +186,88 @@ class BaseClient(metaclass=ABCMeta):
         """
         Tries to auto-configure an instance of this client and return it.
         """
+
+
+class AsyncBaseClient(metaclass=ABCMeta):
+    """
+    The asyncio counterpart of `BaseClient`, see it for documentation of the methods.
+    """
+
+    @abstractproperty
+    def identifier():
+        pass
+
+    @abstractproperty
+    def display_name():
+        pass
+
+    @abstractmethod
+    async def list(fields=None):
+        pass
+
+    @abstractmethod
+    async def list_active(fields=None):
+        pass
+
+    @abstractmethod
+    async def list_changes(since_token=None):
+        pass
+
+    @abstractmethod
+    async def start(infohash):
+        pass
+
+    @abstractmethod
+    async def stop(infohash):
+        pass
+
+    @abstractmethod
+    async def start_many(infohashes):
+        pass
+
+    @abstractmethod
+    async def stop_many(infohashes):
+        pass
+
+    @abstractmethod
+    async def test_connection():
+        pass
+
+    @abstractmethod
+    async def add(
+        torrent,
+        destination_path,
+        fast_resume=False,
+        add_name_to_folder=True,
+        minimum_expected_data="none",
+        stopped=False,
+    ):
+        pass
+
+    @abstractmethod
+    async def remove(infohash):
+        pass
+
+    @abstractmethod
+    async def remove_many(infohashes):
+        pass
+
+    @abstractmethod
+    async def retrieve_torrentfile(infohash):
+        pass
+
+    @abstractmethod
+    async def get_download_path(infohash):
+        pass
+
+    @abstractmethod
+    async def move_torrent(infohash, destination_path):
+        pass
+
+    @abstractmethod
+    async def get_files(infohash):
+        pass
+
+    @abstractmethod
+    def serialize_configuration():
+        pass
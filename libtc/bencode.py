@@ -11,6 +11,8 @@
 # Written by Petru Paler
 # Modified to have Python 3 support by Anders Jensen
 
+from collections.abc import MutableMapping, MutableSequence, Sequence
+
 
 class BTFailure(Exception):
     pass
@@ -38,19 +40,104 @@ def decode_string(x, f):
 
 
 def decode_list(x, f):
-    r, f = [], f + 1
-    while x[f] != 101:
-        v, f = decode_func[x[f]](x, f)
-        r.append(v)
-    return (r, f + 1)
+    r = []
+    append = r.append
+    find = x.find
+    f += 1
+    c = x[f]
+    while c != 101:
+        if 48 <= c <= 57:
+            # Most strings are short, read the length without slicing
+            d = x[f + 1]
+            if d == 58:
+                start = f + 2
+                f = start + c - 48
+            elif x[f + 2] == 58 and c != 48 and 48 <= d <= 57:
+                start = f + 3
+                f = start + (c - 48) * 10 + d - 48
+            else:
+                colon = find(b":", f)
+                n = int(x[f:colon])
+                if c == 48:
+                    raise ValueError
+                start = colon + 1
+                f = start + n
+            append(x[start:f])
+        elif c == 105:
+            f += 1
+            end = find(b"e", f)
+            append(int(x[f:end]))
+            if x[f] == 45:
+                if x[f + 1] == 48:
+                    raise ValueError
+            elif x[f] == 48 and end != f + 1:
+                raise ValueError
+            f = end + 1
+        elif c == 108:
+            v, f = decode_list(x, f)
+            append(v)
+        elif c == 100:
+            v, f = decode_dict(x, f)
+            append(v)
+        else:
+            raise ValueError
+        c = x[f]
+    return r, f + 1
 
 
 def decode_dict(x, f):
-    r, f = {}, f + 1
-    while x[f] != 101:
-        k, f = decode_string(x, f)
-        r[k], f = decode_func[x[f]](x, f)
-    return (r, f + 1)
+    r = {}
+    find = x.find
+    f += 1
+    c = x[f]
+    while c != 101:
+        if x[f + 1] == 58 and 48 <= c <= 57:
+            start = f + 2
+            f = start + c - 48
+        else:
+            colon = find(b":", f)
+            n = int(x[f:colon])
+            if c == 48:
+                raise ValueError
+            start = colon + 1
+            f = start + n
+        k = x[start:f]
+        c = x[f]
+        if 48 <= c <= 57:
+            # Most strings are short, read the length without slicing
+            d = x[f + 1]
+            if d == 58:
+                start = f + 2
+                f = start + c - 48
+            elif x[f + 2] == 58 and c != 48 and 48 <= d <= 57:
+                start = f + 3
+                f = start + (c - 48) * 10 + d - 48
+            else:
+                colon = find(b":", f)
+                n = int(x[f:colon])
+                if c == 48:
+                    raise ValueError
+                start = colon + 1
+                f = start + n
+            r[k] = x[start:f]
+        elif c == 105:
+            f += 1
+            end = find(b"e", f)
+            r[k] = int(x[f:end])
+            if x[f] == 45:
+                if x[f + 1] == 48:
+                    raise ValueError
+            elif x[f] == 48 and end != f + 1:
+                raise ValueError
+            f = end + 1
+        elif c == 108:
+            r[k], f = decode_list(x, f)
+        elif c == 100:
+            r[k], f = decode_dict(x, f)
+        else:
+            raise ValueError
+        c = x[f]
+    return r, f + 1
 
 
 decode_func = {}
@@ -62,9 +149,258 @@ for i in range(48, 59):
     decode_func[i] = decode_string
 
 
-def bdecode(x):
+def skip_value(x, f):
+    """Returns where the value starting at f ends without decoding it."""
+    depth = 0
+    find = x.find
+    while True:
+        c = x[f]
+        if 48 <= c <= 57:
+            d = x[f + 1]
+            if d == 58:
+                f += 2 + c - 48
+            elif c == 48:
+                raise ValueError
+            elif x[f + 2] == 58 and 48 <= d <= 57:
+                f += 3 + (c - 48) * 10 + d - 48
+            else:
+                colon = find(b":", f)
+                if colon == -1:
+                    raise ValueError
+                f = colon + 1 + int(x[f:colon])
+        elif c == 105:
+            f = decode_int(x, f)[1]
+        elif c == 108 or c == 100:
+            depth += 1
+            f += 1
+            continue
+        elif c == 101 and depth:
+            depth -= 1
+            f += 1
+        else:
+            raise ValueError
+        if not depth:
+            return f
+
+
+# Strings of at least this size are returned as memoryviews by lazy decoding
+LAZY_MEMORYVIEW_SIZE = 1024
+
+
+def decode_lazy(x, f):
+    c = x[f]
+    if c == 100:
+        r = LazyDict(x, f)
+        return r, r._end
+    elif c == 108:
+        r = LazyList(x, f)
+        return r, r._end
+    elif c == 105:
+        return decode_int(x, f)
+    elif not 48 <= c <= 57:
+        raise ValueError
+    colon = x.find(b":", f)
+    if colon == -1:
+        raise ValueError
+    n = int(x[f:colon])
+    if c == 48 and colon != f + 1:
+        raise ValueError
+    colon += 1
+    if n >= LAZY_MEMORYVIEW_SIZE:
+        return memoryview(x)[colon : colon + n], colon + n
+    return x[colon : colon + n], colon + n
+
+
+def is_modified(x):
+    return (type(x) is LazyDict or type(x) is LazyList) and x.is_modified()
+
+
+class LazyDict(MutableMapping):
+    """
+    Dict over a bencoded dict where the values are decoded when accessed.
+
+    Nested dicts and lists are lazy too and large strings are memoryviews
+    into the original data. As long as a lazy value is not modified,
+    it is encoded by copying its original data, like `Bencached`.
+    """
+
+    __slots__ = ("_data", "_start", "_end", "_index", "_values", "_modified")
+
+    def __init__(self, data, start):
+        index = {}
+        f = start + 1
+        while data[f] != 101:
+            k, f = decode_string(data, f)
+            end = skip_value(data, f)
+            index[k] = (f, end)
+            f = end
+        self._data = data
+        self._start = start
+        self._end = f + 1
+        self._index = index
+        self._values = {}
+        self._modified = False
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        start, end = self._index[key]
+        try:
+            value = decode_lazy(self._data, start)[0]
+        except (IndexError, KeyError, ValueError):
+            raise BTFailure("not a valid bencoded string")
+        self._values[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._index.setdefault(key, None)
+        self._values[key] = value
+        self._modified = True
+
+    def __delitem__(self, key):
+        del self._index[key]
+        self._values.pop(key, None)
+        self._modified = True
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return f"LazyDict({list(self._index)!r})"
+
+    def is_modified(self):
+        """Returns if the dict, or anything in it, was changed since it was decoded."""
+        return self._modified or any(is_modified(v) for v in self._values.values())
+
+    def raw(self, key=None):
+        """
+        Returns the data the dict, or one of its values, was decoded from.
+        Changes are not included.
+        """
+        if key is None:
+            return memoryview(self._data)[self._start : self._end]
+        start, end = self._index[key]
+        return memoryview(self._data)[start:end]
+
+
+class LazyList(MutableSequence):
+    """List over a bencoded list, see `LazyDict`."""
+
+    __slots__ = ("_data", "_start", "_end", "_index", "_values", "_items")
+
+    def __init__(self, data, start):
+        index = []
+        f = start + 1
+        while data[f] != 101:
+            end = skip_value(data, f)
+            index.append((f, end))
+            f = end
+        self._data = data
+        self._start = start
+        self._end = f + 1
+        self._index = index
+        self._values = {}
+        self._items = None
+
+    def __getitem__(self, i):
+        if self._items is not None:
+            return self._items[i]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        try:
+            return self._values[i]
+        except KeyError:
+            pass
+        start, end = self._index[i]
+        try:
+            value = decode_lazy(self._data, start)[0]
+        except (IndexError, KeyError, ValueError):
+            raise BTFailure("not a valid bencoded string")
+        self._values[i] = value
+        return value
+
+    def _get_items(self):
+        """Decodes all values into a list that is changed from now on."""
+        if self._items is None:
+            self._items = [self[i] for i in range(len(self))]
+        return self._items
+
+    def __setitem__(self, i, value):
+        self._get_items()[i] = value
+
+    def __delitem__(self, i):
+        del self._get_items()[i]
+
+    def insert(self, i, value):
+        self._get_items().insert(i, value)
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        return len(self._index)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, Sequence)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"LazyList({len(self)} items)"
+
+    def is_modified(self):
+        """Returns if the list, or anything in it, was changed since it was decoded."""
+        if self._items is not None:
+            return True
+        return any(is_modified(v) for v in self._values.values())
+
+    def raw(self):
+        """Returns the data the list was decoded from, changes are not included."""
+        return memoryview(self._data)[self._start : self._end]
+
+
+def decode_dict_bencached(x, f, keys):
+    """Decodes a dict where the values of keys are kept as `Bencached`."""
+    r = {}
+    f += 1
+    while x[f] != 101:
+        k, f = decode_string(x, f)
+        if k in keys:
+            end = skip_value(x, f)
+            r[k], f = Bencached(x[f:end]), end
+        else:
+            r[k], f = decode_func[x[f]](x, f)
+    return r, f + 1
+
+
+def bdecode(x, lazy=False, bencached=None):
+    """
+    Decodes bencoded data.
+
+    With lazy, lists and dicts are returned as `LazyList` and `LazyDict` that only
+    decode values when they are accessed and large strings are returned as memoryviews
+    instead of copies. The structure is still checked when decoding.
+
+    bencached is a list of keys in the top dict whose values are not decoded
+    but returned as `Bencached` and encoded as they are, e.g. [b"info"] when
+    only the rest of a torrent is changed.
+    """
     try:
-        r, l = decode_func[x[0]](x, 0)
+        if lazy:
+            r, l = decode_lazy(x, 0)
+        elif bencached and x[0] == 100:
+            r, l = decode_dict_bencached(x, 0, set(bencached))
+        else:
+            r, l = decode_func[x[0]](x, 0)
     except (IndexError, KeyError, ValueError):
         raise BTFailure("not a valid bencoded string")
     if l != len(x):
@@ -105,6 +441,15 @@ def encode_list(x, r):
     r.append(b"e")
 
 
+def encode_lazy(x, r):
+    if not x.is_modified():
+        r.append(x.raw())
+    elif type(x) is LazyDict:
+        encode_dict(x, r)
+    else:
+        encode_list(x, r)
+
+
 def encode_dict(x, r):
     r.append(b"d")
     for k, v in sorted(x.items()):
@@ -121,6 +466,9 @@ encode_func[bytes] = encode_string
 encode_func[list] = encode_list
 encode_func[tuple] = encode_list
 encode_func[dict] = encode_dict
+encode_func[memoryview] = encode_string
+encode_func[LazyDict] = encode_lazy
+encode_func[LazyList] = encode_lazy
 
 try:
     from types import BooleanType
@@ -134,3 +482,58 @@ def bencode(x):
     r = []
     encode_func[type(x)](x, r)
     return b"".join(r)
+
+
+def iterencode_value(x, r, chunk_size):
+    t = type(x)
+    if t is dict or t is LazyDict and x.is_modified():
+        r.append(b"d")
+        for k, v in sorted(x.items()):
+            r.extend((str(len(k)).encode(), b":", k))
+            yield from iterencode_value(v, r, chunk_size)
+        r.append(b"e")
+    elif t is list or t is tuple or t is LazyList and x.is_modified():
+        r.append(b"l")
+        for v in x:
+            yield from iterencode_value(v, r, chunk_size)
+        r.append(b"e")
+    elif t is LazyDict or t is LazyList:
+        x = x.raw()
+        if len(x) >= chunk_size:
+            yield b"".join(r)
+            r.clear()
+            yield x
+        else:
+            r.append(x)
+    elif (t is bytes or t is memoryview) and len(x) >= chunk_size:
+        r.extend((str(len(x)).encode(), b":"))
+        yield b"".join(r)
+        r.clear()
+        yield x
+    else:
+        encode_func[t](x, r)
+
+    if len(r) >= 1024:
+        yield b"".join(r)
+        r.clear()
+
+
+def iterencode(x, chunk_size=65536):
+    """
+    Yields the bencoded data of x in chunks instead of joining it all together.
+
+    Strings and lazy values of at least chunk_size are yielded as they are,
+    without copying them.
+    """
+    r = []
+    for chunk in iterencode_value(x, r, chunk_size):
+        if chunk:
+            yield chunk
+    if r:
+        yield b"".join(r)
+
+
+def bencode_into(x, fileobj, chunk_size=65536):
+    """Writes the bencoded data of x to fileobj one chunk at a time."""
+    for chunk in iterencode(x, chunk_size):
+        fileobj.write(chunk)
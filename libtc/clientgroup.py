@@ -0,0 +1,140 @@
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .exceptions import FailedToExecuteException
+from .parse_clients import parse_clients_from_toml_dict
+
+
+class ClientGroupResult:
+    __slots__ = (
+        "torrents",
+        "errors",
+        "latencies",
+    )
+
+    def __init__(self, torrents, errors, latencies):
+        self.torrents = torrents
+        self.errors = errors
+        self.latencies = latencies
+
+    def __repr__(self):
+        return (
+            f"ClientGroupResult(torrents={len(self.torrents)}, errors={self.errors!r})"
+        )
+
+
+def timed_call(func, **kwargs):
+    start = time.monotonic()
+    try:
+        return func(**kwargs), None, time.monotonic() - start
+    except Exception as e:
+        return None, e, time.monotonic() - start
+
+
+class ClientGroup:
+    """
+    Queries a group of named clients concurrently.
+
+    A slow or failing client does not hold back the others, its error is returned
+    together with the torrents from the clients that did answer.
+    """
+
+    def __init__(self, clients, timeout=30, max_workers=None):
+        """
+        clients: dict of name and client, or the result of `parse_clients_from_toml_dict`
+        timeout: seconds to wait for each client, counted from when its call starts
+        max_workers: number of clients to query at the same time, defaults to all
+
+        A call that times out is left running and the client is reported as failing
+        until it is done, it is not called again in the meantime.
+        """
+        self.clients = {
+            name: client["client"] if isinstance(client, dict) else client
+            for name, client in clients.items()
+        }
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._running_calls = {}
+
+    @classmethod
+    def from_toml_dict(cls, toml_dict, **kwargs):
+        return cls(parse_clients_from_toml_dict(toml_dict), **kwargs)
+
+    def _call_all(self, method, **kwargs):
+        result = ClientGroupResult([], {}, {})
+
+        queue = deque()
+        for name in self.clients:
+            future = self._running_calls.get(name)
+            if future is not None and not future.done():
+                result.errors[name] = FailedToExecuteException(
+                    "Previous call is still running"
+                )
+            else:
+                self._running_calls.pop(name, None)
+                queue.append(name)
+        if not queue:
+            return result
+
+        # One thread per client so calls left running never hold back the queue
+        executor = ThreadPoolExecutor(max_workers=len(queue))
+        max_workers = self.max_workers or len(queue)
+        running = {}
+        try:
+            while queue or running:
+                while queue and len(running) < max_workers:
+                    name = queue.popleft()
+                    future = executor.submit(
+                        timed_call, getattr(self.clients[name], method), **kwargs
+                    )
+                    running[future] = (name, time.monotonic() + self.timeout)
+
+                next_deadline = min(deadline for _, deadline in running.values())
+                done, _ = wait(
+                    running,
+                    timeout=max(0, next_deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED,
+                )
+
+                for future in done:
+                    name, _ = running.pop(future)
+                    torrents, error, latency = future.result()
+                    result.latencies[name] = latency
+                    if error is not None:
+                        result.errors[name] = error
+                        continue
+                    for torrent in torrents:
+                        torrent.client_name = name
+                        result.torrents.append(torrent)
+
+                now = time.monotonic()
+                for future, (name, deadline) in list(running.items()):
+                    if deadline > now:
+                        continue
+                    del running[future]
+                    self._running_calls[name] = future
+                    result.latencies[name] = self.timeout
+                    result.errors[name] = FailedToExecuteException(
+                        f"Timed out after {self.timeout} seconds"
+                    )
+        finally:
+            executor.shutdown(wait=False)
+
+        return result
+
+    def list(self, fields=None):
+        """
+        Returns a `ClientGroupResult` with the `TorrentData` from all clients
+        """
+        if fields is None:
+            return self._call_all("list")
+        return self._call_all("list", fields=fields)
+
+    def list_active(self, fields=None):
+        """
+        Returns a `ClientGroupResult` with the active `TorrentData` from all clients
+        """
+        if fields is None:
+            return self._call_all("list_active")
+        return self._call_all("list_active", fields=fields)
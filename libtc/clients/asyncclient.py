@@ -0,0 +1,219 @@
+import asyncio
+import weakref
+from functools import partial
+from urllib.parse import urlsplit
+from xml.parsers.expat import ExpatError
+from xmlrpc.client import Error as XMLRPCError
+
+from ..baseclient import AsyncBaseClient
+from ..exceptions import FailedToExecuteException
+from ..scgitransport import SCGITransport
+from ..torrent import resolve_fields
+from .rtorrent import RTorrentClient, encode_request
+
+
+class AsyncClient(AsyncBaseClient):
+    """
+    Makes a client usable from asyncio by running its methods in an executor.
+
+    The executor limits how many calls can run at the same time,
+    the default executor of the event loop is used if none is given.
+    Calls to the same client run one at a time as clients are not thread-safe.
+    """
+
+    def __init__(self, client, executor=None):
+        self.client = client
+        self.executor = executor
+        self._locks = weakref.WeakKeyDictionary()
+
+    @property
+    def identifier(self):
+        return self.client.identifier
+
+    @property
+    def display_name(self):
+        return self.client.display_name
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:  # a lock belongs to the loop it was made in
+            lock = self._locks[loop] = asyncio.Lock()
+        async with lock:
+            return await loop.run_in_executor(
+                self.executor, partial(func, *args, **kwargs)
+            )
+
+    async def list(self, fields=None):
+        if fields is None:
+            return await self._run(self.client.list)
+        return await self._run(self.client.list, fields=fields)
+
+    async def list_active(self, fields=None):
+        if fields is None:
+            return await self._run(self.client.list_active)
+        return await self._run(self.client.list_active, fields=fields)
+
+    async def list_changes(self, since_token=None):
+        return await self._run(self.client.list_changes, since_token)
+
+    async def start(self, infohash):
+        return await self._run(self.client.start, infohash)
+
+    async def stop(self, infohash):
+        return await self._run(self.client.stop, infohash)
+
+    async def start_many(self, infohashes):
+        return await self._run(self.client.start_many, infohashes)
+
+    async def stop_many(self, infohashes):
+        return await self._run(self.client.stop_many, infohashes)
+
+    async def test_connection(self):
+        return await self._run(self.client.test_connection)
+
+    async def add(
+        self,
+        torrent,
+        destination_path,
+        fast_resume=False,
+        add_name_to_folder=True,
+        minimum_expected_data="none",
+        stopped=False,
+    ):
+        return await self._run(
+            self.client.add,
+            torrent,
+            destination_path,
+            fast_resume=fast_resume,
+            add_name_to_folder=add_name_to_folder,
+            minimum_expected_data=minimum_expected_data,
+            stopped=stopped,
+        )
+
+    async def remove(self, infohash):
+        return await self._run(self.client.remove, infohash)
+
+    async def remove_many(self, infohashes):
+        return await self._run(self.client.remove_many, infohashes)
+
+    async def retrieve_torrentfile(self, infohash):
+        return await self._run(self.client.retrieve_torrentfile, infohash)
+
+    async def get_download_path(self, infohash):
+        return await self._run(self.client.get_download_path, infohash)
+
+    async def move_torrent(self, infohash, destination_path):
+        return await self._run(self.client.move_torrent, infohash, destination_path)
+
+    async def get_files(self, infohash):
+        return await self._run(self.client.get_files, infohash)
+
+    def serialize_configuration(self):
+        return self.client.serialize_configuration()
+
+
+class AsyncRTorrentClient(AsyncClient):
+    """
+    Talks to rtorrent over SCGI directly with asyncio streams.
+
+    Methods that mostly work with local files, e.g. add, still run in the executor.
+    """
+
+    def __init__(self, client, executor=None):
+        super().__init__(client, executor)
+        self.transport = client.proxy("transport")
+        self.host = urlsplit(client.url).netloc
+
+    async def _call(self, method, *args):
+        try:
+            return (
+                await self.transport.async_request(
+                    self.host, "/RPC2", encode_request(method, args)
+                )
+            )[0]
+        except (XMLRPCError, ConnectionError, OSError, ExpatError):
+            raise FailedToExecuteException()
+
+    async def _fetch_list_result(self, view, fields=None):
+        fields = resolve_fields(fields)
+        commands = self.client._get_list_commands(fields)
+        request_body = encode_request("d.multicall2", ["", view] + commands)
+        result = []
+        try:
+            async for torrent in self.transport.async_stream_rows(
+                self.host, "/RPC2", request_body
+            ):
+                result.append(
+                    self.client._torrent_data_from_row(torrent, fields, commands)
+                )
+        except (XMLRPCError, ConnectionError, OSError, ExpatError):
+            raise FailedToExecuteException()
+        return result
+
+    async def list(self, fields=None):
+        return await self._fetch_list_result("main", fields)
+
+    async def list_active(self, fields=None):
+        if "spreadsheet_active" not in await self._call("view.list"):
+            await self._call("view.add", "", "spreadsheet_active")
+        await self._call(
+            "view.filter", "", "spreadsheet_active", "or={d.up.rate=,d.down.rate=}"
+        )
+        return await self._fetch_list_result("spreadsheet_active", fields)
+
+    async def start(self, infohash):
+        await self._call("d.start", infohash)
+
+    async def stop(self, infohash):
+        await self._call("d.stop", infohash)
+
+    async def remove(self, infohash):
+        await self._call("d.erase", infohash)
+
+    async def _call_many(self, method, infohashes):
+        infohashes = list(infohashes)
+        results = await self._call(
+            "system.multicall",
+            [{"methodName": method, "params": [h]} for h in infohashes],
+        )
+        return {
+            infohash: not isinstance(r, dict)
+            for infohash, r in zip(infohashes, results)
+        }
+
+    async def start_many(self, infohashes):
+        return await self._call_many("d.start", infohashes)
+
+    async def stop_many(self, infohashes):
+        return await self._call_many("d.stop", infohashes)
+
+    async def remove_many(self, infohashes):
+        return await self._call_many("d.erase", infohashes)
+
+    async def test_connection(self):
+        try:
+            return await self._call("system.pid") is not None
+        except FailedToExecuteException:
+            return False
+
+    async def get_files(self, infohash):
+        try:
+            files = await self._call(
+                "f.multicall", infohash, "", *self.client.file_commands
+            )
+        except FailedToExecuteException:
+            raise FailedToExecuteException("Failed to retrieve files")
+        return [self.client._torrent_file_from_row(f) for f in files]
+
+
+def make_async_client(client, executor=None):
+    """
+    Returns an `AsyncBaseClient` for a client,
+    natively async where possible and running in an executor otherwise.
+    """
+    if isinstance(client, RTorrentClient) and isinstance(
+        client.proxy("transport"), SCGITransport
+    ):
+        return AsyncRTorrentClient(client, executor)
+    return AsyncClient(client, executor)
@@ -12,7 +12,7 @@ from deluge_client.client import DelugeClientException
 from ..baseclient import BaseClient
 from ..bencode import bencode
 from ..exceptions import FailedToExecuteException
-from ..torrent import TorrentData, TorrentFile, TorrentState
+from ..torrent import TorrentData, TorrentFile, TorrentState, resolve_fields
 from ..utils import (
     calculate_minimum_expected_data,
     has_minimum_expected_data,
@@ -24,18 +24,21 @@ class DelugeClient(BaseClient):
     identifier = "deluge"
     display_name = "Deluge"
 
-    keys = [
-        "name",
-        "progress",
-        "state",
-        "total_size",
-        "time_added",
-        "total_uploaded",
-        "tracker_host",
-        "upload_payload_rate",
-        "download_payload_rate",
-        "label",
-    ]
+    # The deluge status keys needed for each TorrentData field
+    field_mapping = {
+        # Deluge returns every key when asked for none, so always ask for a cheap one
+        "infohash": ["hash"],
+        "name": ["name"],
+        "size": ["total_size"],
+        "state": ["state"],
+        "progress": ["progress"],
+        "uploaded": ["total_uploaded"],
+        "added": ["time_added"],
+        "tracker": ["tracker_host"],
+        "upload_rate": ["upload_payload_rate"],
+        "download_rate": ["download_payload_rate"],
+        "label": ["label"],
+    }
 
     def __init__(self, host, port, username, password, session_path=None, label=None):
         self.host = host
@@ -55,45 +58,62 @@ class DelugeClient(BaseClient):
             decode_utf8=True,
         )
 
-    def _fetch_list_result(self, filter):
-        result = []
-        try:
-            with self.client as client:
-                torrents = client.core.get_torrents_status(filter, self.keys)
-        except (DelugeClientException, ConnectionError, OSError):
-            raise FailedToExecuteException()
-        for infohash, torrent_data in torrents.items():
+    def _get_keys(self, fields):
+        keys = []
+        for field in fields:
+            keys += self.field_mapping[field]
+        return keys
+
+    def _torrent_data_from_status(self, infohash, torrent_data, fields):
+        values = {"infohash": infohash}
+        if "name" in fields:
+            values["name"] = torrent_data["name"]
+        if "size" in fields:
+            values["size"] = torrent_data["total_size"]
+        if "state" in fields:
             if torrent_data["state"] in ["Seeding", "Downloading"]:
-                state = TorrentState.ACTIVE
+                values["state"] = TorrentState.ACTIVE
             elif torrent_data["state"] in ["Error"]:
-                state = TorrentState.ERROR
+                values["state"] = TorrentState.ERROR
             else:
-                state = TorrentState.STOPPED
-
-            result.append(
-                TorrentData(
-                    infohash,
-                    torrent_data["name"],
-                    torrent_data["total_size"],
-                    state,
-                    torrent_data["progress"],
-                    torrent_data["total_uploaded"],
-                    datetime.utcfromtimestamp(torrent_data["time_added"]).astimezone(
-                        pytz.UTC
-                    ),
-                    torrent_data["tracker_host"],
-                    torrent_data["upload_payload_rate"],
-                    torrent_data["download_payload_rate"],
-                    torrent_data.get("label", ""),
+                values["state"] = TorrentState.STOPPED
+        if "progress" in fields:
+            values["progress"] = torrent_data["progress"]
+        if "uploaded" in fields:
+            values["uploaded"] = torrent_data["total_uploaded"]
+        if "added" in fields:
+            values["added"] = datetime.utcfromtimestamp(
+                torrent_data["time_added"]
+            ).astimezone(pytz.UTC)
+        if "tracker" in fields:
+            values["tracker"] = torrent_data["tracker_host"]
+        if "upload_rate" in fields:
+            values["upload_rate"] = torrent_data["upload_payload_rate"]
+        if "download_rate" in fields:
+            values["download_rate"] = torrent_data["download_payload_rate"]
+        if "label" in fields:
+            values["label"] = torrent_data.get("label", "")
+        return TorrentData.with_fields(**values)
+
+    def _fetch_list_result(self, filter, fields=None):
+        fields = resolve_fields(fields)
+        try:
+            with self.client as client:
+                torrents = client.core.get_torrents_status(
+                    filter, self._get_keys(fields)
                 )
-            )
-        return result
+        except (DelugeClientException, ConnectionError, OSError):
+            raise FailedToExecuteException()
+        return [
+            self._torrent_data_from_status(infohash, torrent_data, fields)
+            for infohash, torrent_data in torrents.items()
+        ]
 
-    def list(self):
-        return self._fetch_list_result({})
+    def list(self, fields=None):
+        return self._fetch_list_result({}, fields)
 
-    def list_active(self):
-        return self._fetch_list_result({"state": "Active"})
+    def list_active(self, fields=None):
+        return self._fetch_list_result({"state": "Active"}, fields)
 
     def start(self, infohash):
         try:
@@ -109,6 +129,44 @@ class DelugeClient(BaseClient):
         except (DelugeClientException, ConnectionError, OSError):
             raise FailedToExecuteException()
 
+    def _call_many(self, method, infohashes):
+        infohashes = list(infohashes)
+        try:
+            with self.client as client:
+                found = list(
+                    client.core.get_torrents_status(
+                        {"id": [infohash.lower() for infohash in infohashes]},
+                        ["name"],
+                    )
+                )
+                if found:
+                    getattr(client.core, method)(found)
+        except (DelugeClientException, ConnectionError, OSError):
+            raise FailedToExecuteException()
+        found = set(found)
+        return {infohash: infohash.lower() in found for infohash in infohashes}
+
+    def start_many(self, infohashes):
+        return self._call_many("resume_torrent", infohashes)
+
+    def stop_many(self, infohashes):
+        return self._call_many("pause_torrent", infohashes)
+
+    def remove_many(self, infohashes):
+        result = {}
+        try:
+            with self.client as client:
+                for infohash in infohashes:
+                    try:
+                        result[infohash] = bool(
+                            client.core.remove_torrent(infohash.lower(), False)
+                        )
+                    except DelugeClientException:
+                        result[infohash] = False
+        except (DelugeClientException, ConnectionError, OSError):
+            raise FailedToExecuteException()
+        return result
+
     def test_connection(self):
         try:
             with self.client as client:
@@ -126,12 +184,17 @@ class DelugeClient(BaseClient):
         stopped=False,
     ):
         current_expected_data = calculate_minimum_expected_data(
-            torrent, destination_path, add_name_to_folder
+            torrent,
+            destination_path,
+            add_name_to_folder,
+            verify=minimum_expected_data == "verified",
         )
         if not has_minimum_expected_data(minimum_expected_data, current_expected_data):
             raise FailedToExecuteException(
                 f"Minimum expected data not reached, wanted {minimum_expected_data} actual {current_expected_data}"
             )
+        if fast_resume == "verify":  # not supported, a normal check hashes the data
+            fast_resume = False
         destination_path = Path(os.path.abspath(destination_path))
         encoded_torrent = base64.b64encode(bencode(torrent))
         infohash = hashlib.sha1(bencode(torrent[b"info"])).hexdigest()
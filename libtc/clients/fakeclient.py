@@ -56,11 +56,11 @@ class FakeClient(BaseClient):
             }
         self._torrents = TORRENTS[seed]
 
-    def list(self):
+    def list(self, fields=None):
         touch_torrents(self._torrents["rng"], self._torrents["torrents"])
         return self._torrents["torrents"]
 
-    def list_active(self):
+    def list_active(self, fields=None):
         touch_torrents(self._torrents["rng"], self._torrents["torrents"])
         return [t for t in self._torrents["torrents"] if t.upload_rate > 0]
 
@@ -44,17 +44,20 @@ class LilTorrentClient(BaseClient):
         except RequestException:
             raise FailedToExecuteException("Unable to contact liltorrent instance")
 
-    def _fetch_list_result(self, url):
+    def _fetch_list_result(self, url, fields=None):
+        params = {}
+        if fields is not None:
+            params["fields"] = ",".join(fields)
         return [
             TorrentData.unserialize(torrent)
-            for torrent in self._call("get", url).json()
+            for torrent in self._call("get", url, params=params).json()
         ]
 
-    def list(self):
-        return self._fetch_list_result("list")
+    def list(self, fields=None):
+        return self._fetch_list_result("list", fields)
 
-    def list_active(self):
-        return self._fetch_list_result("list_active")
+    def list_active(self, fields=None):
+        return self._fetch_list_result("list_active", fields)
 
     def start(self, infohash):
         return self._call("post", "start", params={"infohash": infohash}).json()
@@ -62,6 +65,21 @@ class LilTorrentClient(BaseClient):
     def stop(self, infohash):
         return self._call("post", "stop", params={"infohash": infohash}).json()
 
+    def start_many(self, infohashes):
+        return self._call(
+            "post", "start_many", data={"infohash": list(infohashes)}
+        ).json()
+
+    def stop_many(self, infohashes):
+        return self._call(
+            "post", "stop_many", data={"infohash": list(infohashes)}
+        ).json()
+
+    def remove_many(self, infohashes):
+        return self._call(
+            "post", "remove_many", data={"infohash": list(infohashes)}
+        ).json()
+
     def test_connection(self):
         try:
             return self._call("get", "test_connection").json()
@@ -78,12 +96,14 @@ class LilTorrentClient(BaseClient):
         stopped=False,
     ):
         destination_path = rewrite_path(destination_path, self.path_mapping)
+        if fast_resume != "verify":
+            fast_resume = fast_resume and "true" or "false"
         return self._call(
             "post",
             "add",
             params={
                 "destination_path": str(destination_path),
-                "fast_resume": fast_resume and "true" or "false",
+                "fast_resume": fast_resume,
                 "add_name_to_folder": add_name_to_folder and "true" or "false",
                 "minimum_expected_data": minimum_expected_data,
                 "stopped": stopped and "true" or "false",
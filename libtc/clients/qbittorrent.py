@@ -1,4 +1,5 @@
 import json
+from collections import deque
 from pathlib import Path
 from urllib.parse import urlencode, urljoin, urlparse
 
@@ -8,7 +9,13 @@ from requests.exceptions import RequestException
 from ..baseclient import BaseClient
 from ..bencode import bdecode, bencode
 from ..exceptions import FailedToExecuteException
-from ..torrent import TorrentData, TorrentFile, TorrentState
+from ..torrent import (
+    TorrentChanges,
+    TorrentData,
+    TorrentFile,
+    TorrentState,
+    resolve_fields,
+)
 from ..utils import (
     calculate_minimum_expected_data,
     get_tracker_domain,
@@ -16,6 +23,97 @@ from ..utils import (
     move_files,
 )
 
+# Number of infohashes sent in each request by the *_many methods
+MANY_CHUNK_SIZE = 1000
+
+
+class QBittorrentSync:
+    """
+    Mirror of the torrents in qBittorrent kept up to date with /api/v2/sync/maindata.
+
+    Every update only transfers what changed since the previous one, qBittorrent
+    decides when a full resync is needed.
+    """
+
+    history_size = 100
+
+    def __init__(self, client):
+        self.client = client
+        self.rid = 0
+        self.torrents = {}
+        self.history = deque(maxlen=self.history_size)
+
+    @property
+    def token(self):
+        return str(self.rid)
+
+    def update(self):
+        """
+        Fetch and apply changes, returns lists of added, updated and removed infohashes.
+        """
+        maindata = self.client.call(
+            "get", "/api/v2/sync/maindata", params={"rid": self.rid}
+        ).json()
+        changed_torrents = maindata.get("torrents", {})
+
+        if maindata.get("full_update"):
+            previous_torrents, self.torrents = self.torrents, {}
+            removed = [h for h in previous_torrents if h not in changed_torrents]
+        else:
+            previous_torrents = self.torrents
+            removed = [
+                h
+                for h in maindata.get("torrents_removed", [])
+                if self.torrents.pop(h, None) is not None
+            ]
+
+        added, updated = [], []
+        for infohash, changes in changed_torrents.items():
+            torrent = previous_torrents.get(infohash)
+            if torrent is None:
+                added.append(infohash)
+                torrent = changes
+            else:
+                updated.append(infohash)
+                torrent.update(changes)
+            self.torrents[infohash] = torrent
+
+        self.rid = maindata["rid"]
+        self.history.append((self.token, added, updated, removed))
+        return added, updated, removed
+
+    def changes_since(self, token):
+        """
+        Combines the changes made after the update that returned the token,
+        returns None if the token is too old.
+        """
+        for i, (history_token, _, _, _) in enumerate(self.history):
+            if history_token == token:
+                break
+        else:
+            return None
+
+        status = {}
+        for _, added, updated, removed in list(self.history)[i + 1 :]:
+            for infohash in added:
+                if status.get(infohash) == "removed":
+                    status[infohash] = "updated"
+                else:
+                    status[infohash] = "added"
+            for infohash in updated:
+                if status.get(infohash) != "added":
+                    status[infohash] = "updated"
+            for infohash in removed:
+                if status.get(infohash) == "added":
+                    del status[infohash]
+                else:
+                    status[infohash] = "removed"
+
+        return tuple(
+            [h for h, s in status.items() if s == wanted_status]
+            for wanted_status in ["added", "updated", "removed"]
+        )
+
 
 class QBittorrentClient(BaseClient):
     identifier = "qbittorrent"
@@ -28,6 +126,7 @@ class QBittorrentClient(BaseClient):
         self.session_path = session_path and Path(session_path)
         self.label = label
         self._session = requests.Session()
+        self._sync = QBittorrentSync(self)
 
     def _call(self, _method, url, *args, **kwargs):
         return getattr(self._session, _method)(urljoin(self.url, url), *args, **kwargs)
@@ -59,48 +158,78 @@ class QBittorrentClient(BaseClient):
 
         return r
 
-    def _fetch_list_result(self, filter):
-        result = []
-        torrents = self.call(
-            "get", "/api/v2/torrents/info", params={"filter": filter}
-        ).json()
-        for torrent in torrents:
+    def _torrent_data_from_info(
+        self, infohash, torrent, fields=TorrentData.list_fields
+    ):
+        values = {"infohash": infohash}
+        if "name" in fields:
+            values["name"] = torrent["name"]
+        if "size" in fields:
+            values["size"] = torrent["size"]
+        if "state" in fields:
             if torrent["state"] == "error":
-                state = TorrentState.ERROR
-            if torrent["state"].startswith("paused") or torrent["state"].startswith(
+                values["state"] = TorrentState.ERROR
+            elif torrent["state"].startswith("paused") or torrent["state"].startswith(
                 "queued"
             ):
-                state = TorrentState.STOPPED
+                values["state"] = TorrentState.STOPPED
             else:
-                state = TorrentState.ACTIVE
-
-            tracker = ""
+                values["state"] = TorrentState.ACTIVE
+        if "progress" in fields:
+            values["progress"] = torrent["progress"] * 100.0
+        if "uploaded" in fields:
+            values["uploaded"] = torrent["uploaded"]
+        if "added" in fields:
+            values["added"] = torrent["added_on"]
+        if "tracker" in fields:
+            values["tracker"] = ""
             if torrent["tracker"]:
-                tracker = get_tracker_domain(torrent["tracker"])
-
-            result.append(
-                TorrentData(
-                    torrent["hash"],
-                    torrent["name"],
-                    torrent["size"],
-                    state,
-                    torrent["progress"] * 100.0,
-                    torrent["uploaded"],
-                    torrent["added_on"],
-                    tracker,
-                    torrent["upspeed"],
-                    torrent["dlspeed"],
-                    torrent["category"],
-                )
-            )
-
-        return result
+                values["tracker"] = get_tracker_domain(torrent["tracker"])
+        if "upload_rate" in fields:
+            values["upload_rate"] = torrent["upspeed"]
+        if "download_rate" in fields:
+            values["download_rate"] = torrent["dlspeed"]
+        if "label" in fields:
+            values["label"] = torrent["category"]
+        return TorrentData.with_fields(**values)
+
+    def list_changes(self, since_token=None):
+        self._sync.update()
+        changes = None
+        if since_token is not None:
+            changes = self._sync.changes_since(since_token)
+
+        if changes is None:
+            added, updated, removed = list(self._sync.torrents), [], []
+        else:
+            added, updated, removed = changes
 
-    def list(self):
-        return self._fetch_list_result("all")
+        return TorrentChanges(
+            [self._torrent_data_from_info(h, self._sync.torrents[h]) for h in added],
+            [self._torrent_data_from_info(h, self._sync.torrents[h]) for h in updated],
+            removed,
+            self._sync.token,
+        )
 
-    def list_active(self):
-        return self._fetch_list_result("active")
+    def list(self, fields=None):
+        fields = resolve_fields(fields)
+        self._sync.update()
+        return [
+            self._torrent_data_from_info(infohash, torrent, fields)
+            for infohash, torrent in self._sync.torrents.items()
+        ]
+
+    def list_active(self, fields=None):
+        # qBittorrent's active filter also counts torrents with peer activity,
+        # so it decides instead of the speeds in the mirror
+        fields = resolve_fields(fields)
+        torrents = self.call(
+            "get", "/api/v2/torrents/info", params={"filter": "active"}
+        ).json()
+        return [
+            self._torrent_data_from_info(torrent["hash"], torrent, fields)
+            for torrent in torrents
+        ]
 
     def start(self, infohash):
         self.call("get", "/api/v2/torrents/resume", params={"hashes": infohash})
@@ -108,6 +237,33 @@ class QBittorrentClient(BaseClient):
     def stop(self, infohash):
         self.call("get", "/api/v2/torrents/pause", params={"hashes": infohash})
 
+    def _call_many(self, url, infohashes, **params):
+        infohashes = list(infohashes)
+        hashes = [infohash.lower() for infohash in infohashes]
+        found = set()
+        for i in range(0, len(hashes), MANY_CHUNK_SIZE):
+            torrents = self.call(
+                "post",
+                "/api/v2/torrents/info",
+                data={"hashes": "|".join(hashes[i : i + MANY_CHUNK_SIZE])},
+            ).json()
+            chunk_found = [torrent["hash"] for torrent in torrents]
+            if chunk_found:
+                self.call("post", url, data={"hashes": "|".join(chunk_found), **params})
+            found.update(chunk_found)
+        return {infohash: infohash.lower() in found for infohash in infohashes}
+
+    def start_many(self, infohashes):
+        return self._call_many("/api/v2/torrents/resume", infohashes)
+
+    def stop_many(self, infohashes):
+        return self._call_many("/api/v2/torrents/pause", infohashes)
+
+    def remove_many(self, infohashes):
+        return self._call_many(
+            "/api/v2/torrents/delete", infohashes, deleteFiles="false"
+        )
+
     def test_connection(self):
         try:
             return len(self.call("get", "/api/v2/app/version").text) > 0
@@ -124,12 +280,17 @@ class QBittorrentClient(BaseClient):
         stopped=False,
     ):
         current_expected_data = calculate_minimum_expected_data(
-            torrent, destination_path, add_name_to_folder
+            torrent,
+            destination_path,
+            add_name_to_folder,
+            verify=minimum_expected_data == "verified",
         )
         if not has_minimum_expected_data(minimum_expected_data, current_expected_data):
             raise FailedToExecuteException(
                 f"Minimum expected data not reached, wanted {minimum_expected_data} actual {current_expected_data}"
             )
+        if fast_resume == "verify":  # not supported, a normal check hashes the data
+            fast_resume = False
         encoded_torrent = bencode(torrent)
         data = {
             "savepath": str(destination_path),
@@ -167,17 +328,21 @@ class QBittorrentClient(BaseClient):
 
         if not torrent_path.is_file():
             raise FailedToExecuteException("Torrent file does not exist")
-        torrent_data = bdecode(torrent_path.read_bytes())
-        if b"announce" not in torrent_data:
-            if not torrent_resume_path.is_file():
-                raise FailedToExecuteException("Torrent resume file does not exist")
-            torrent_resume_data = bdecode(torrent_resume_path.read_bytes())
-            trackers = torrent_resume_data.get(b"trackers")
-            if not trackers:
-                raise FailedToExecuteException("No trackers found in torrent file")
-            torrent_data[b"announce"] = trackers.pop(0)[0]
-            if trackers:
-                torrent_data[b"announce-list"] = trackers
+        torrent_file = torrent_path.read_bytes()
+        torrent_data = bdecode(torrent_file, lazy=True)
+        if b"announce" in torrent_data:
+            return torrent_file
+
+        if not torrent_resume_path.is_file():
+            raise FailedToExecuteException("Torrent resume file does not exist")
+        torrent_resume_data = bdecode(torrent_resume_path.read_bytes(), lazy=True)
+        trackers = list(torrent_resume_data.get(b"trackers") or [])
+        if not trackers:
+            raise FailedToExecuteException("No trackers found in torrent file")
+        torrent_data = dict(torrent_data)
+        torrent_data[b"announce"] = trackers.pop(0)[0]
+        if trackers:
+            torrent_data[b"announce-list"] = trackers
 
         return bencode(torrent_data)
 
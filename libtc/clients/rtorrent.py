@@ -2,26 +2,30 @@ import logging
 import os
 import re
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 from urllib.parse import quote, urlencode, urlsplit
 from xml.parsers.expat import ExpatError
+from xmlrpc.client import Binary
 from xmlrpc.client import Error as XMLRPCError
-from xmlrpc.client import ServerProxy
+from xmlrpc.client import ServerProxy, dumps
 
 import pytz
 
 from ..baseclient import BaseClient
-from ..bencode import bencode
+from ..bencode import bencode, bencode_into
 from ..exceptions import FailedToExecuteException
 from ..scgitransport import SCGITransport
-from ..torrent import TorrentData, TorrentFile, TorrentState
+from ..torrent import TorrentData, TorrentFile, TorrentState, resolve_fields
 from ..utils import (
+    Base64Writer,
     calculate_minimum_expected_data,
     get_tracker_domain,
     has_minimum_expected_data,
     map_existing_files,
     move_files,
 )
+from ..verify import verify_torrent
 
 logger = logging.getLogger(__name__)
 
@@ -43,17 +47,80 @@ def create_proxy(url):
         return ServerProxy(url)
 
 
-def bitfield_to_string(bitfield):
+def encode_request(method, params):
+    return dumps(tuple(params), method).encode("utf-8", "xmlcharrefreplace")
+
+
+def encode_load_request(method, torrent, params):
     """
-    Converts a list of booleans into a bitfield
+    Returns a load request for method with the torrent base64 encoded
+    straight into the request instead of bencoded and then marshalled.
+    """
+    prefix, suffix = encode_request(method, ["", Binary(b"")] + params).split(
+        b"<base64>\n", 1
+    )
+    body = BytesIO()
+    body.write(prefix)
+    body.write(b"<base64>\n")
+    with Base64Writer(body, lines=True) as writer:
+        bencode_into(torrent, writer)
+    body.write(suffix)
+    return body.getbuffer()
+
+
+BITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+def get_piece_range(position, size, piece_length):
+    """Returns the first piece and the piece after the last one that a file is part of."""
+    return (
+        position // piece_length,
+        (position + size + piece_length - 1) // piece_length,
+    )
+
+
+def build_bitfield(piece_length, pieces, files):
+    """
+    Returns a bytearray with one byte per piece that is 1 when all files
+    the piece is part of exist.
+
+    files is an iterable of (size, exists) in torrent order.
     """
-    retval = bytearray((len(bitfield) + 7) // 8)
+    bitfield = bytearray(b"\x01") * pieces
+    current_position = 0
+    for size, exists in files:
+        if not exists:
+            first_piece, last_piece = get_piece_range(
+                current_position, size, piece_length
+            )
+            bitfield[first_piece:last_piece] = bytes(last_piece - first_piece)
+        current_position += size
+    return bitfield
 
-    for piece, bit in enumerate(bitfield):
-        if bit:
-            retval[piece // 8] |= 1 << (7 - piece % 8)
 
-    return bytes(retval)
+def build_verified_bitfield(torrent, path, add_name_to_folder=True):
+    """
+    Returns a bytearray with one byte per piece that is 1 when
+    the local data of the piece matches its hash.
+    """
+    result = verify_torrent(torrent, path, add_name_to_folder=add_name_to_folder)
+    bitfield = bytearray(b"\x01") * result.total
+    for piece in result.failed:
+        bitfield[piece] = 0
+    return bitfield
+
+
+def bitfield_to_string(bitfield):
+    """
+    Converts a list of booleans into a bitfield
+    """
+    if not isinstance(bitfield, (bytes, bytearray)):
+        bitfield = bytes(map(bool, bitfield))
+    length = (len(bitfield) + 7) // 8
+    if not length:
+        return b""
+    bits = bitfield.translate(BITS).ljust(length * 8, b"0")
+    return int(bits, 2).to_bytes(length, "big")
 
 
 class RTorrentClient(BaseClient):
@@ -61,6 +128,27 @@ class RTorrentClient(BaseClient):
     display_name = "rtorrent"
     _methods = None
 
+    # The rtorrent commands needed for each TorrentData field
+    field_commands = {
+        "infohash": ["d.hash="],
+        "name": ["d.name="],
+        "size": ["d.size_bytes="],
+        "state": ["d.is_active=", "d.message="],
+        "progress": ["d.size_bytes=", "d.completed_bytes="],
+        "uploaded": ["d.up.total="],
+        "added": ["d.timestamp.finished="],
+        "tracker": ["t.multicall=,t.url="],
+        "upload_rate": ["d.up.rate="],
+        "download_rate": ["d.down.rate="],
+        "label": ["d.custom1="],
+    }
+    file_commands = [
+        "f.path=",
+        "f.size_bytes=",
+        "f.completed_chunks=",
+        "f.size_chunks=",
+    ]
+
     def __init__(self, url, session_path=None, torrent_temp_path=None, label=None):
         self.url = url
         self.proxy = create_proxy(url)
@@ -68,58 +156,71 @@ class RTorrentClient(BaseClient):
         self.torrent_temp_path = torrent_temp_path and Path(torrent_temp_path)
         self.label = label
 
-    def _fetch_list_result(self, view):
-        result = []
-        try:
-            torrents = self.proxy.d.multicall2(
-                "",
-                view,
-                "d.hash=",
-                "d.name=",
-                "d.is_active=",
-                "d.message=",
-                "d.size_bytes=",
-                "d.completed_bytes=",
-                "d.up.total=",
-                "d.up.rate=",
-                "d.down.rate=",
-                "d.timestamp.finished=",
-                "t.multicall=,t.url=",
-                "d.custom1=",
+    def _multicall_rows(self, method, *args):
+        transport = self.proxy("transport")
+        if isinstance(transport, SCGITransport):
+            return transport.stream_rows(
+                urlsplit(self.url).netloc, "/RPC2", encode_request(method, args)
             )
-        except (XMLRPCError, ConnectionError, OSError, ExpatError):
-            raise FailedToExecuteException()
-        for torrent in torrents:
-            if torrent[3]:
-                state = TorrentState.ERROR
-            elif torrent[2] == 0:
-                state = TorrentState.STOPPED
+        return iter(getattr(self.proxy, method)(*args))
+
+    def _get_list_commands(self, fields):
+        commands = []
+        for field in fields:
+            for command in self.field_commands[field]:
+                if command not in commands:
+                    commands.append(command)
+        return commands
+
+    def _torrent_data_from_row(self, torrent, fields, commands):
+        torrent = dict(zip(commands, torrent))
+        values = {"infohash": torrent["d.hash="].lower()}
+        if "name" in fields:
+            values["name"] = torrent["d.name="]
+        if "size" in fields:
+            values["size"] = torrent["d.size_bytes="]
+        if "state" in fields:
+            if torrent["d.message="]:
+                values["state"] = TorrentState.ERROR
+            elif torrent["d.is_active="] == 0:
+                values["state"] = TorrentState.STOPPED
             else:
-                state = TorrentState.ACTIVE
-
-            progress = (torrent[5] / torrent[4]) * 100
-            if torrent[10]:
-                tracker = get_tracker_domain(torrent[10][0][0])
+                values["state"] = TorrentState.ACTIVE
+        if "progress" in fields:
+            values["progress"] = (
+                torrent["d.completed_bytes="] / torrent["d.size_bytes="]
+            ) * 100
+        if "uploaded" in fields:
+            values["uploaded"] = torrent["d.up.total="]
+        if "added" in fields:
+            values["added"] = datetime.utcfromtimestamp(
+                torrent["d.timestamp.finished="]
+            ).astimezone(pytz.UTC)
+        if "tracker" in fields:
+            trackers = torrent["t.multicall=,t.url="]
+            if trackers:
+                values["tracker"] = get_tracker_domain(trackers[0][0])
             else:
-                tracker = "None"
-
-            result.append(
-                TorrentData(
-                    torrent[0].lower(),
-                    torrent[1],
-                    torrent[4],
-                    state,
-                    progress,
-                    torrent[6],
-                    datetime.utcfromtimestamp(torrent[9]).astimezone(pytz.UTC),
-                    tracker,
-                    torrent[7],
-                    torrent[8],
-                    torrent[11],
-                )
-            )
+                values["tracker"] = "None"
+        if "upload_rate" in fields:
+            values["upload_rate"] = torrent["d.up.rate="]
+        if "download_rate" in fields:
+            values["download_rate"] = torrent["d.down.rate="]
+        if "label" in fields:
+            values["label"] = torrent["d.custom1="]
+        return TorrentData.with_fields(**values)
+
+    def _iter_list_result(self, view, fields=None):
+        fields = resolve_fields(fields)
+        commands = self._get_list_commands(fields)
+        try:
+            for torrent in self._multicall_rows("d.multicall2", "", view, *commands):
+                yield self._torrent_data_from_row(torrent, fields, commands)
+        except (XMLRPCError, ConnectionError, OSError, ExpatError):
+            raise FailedToExecuteException()
 
-        return result
+    def _fetch_list_result(self, view, fields=None):
+        return list(self._iter_list_result(view, fields))
 
     def get_methods(self):
         if self._methods is None:
@@ -127,10 +228,7 @@ class RTorrentClient(BaseClient):
 
         return self._methods
 
-    def list(self):
-        return self._fetch_list_result("main")
-
-    def list_active(self):
+    def _prepare_active_view(self):
         try:
             if "spreadsheet_active" not in self.proxy.view.list():
                 self.proxy.view.add("", "spreadsheet_active")
@@ -139,7 +237,23 @@ class RTorrentClient(BaseClient):
             )
         except (XMLRPCError, ConnectionError, OSError, ExpatError):
             raise FailedToExecuteException()
-        return self._fetch_list_result("spreadsheet_active")
+
+    def list(self, fields=None):
+        return self._fetch_list_result("main", fields)
+
+    def list_active(self, fields=None):
+        self._prepare_active_view()
+        return self._fetch_list_result("spreadsheet_active", fields)
+
+    def iter_list(self, active=False, fields=None):
+        """
+        Yields `TorrentData` as the torrents are received from rtorrent
+        instead of waiting for the complete list.
+        """
+        if active:
+            self._prepare_active_view()
+            return self._iter_list_result("spreadsheet_active", fields)
+        return self._iter_list_result("main", fields)
 
     def start(self, infohash):
         try:
@@ -153,6 +267,29 @@ class RTorrentClient(BaseClient):
         except (XMLRPCError, ConnectionError, OSError, ExpatError):
             raise FailedToExecuteException()
 
+    def _call_many(self, method, infohashes):
+        infohashes = list(infohashes)
+        try:
+            results = self.proxy.system.multicall(
+                [{"methodName": method, "params": [h]} for h in infohashes]
+            )
+        except (XMLRPCError, ConnectionError, OSError, ExpatError):
+            raise FailedToExecuteException()
+        # Failed calls are returned as a fault struct, successful ones as a list
+        return {
+            infohash: not isinstance(r, dict)
+            for infohash, r in zip(infohashes, results)
+        }
+
+    def start_many(self, infohashes):
+        return self._call_many("d.start", infohashes)
+
+    def stop_many(self, infohashes):
+        return self._call_many("d.stop", infohashes)
+
+    def remove_many(self, infohashes):
+        return self._call_many("d.erase", infohashes)
+
     def test_connection(self):
         try:
             return self.proxy.system.pid() is not None
@@ -169,7 +306,10 @@ class RTorrentClient(BaseClient):
         stopped=False,
     ):
         current_expected_data = calculate_minimum_expected_data(
-            torrent, destination_path, add_name_to_folder
+            torrent,
+            destination_path,
+            add_name_to_folder,
+            verify=minimum_expected_data == "verified",
         )
         if not has_minimum_expected_data(minimum_expected_data, current_expected_data):
             raise FailedToExecuteException(
@@ -182,32 +322,44 @@ class RTorrentClient(BaseClient):
 
             psize = torrent[b"info"][b"piece length"]
             pieces = len(torrent[b"info"][b"pieces"]) // 20
-            bitfield = [True] * pieces
 
+            torrent = dict(torrent)
             torrent[b"libtorrent_resume"] = {b"files": []}
 
-            files = map_existing_files(torrent, destination_path)
+            files = map_existing_files(
+                torrent, destination_path, add_name_to_folder=add_name_to_folder
+            )
+            verify = fast_resume == "verify"
+            if verify and current_expected_data == "verified":
+                # All pieces were hashed when checking the minimum expected data
+                bitfield = bytearray(b"\x01") * pieces
+            elif verify:
+                logger.info("Verifying local data")
+                bitfield = build_verified_bitfield(
+                    torrent, destination_path, add_name_to_folder=add_name_to_folder
+                )
+            else:
+                bitfield = build_bitfield(
+                    psize, pieces, [(size, exists) for _, _, size, exists in files]
+                )
+
             current_position = 0
             for fp, f, size, exists in files:
                 logger.debug(f"Handling file {fp!r}")
 
                 result = {b"priority": 1, b"completed": int(exists)}
+                if verify and size:
+                    # rtorrent wants the number of completed chunks in the file
+                    first_piece, last_piece = get_piece_range(
+                        current_position, size, psize
+                    )
+                    result[b"completed"] = bitfield[first_piece:last_piece].count(1)
                 if exists:
                     result[b"mtime"] = int(fp.stat().st_mtime)
                 torrent[b"libtorrent_resume"][b"files"].append(result)
+                current_position += size
 
-                last_position = current_position + size
-
-                first_piece = current_position // psize
-                last_piece = (last_position + psize - 1) // psize
-
-                for piece in range(first_piece, last_piece):
-                    logger.debug(f"Setting piece {piece} to {exists}")
-                    bitfield[piece] *= exists
-
-                current_position = last_position
-
-            if all(bitfield):
+            if 0 not in bitfield:
                 logger.info("This torrent is complete, setting bitfield to chunk count")
                 torrent[b"libtorrent_resume"][
                     b"bitfield"
@@ -218,20 +370,28 @@ class RTorrentClient(BaseClient):
                     bitfield
                 )
 
-        encoded_torrent = bencode(torrent)
-        cmd = [encoded_torrent]
+        cmd = []
         if add_name_to_folder:
             cmd.append(f'd.directory.set="{destination_path!s}"')
         else:
             cmd.append(f'd.directory_base.set="{destination_path!s}"')
         if self.label:
             cmd.append(f"d.custom1.set={quote(self.label)}")
-        logger.info(f"Sending to rtorrent: {cmd!r}")
+        if stopped:
+            method = "load.raw"
+        else:
+            method = "load.raw_start"
+        logger.info(f"Sending to rtorrent: {method} {cmd!r}")
+        transport = self.proxy("transport")
         try:  # TODO: use torrent_temp_path if payload is too big
-            if stopped:
-                self.proxy.load.raw("", *cmd)
+            if isinstance(transport, SCGITransport):
+                transport.request(
+                    urlsplit(self.url).netloc,
+                    "/RPC2",
+                    encode_load_request(method, torrent, cmd),
+                )
             else:
-                self.proxy.load.raw_start("", *cmd)
+                getattr(self.proxy, method)("", bencode(torrent), *cmd)
         except (XMLRPCError, ConnectionError, OSError, ExpatError) as e:
             raise FailedToExecuteException(f"Failed to add torrent: {e!r}")
 
@@ -281,29 +441,25 @@ class RTorrentClient(BaseClient):
     def get_files(self, infohash):
         result = []
         try:
-            files = self.proxy.f.multicall(
-                infohash,
-                "",
-                "f.path=",
-                "f.size_bytes=",
-                "f.completed_chunks=",
-                "f.size_chunks=",
-            )
+            files = self.proxy.f.multicall(infohash, "", *self.file_commands)
             for f in files:
-                path, size, completed_chunks, size_chunks = f
-                if completed_chunks > size_chunks:
-                    completed_chunks = size_chunks
-
-                if size_chunks == 0:
-                    progress = 0.0
-                else:
-                    progress = (completed_chunks / size_chunks) * 100
-                result.append(TorrentFile(path, size, progress))
+                result.append(self._torrent_file_from_row(f))
         except (XMLRPCError, ConnectionError, OSError, ExpatError):
             raise FailedToExecuteException("Failed to retrieve files")
 
         return result
 
+    def _torrent_file_from_row(self, f):
+        path, size, completed_chunks, size_chunks = f
+        if completed_chunks > size_chunks:
+            completed_chunks = size_chunks
+
+        if size_chunks == 0:
+            progress = 0.0
+        else:
+            progress = (completed_chunks / size_chunks) * 100
+        return TorrentFile(path, size, progress)
+
     def serialize_configuration(self):
         url = f"{self.identifier}+{self.url}"
         query = {}
@@ -1,4 +1,3 @@
-import hashlib
 import shutil
 import tempfile
 import time
@@ -6,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from libtc import TorrentData, TorrentState, bdecode, bencode
+from libtc import TorrentData, TorrentState, bdecode, infohash_from_bytes
 
 
 @pytest.fixture
@@ -70,7 +69,7 @@ def verify_torrent_state(client, states, do_not_fail=False):
 def test_add_torrent_multifile(client, testfiles):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -94,7 +93,7 @@ def test_add_torrent_multifile(client, testfiles):
 def test_add_torrent_singlefile(client, testfiles):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -118,7 +117,7 @@ def test_add_torrent_singlefile(client, testfiles):
 def test_add_torrent_multifile_no_add_name_to_folder(client, testfiles):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(
         torrent_data,
         testfiles / "Some-Release",
@@ -141,7 +140,7 @@ def test_add_torrent_multifile_no_add_name_to_folder_different_name(client, test
     (testfiles / "Some-Release").rename(new_path)
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(
         torrent_data,
         new_path,
@@ -164,7 +163,7 @@ def test_add_torrent_multifile_no_add_name_to_folder_different_name(client, test
 def test_add_torrent_singlefile_no_add_name_to_folder(client, testfiles):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False, add_name_to_folder=False)
 
     verify_torrent_state(
@@ -181,7 +180,7 @@ def test_add_torrent_singlefile_no_add_name_to_folder(client, testfiles):
 def test_add_torrent_singlefile_no_data(client, testfiles, tmp_path):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, tmp_path, fast_resume=False, add_name_to_folder=False)
 
     verify_torrent_state(
@@ -204,7 +203,7 @@ def test_add_torrent_singlefile_no_data(client, testfiles, tmp_path):
 def test_retrieve_torrent(client, testfiles):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -216,10 +215,9 @@ def test_retrieve_torrent(client, testfiles):
         ],
     )
     time.sleep(2)  # qBittorrent has a delay before it saves trackers
-    retrieved_torrent_data = bdecode(client.retrieve_torrentfile(infohash))
-    assert (
-        hashlib.sha1(bencode(retrieved_torrent_data[b"info"])).hexdigest() == infohash
-    )
+    retrieved_torrent = client.retrieve_torrentfile(infohash)
+    assert infohash_from_bytes(retrieved_torrent) == infohash
+    retrieved_torrent_data = bdecode(retrieved_torrent)
     assert retrieved_torrent_data.get(b"announce") == torrent_data.get(b"announce")
     assert retrieved_torrent_data.get(b"announce-list") == torrent_data.get(
         b"announce-list"
@@ -231,7 +229,7 @@ def test_retrieve_torrent(client, testfiles):
 def test_add_torrent_multifile_stopped(client, testfiles):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False, stopped=True)
 
     verify_torrent_state(
@@ -278,7 +276,7 @@ def test_add_torrent_multifile_stopped(client, testfiles):
 def test_start_stop(client, testfiles):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
     time.sleep(2)  # Weird bug with Deluge
 
@@ -327,10 +325,62 @@ def test_start_stop(client, testfiles):
     assert (testfiles / "Some-Release").exists()
 
 
+def test_start_stop_remove_many(client, testfiles):
+    torrent = testfiles / "Some-Release.torrent"
+    torrent_data = bdecode(torrent.read_bytes())
+    infohash = infohash_from_bytes(torrent.read_bytes())
+    client.add(torrent_data, testfiles, fast_resume=False)
+    time.sleep(2)  # Weird bug with Deluge
+
+    verify_torrent_state(
+        client,
+        [
+            {
+                "infohash": infohash,
+                "name": "Some-Release",
+                "state": TorrentState.ACTIVE,
+                "progress": 100.0,
+            }
+        ],
+    )
+
+    assert client.stop_many([infohash]) == {infohash: True}
+
+    verify_torrent_state(
+        client,
+        [
+            {
+                "infohash": infohash,
+                "name": "Some-Release",
+                "state": TorrentState.STOPPED,
+                "progress": 100.0,
+            }
+        ],
+    )
+
+    assert client.start_many([infohash]) == {infohash: True}
+
+    verify_torrent_state(
+        client,
+        [
+            {
+                "infohash": infohash,
+                "name": "Some-Release",
+                "state": TorrentState.ACTIVE,
+                "progress": 100.0,
+            }
+        ],
+    )
+
+    assert client.remove_many([infohash]) == {infohash: True}
+    verify_torrent_state(client, [])
+    assert (testfiles / "Some-Release").exists()
+
+
 def test_get_files_multifile(client, testfiles):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -378,7 +428,7 @@ def test_get_files_multifile(client, testfiles):
 def test_get_files_singlefile(client, testfiles):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -414,7 +464,7 @@ def test_get_files_singlefile(client, testfiles):
 def test_move_torrent_singlefile(client, testfiles, tempdir):
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -450,7 +500,7 @@ def test_move_torrent_singlefile(client, testfiles, tempdir):
 def test_move_torrent_multifile(client, testfiles, tempdir):
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     client.add(torrent_data, testfiles, fast_resume=False)
     remove_folder = testfiles / "Some-Release" / "Sample"
     preserve_file = testfiles / "Some-Release" / "do-not-move.txt"
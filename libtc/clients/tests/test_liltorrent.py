@@ -49,7 +49,7 @@ def test_path_mapping(client, testfiles):
 
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     full_to_path = testfiles / to_path
     full_to_path.mkdir()
     (testfiles / "Some-Release").rename(full_to_path / "Some-Release")
@@ -1,10 +1,9 @@
-import hashlib
 import time
 from pathlib import Path
 
 import pytest
 
-from libtc import TorrentState, bdecode, bencode, move_torrent
+from libtc import TorrentState, bdecode, infohash_from_bytes, move_torrent
 
 from .basetest import testfiles, verify_torrent_state
 from .test_deluge import client as deluge_client
@@ -43,7 +42,7 @@ def test_move_multifile(
 
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     source_client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -112,7 +111,7 @@ def test_move_singlefile(
 
     torrent = testfiles / "test_single.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     source_client.add(torrent_data, testfiles, fast_resume=False)
 
     verify_torrent_state(
@@ -183,7 +182,7 @@ def test_move_multifile_no_add_name_to_folder(
     (testfiles / "Some-Release").rename(new_path)
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     source_client.add(
         torrent_data,
         new_path,
@@ -256,7 +255,7 @@ def test_move_multifile_stopped(
 
     torrent = testfiles / "Some-Release.torrent"
     torrent_data = bdecode(torrent.read_bytes())
-    infohash = hashlib.sha1(bencode(torrent_data[b"info"])).hexdigest()
+    infohash = infohash_from_bytes(torrent.read_bytes())
     source_client.add(torrent_data, testfiles, fast_resume=False)
     time.sleep(2)  # Weird bug with Deluge
 
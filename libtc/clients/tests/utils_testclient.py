@@ -24,10 +24,10 @@ class TestClient(BaseClient):
         self._test_connection = True
         self._torrents = {}
 
-    def list(self):
+    def list(self, fields=None):
         return [t.torrent_data for t in self._torrents.values()]
 
-    def list_active(self):
+    def list_active(self, fields=None):
         return [t.torrent_data for t in self._torrents.values() if t.is_active]
 
     def start(self, infohash):
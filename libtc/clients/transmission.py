@@ -1,8 +1,10 @@
-import base64
 import json
 import logging
 import os
+import time
+import uuid
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 from urllib.parse import urlencode
 
@@ -11,10 +13,17 @@ import requests
 from requests.exceptions import RequestException
 
 from ..baseclient import BaseClient
-from ..bencode import bencode
+from ..bencode import bencode_into
 from ..exceptions import FailedToExecuteException
-from ..torrent import TorrentData, TorrentFile, TorrentState
+from ..torrent import (
+    TorrentChanges,
+    TorrentData,
+    TorrentFile,
+    TorrentState,
+    resolve_fields,
+)
 from ..utils import (
+    Base64Writer,
     calculate_minimum_expected_data,
     get_tracker_domain,
     has_minimum_expected_data,
@@ -23,6 +32,22 @@ from ..utils import (
 logger = logging.getLogger(__name__)
 
 
+def encode_add_request(torrent, arguments):
+    """
+    Returns a torrent-add request as a file-like object with the torrent
+    base64 encoded straight into it as metainfo.
+    """
+    body = BytesIO()
+    body.write(b'{"method": "torrent-add", "arguments": {')
+    for key, value in arguments.items():
+        body.write(f"{json.dumps(key)}: {json.dumps(value)}, ".encode())
+    body.write(b'"metainfo": "')
+    with Base64Writer(body) as writer:
+        bencode_into(torrent, writer)
+    body.write(b'"}}')
+    return body
+
+
 class TransmissionClient(BaseClient):
     identifier = "transmission"
     display_name = "Transmission"
@@ -36,26 +61,32 @@ class TransmissionClient(BaseClient):
         self.password = password
         self.session = requests.Session()
 
-    def _call(self, method, **kwargs):
-        logger.debug(f"Calling {method!r} args {kwargs!r}")
+    def _post(self, data):
         auth = None
         if self.username and self.password:
             auth = (self.username, self.password)
+        if hasattr(data, "seek"):
+            data.seek(0)
         return self.session.post(
             self.url,
-            data=json.dumps({"method": method, "arguments": kwargs}),
+            data=data,
             headers={"X-Transmission-Session-Id": self._session_id},
             auth=auth,
         )
 
     def call(self, method, **kwargs):
+        logger.debug(f"Calling {method!r} args {kwargs!r}")
+        return self.call_raw(json.dumps({"method": method, "arguments": kwargs}))
+
+    def call_raw(self, data):
+        """Sends an already encoded request, data can be a file-like object."""
         try:
-            r = self._call(method, **kwargs)
+            r = self._post(data)
         except RequestException:
             raise FailedToExecuteException()
         if r.status_code == 409:
             self._session_id = r.headers["X-Transmission-Session-Id"]
-            r = self._call(method, **kwargs)
+            r = self._post(data)
 
         if r.status_code != 200:
             raise FailedToExecuteException()
@@ -67,56 +98,115 @@ class TransmissionClient(BaseClient):
 
         return r["arguments"]
 
-    def _fetch_list_result(self, only_active):
-        result = []
-        fields = [
-            "hashString",
-            "name",
-            "sizeWhenDone",
-            "status",
-            "error",
-            "percentDone",
-            "uploadedEver",
-            "addedDate",
-            "trackers",
-            "rateUpload",
-            "rateDownload",
+    # The transmission fields needed for each TorrentData field
+    field_mapping = {
+        "infohash": ["hashString"],
+        "name": ["name"],
+        "size": ["sizeWhenDone"],
+        "state": ["status", "error"],
+        "progress": ["percentDone"],
+        "uploaded": ["uploadedEver"],
+        "added": ["addedDate"],
+        "tracker": ["trackers"],
+        "upload_rate": ["rateUpload"],
+        "download_rate": ["rateDownload"],
+        "label": [],
+    }
+
+    # How long transmission considers a torrent recently active
+    recently_active_seconds = 60
+
+    def _get_transmission_fields(self, fields):
+        return [
+            transmission_field
+            for field in fields
+            for transmission_field in self.field_mapping[field]
         ]
-        if only_active:
-            call_result = self.call("torrent-get", ids="recently-active", fields=fields)
-        else:
-            call_result = self.call("torrent-get", fields=fields)
-        for torrent in call_result["torrents"]:
+
+    def _torrent_data_from_result(self, torrent, fields=TorrentData.list_fields):
+        values = {"infohash": torrent["hashString"]}
+        if "name" in fields:
+            values["name"] = torrent["name"]
+        if "size" in fields:
+            values["size"] = torrent["sizeWhenDone"]
+        if "state" in fields:
             if torrent["error"] > 0:
-                state = TorrentState.ERROR
+                values["state"] = TorrentState.ERROR
             elif torrent["status"] > 0:
-                state = TorrentState.ACTIVE
+                values["state"] = TorrentState.ACTIVE
             else:
-                state = TorrentState.STOPPED
-
+                values["state"] = TorrentState.STOPPED
+        if "progress" in fields:
+            values["progress"] = torrent["percentDone"] * 100
+        if "uploaded" in fields:
+            values["uploaded"] = torrent["uploadedEver"]
+        if "added" in fields:
+            values["added"] = datetime.utcfromtimestamp(
+                torrent["addedDate"]
+            ).astimezone(pytz.UTC)
+        if "tracker" in fields:
             if torrent["trackers"]:
-                tracker = get_tracker_domain(torrent["trackers"][0]["announce"])
-            else:
-                tracker = "None"
-
-            result.append(
-                TorrentData(
-                    torrent["hashString"],
-                    torrent["name"],
-                    torrent["sizeWhenDone"],
-                    state,
-                    torrent["percentDone"] * 100,
-                    torrent["uploadedEver"],
-                    datetime.utcfromtimestamp(torrent["addedDate"]).astimezone(
-                        pytz.UTC
-                    ),
-                    tracker,
-                    torrent["rateUpload"],
-                    torrent["rateDownload"],
-                    "",
+                values["tracker"] = get_tracker_domain(
+                    torrent["trackers"][0]["announce"]
                 )
+            else:
+                values["tracker"] = "None"
+        if "upload_rate" in fields:
+            values["upload_rate"] = torrent["rateUpload"]
+        if "download_rate" in fields:
+            values["download_rate"] = torrent["rateDownload"]
+        if "label" in fields:
+            values["label"] = ""
+        return TorrentData.with_fields(**values)
+
+    def _fetch_list_result(self, only_active, fields=None):
+        fields = resolve_fields(fields)
+        transmission_fields = self._get_transmission_fields(fields)
+        if only_active:
+            call_result = self.call(
+                "torrent-get", ids="recently-active", fields=transmission_fields
             )
-        return result
+        else:
+            call_result = self.call("torrent-get", fields=transmission_fields)
+        return [
+            self._torrent_data_from_result(torrent, fields)
+            for torrent in call_result["torrents"]
+        ]
+
+    def list_changes(self, since_token=None):
+        # Transmission can list torrents changed within the last minute and the ids
+        # of removed torrents, older tokens are handled by listing everything.
+        # Both are compared with the previous values so only changed torrents are updated.
+        token, snapshot, last_update = getattr(
+            self, "_list_changes_state", (None, {}, 0)
+        )
+        if since_token is None or since_token != token:
+            snapshot = {}
+        fields = self._get_transmission_fields(TorrentData.list_fields) + ["id"]
+        now = time.monotonic()
+        if snapshot and now - last_update < self.recently_active_seconds:
+            call_result = self.call("torrent-get", ids="recently-active", fields=fields)
+            removed_ids = [tid for tid in call_result["removed"] if tid in snapshot]
+        else:
+            call_result = self.call("torrent-get", fields=fields)
+            current_ids = set(torrent["id"] for torrent in call_result["torrents"])
+            removed_ids = [tid for tid in snapshot if tid not in current_ids]
+        removed = [snapshot.pop(tid)[0] for tid in removed_ids]
+
+        added, updated = [], []
+        for torrent in call_result["torrents"]:
+            torrent_data = self._torrent_data_from_result(torrent)
+            values = tuple(getattr(torrent_data, k) for k in TorrentData.list_fields)
+            previous = snapshot.get(torrent["id"])
+            if previous is None:
+                added.append(torrent_data)
+            elif previous[1] != values:
+                updated.append(torrent_data)
+            snapshot[torrent["id"]] = (torrent["hashString"], values)
+
+        token = uuid.uuid4().hex
+        self._list_changes_state = (token, snapshot, now)
+        return TorrentChanges(added, updated, removed, token)
 
     def get_download_path(self, infohash):
         # It is impossible to determine the actual location of a file in transmission due to the
@@ -148,11 +238,11 @@ class TransmissionClient(BaseClient):
             move=True,
         )
 
-    def list(self):
-        return self._fetch_list_result(False)
+    def list(self, fields=None):
+        return self._fetch_list_result(False, fields)
 
-    def list_active(self):
-        return self._fetch_list_result(True)
+    def list_active(self, fields=None):
+        return self._fetch_list_result(True, fields)
 
     def start(self, infohash):
         self.call("torrent-start", ids=[infohash])
@@ -160,6 +250,24 @@ class TransmissionClient(BaseClient):
     def stop(self, infohash):
         self.call("torrent-stop", ids=[infohash])
 
+    def _call_many(self, method, infohashes):
+        infohashes = list(infohashes)
+        call_result = self.call("torrent-get", ids=infohashes, fields=["hashString"])
+        found = [t["hashString"] for t in call_result["torrents"]]
+        if found:
+            self.call(method, ids=found)
+        found = set(found)
+        return {infohash: infohash.lower() in found for infohash in infohashes}
+
+    def start_many(self, infohashes):
+        return self._call_many("torrent-start", infohashes)
+
+    def stop_many(self, infohashes):
+        return self._call_many("torrent-stop", infohashes)
+
+    def remove_many(self, infohashes):
+        return self._call_many("torrent-remove", infohashes)
+
     def test_connection(self):
         try:
             session_data = self.call("session-get")
@@ -183,16 +291,20 @@ class TransmissionClient(BaseClient):
         stopped=False,
     ):
         current_expected_data = calculate_minimum_expected_data(
-            torrent, destination_path, add_name_to_folder
+            torrent,
+            destination_path,
+            add_name_to_folder,
+            verify=minimum_expected_data == "verified",
         )
         if not has_minimum_expected_data(minimum_expected_data, current_expected_data):
             raise FailedToExecuteException(
                 f"Minimum expected data not reached, wanted {minimum_expected_data} actual {current_expected_data}"
             )
-        if current_expected_data != "full":
+        if fast_resume == "verify":  # not supported, a normal check hashes the data
+            fast_resume = False
+        if current_expected_data not in ["full", "verified"]:
             fast_resume = False
         destination_path = Path(os.path.abspath(destination_path))
-        encoded_torrent = base64.b64encode(bencode(torrent)).decode()
 
         name = torrent[b"info"][b"name"].decode()
         if add_name_to_folder:
@@ -207,10 +319,10 @@ class TransmissionClient(BaseClient):
 
         kwargs = {
             "download-dir": str(download_dir),
-            "metainfo": encoded_torrent,
             "paused": True,
         }
-        result = self.call("torrent-add", **kwargs)
+        logger.debug(f"Calling 'torrent-add' args {kwargs!r}")
+        result = self.call_raw(encode_add_request(torrent, kwargs))
         tid = result["torrent-added"]["id"]
 
         if not add_name_to_folder:
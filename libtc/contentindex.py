@@ -0,0 +1,308 @@
+"""
+Index of the files in a set of data folders, used to find where the data
+of a torrent already exists without looking through the folders every time.
+"""
+
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    directory TEXT,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_size ON files (size);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE TABLE IF NOT EXISTS piece_hashes (
+    path TEXT,
+    piece_length INTEGER,
+    hash BLOB,
+    PRIMARY KEY (path, piece_length)
+);
+"""
+
+# Max number of variables in an sqlite query
+QUERY_CHUNK_SIZE = 500
+
+
+class ContentMatch:
+    __slots__ = (
+        "destination_path",
+        "add_name_to_folder",
+        "found_files",
+        "missing_files",
+        "found_size",
+        "missing_size",
+    )
+
+    def __init__(
+        self,
+        destination_path,
+        add_name_to_folder,
+        found_files,
+        missing_files,
+        found_size,
+        missing_size,
+    ):
+        self.destination_path = destination_path
+        self.add_name_to_folder = add_name_to_folder
+        self.found_files = found_files
+        self.missing_files = missing_files
+        self.found_size = found_size
+        self.missing_size = missing_size
+
+    @property
+    def minimum_expected_data(self):
+        if self.missing_size:
+            return "partial"
+        return "full"
+
+    def __repr__(self):
+        return f"ContentMatch(destination_path={self.destination_path!r}, add_name_to_folder={self.add_name_to_folder!r}, found_size={self.found_size!r}, missing_size={self.missing_size!r})"
+
+
+def get_torrent_files(torrent):
+    """Returns the files of a torrent as a list of (path, size, offset)."""
+    info = torrent[b"info"]
+    if b"files" not in info:
+        return [(os.fsdecode(info[b"name"]), info[b"length"], 0)]
+
+    files, offset = [], 0
+    for f in info[b"files"]:
+        path = os.sep.join(os.fsdecode(p) for p in f[b"path"])
+        files.append((path, f[b"length"], offset))
+        offset += f[b"length"]
+    return files
+
+
+class ContentIndex:
+    """
+    Keeps the path, size and mtime of every file in roots in an sqlite database.
+
+    update() only lists folders that changed since the last update, found by
+    their mtime. Files that are changed without changing their folder are
+    found with update(full=True).
+
+    A match can be added to a client with
+    client.add(torrent, match.destination_path, add_name_to_folder=match.add_name_to_folder,
+    minimum_expected_data=match.minimum_expected_data)
+    """
+
+    def __init__(self, database_path, roots):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.db = sqlite3.connect(str(database_path))
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _scan_directory(self, path, mtime_ns):
+        """Lists a changed directory into the index and returns its subdirectories."""
+        files, subdirectories = {}, []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except FileNotFoundError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+        indexed = {
+            row[0]: (row[1], row[2])
+            for row in self.db.execute(
+                "SELECT path, size, mtime_ns FROM files WHERE directory = ?", (path,)
+            )
+        }
+        changed = [p for p in indexed if files.get(p) != indexed[p]]
+        self.db.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in changed])
+        self.db.executemany(
+            "DELETE FROM piece_hashes WHERE path = ?", [(p,) for p in changed]
+        )
+        self.db.executemany(
+            "INSERT INTO files (path, directory, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            [
+                (p, path, size, mtime_ns)
+                for p, (size, mtime_ns) in files.items()
+                if indexed.get(p) != (size, mtime_ns)
+            ],
+        )
+        self.db.execute(
+            "INSERT OR REPLACE INTO directories (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (path, os.path.dirname(path), mtime_ns),
+        )
+        return subdirectories
+
+    def update(self, full=False):
+        """Brings the index up to date with the files in roots."""
+        seen = set()
+        stack = list(self.roots)
+        with self.db:
+            while stack:
+                path = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except (FileNotFoundError, NotADirectoryError):
+                    continue
+                seen.add(path)
+
+                row = self.db.execute(
+                    "SELECT mtime_ns FROM directories WHERE path = ?", (path,)
+                ).fetchone()
+                if not full and row and row[0] == mtime_ns:
+                    stack.extend(
+                        row[0]
+                        for row in self.db.execute(
+                            "SELECT path FROM directories WHERE parent = ?", (path,)
+                        )
+                    )
+                else:
+                    stack.extend(self._scan_directory(path, mtime_ns))
+
+            removed = [
+                (row[0],)
+                for row in self.db.execute("SELECT path FROM directories")
+                if row[0] not in seen
+            ]
+            self.db.executemany(
+                "DELETE FROM piece_hashes WHERE path IN (SELECT path FROM files WHERE directory = ?)",
+                removed,
+            )
+            self.db.executemany("DELETE FROM files WHERE directory = ?", removed)
+            self.db.executemany("DELETE FROM directories WHERE path = ?", removed)
+
+    def get_file_sizes(self, paths):
+        """Returns the indexed size of the paths that are in the index."""
+        sizes = {}
+        for i in range(0, len(paths), QUERY_CHUNK_SIZE):
+            chunk = paths[i : i + QUERY_CHUNK_SIZE]
+            sizes.update(
+                self.db.execute(
+                    f"SELECT path, size FROM files WHERE path IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+            )
+        return sizes
+
+    def get_piece_hash(self, path, piece_length):
+        """Returns the hash of the first piece of a file, hashed once and then kept in the index."""
+        row = self.db.execute(
+            "SELECT hash FROM piece_hashes WHERE path = ? AND piece_length = ?",
+            (path, piece_length),
+        ).fetchone()
+        if row:
+            return row[0]
+        try:
+            with open(path, "rb") as f:
+                piece_hash = hashlib.sha1(f.read(piece_length)).digest()
+        except OSError:
+            return None
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO piece_hashes (path, piece_length, hash) VALUES (?, ?, ?)",
+                (path, piece_length, piece_hash),
+            )
+        return piece_hash
+
+    def find_torrent(self, torrent, verify=True):
+        """
+        Returns the places where the data of a torrent exists as a list of
+        ContentMatch, the one with the most data first.
+
+        The largest file of the torrent is looked up by size, and every file
+        with the right path relative to it is counted.
+        With verify, the largest file must match the hash of the piece it starts with,
+        if it starts at a piece.
+        """
+        info = torrent[b"info"]
+        name = os.fsdecode(info[b"name"])
+        is_multi_file = b"files" in info
+        files = get_torrent_files(torrent)
+        anchor_path, anchor_size, anchor_offset = max(files, key=lambda f: f[1])
+
+        piece_length = info[b"piece length"] if verify else None
+        expected_hash = None
+        if verify and anchor_offset % piece_length == 0:
+            piece = anchor_offset // piece_length
+            expected_hash = bytes(info[b"pieces"][piece * 20 : piece * 20 + 20])
+            if anchor_size < piece_length and anchor_offset + anchor_size != sum(
+                f[1] for f in files
+            ):
+                expected_hash = None  # the piece continues into the next file
+
+        locations = set()
+        for (candidate,) in self.db.execute(
+            "SELECT path FROM files WHERE size = ?", (anchor_size,)
+        ):
+            if is_multi_file:
+                if not candidate.endswith(os.sep + anchor_path):
+                    continue
+                base = candidate[: -len(anchor_path) - 1]
+                if os.path.basename(base) == name:
+                    location = (os.path.dirname(base), True)
+                else:
+                    location = (base, False)
+            else:
+                if os.path.basename(candidate) != name:
+                    continue
+                location = (os.path.dirname(candidate), True)
+
+            if expected_hash and (
+                self.get_piece_hash(candidate, piece_length) != expected_hash
+            ):
+                continue
+            locations.add(location)
+
+        matches = []
+        for destination_path, add_name_to_folder in locations:
+            if is_multi_file and add_name_to_folder:
+                base = os.path.join(destination_path, name)
+            else:
+                base = destination_path
+            if is_multi_file:
+                paths = [os.path.join(base, path) for path, _, _ in files]
+            else:
+                paths = [os.path.join(base, name)]
+            sizes = self.get_file_sizes(paths)
+
+            found_files, missing_files, found_size, missing_size = 0, 0, 0, 0
+            for path, (_, size, _) in zip(paths, files):
+                if sizes.get(path) == size:
+                    found_files += 1
+                    found_size += size
+                else:
+                    missing_files += 1
+                    missing_size += size
+            matches.append(
+                ContentMatch(
+                    Path(destination_path),
+                    add_name_to_folder,
+                    found_files,
+                    missing_files,
+                    found_size,
+                    missing_size,
+                )
+            )
+
+        return sorted(matches, key=lambda match: match.found_size, reverse=True)
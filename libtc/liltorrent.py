@@ -43,18 +43,25 @@ def handle_exception(view_function):
     return decorated_function
 
 
+def get_list_kwargs():
+    fields = request.args.get("fields")
+    if fields is None:
+        return {}
+    return {"fields": [field for field in fields.split(",") if field]}
+
+
 @app.route("/list")
 @require_apikey
 def list():
     client = get_client()
-    return jsonify([t.serialize() for t in client.list()])
+    return jsonify([t.serialize() for t in client.list(**get_list_kwargs())])
 
 
 @app.route("/list_active")
 @require_apikey
 def list_active():
     client = get_client()
-    return jsonify([t.serialize() for t in client.list_active()])
+    return jsonify([t.serialize() for t in client.list_active(**get_list_kwargs())])
 
 
 @app.route("/start", methods=["POST"])
@@ -73,6 +80,20 @@ def stop():
     return jsonify({})
 
 
+@app.route("/start_many", methods=["POST"])
+@require_apikey
+def start_many():
+    client = get_client()
+    return jsonify(client.start_many(request.form.getlist("infohash")))
+
+
+@app.route("/stop_many", methods=["POST"])
+@require_apikey
+def stop_many():
+    client = get_client()
+    return jsonify(client.stop_many(request.form.getlist("infohash")))
+
+
 @app.route("/test_connection")
 @require_apikey
 def test_connection():
@@ -85,10 +106,12 @@ def test_connection():
 def add():
     client = get_client()
     destination_path = Path(request.args.get("destination_path"))
-    fast_resume = request.args.get("fast_resume") == "true"
+    fast_resume = {"true": True, "verify": "verify"}.get(
+        request.args.get("fast_resume"), False
+    )
     add_name_to_folder = request.args.get("add_name_to_folder") == "true"
     stopped = request.args.get("stopped") == "true"
-    torrent = bdecode(request.files["torrent"].read())
+    torrent = bdecode(request.files["torrent"].read(), lazy=True)
     client.add(
         torrent,
         destination_path,
@@ -108,6 +131,13 @@ def remove():
     return jsonify({})
 
 
+@app.route("/remove_many", methods=["POST"])
+@require_apikey
+def remove_many():
+    client = get_client()
+    return jsonify(client.remove_many(request.form.getlist("infohash")))
+
+
 @app.route("/retrieve_torrentfile")
 @require_apikey
 def retrieve_torrentfile():
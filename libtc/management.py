@@ -1,38 +1,73 @@
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from .bencode import BTFailure, bdecode
 from .exceptions import FailedToExecuteException
 from .torrent import TorrentState
+from .utils import MoveJournal
 
 logger = logging.getLogger(__name__)
 
 
-def move_torrent(
-    infohash, source_client, target_client, fast_resume=False
-):  # TODO: preserver start/stop
-    source_client.test_connection()
-    target_client.test_connection()
+class MoveTorrentResult:
+    __slots__ = (
+        "infohash",
+        "status",
+        "error",
+        "duration",
+    )
 
-    for source_torrent in source_client.list():
-        if source_torrent.infohash == infohash:
-            break
-    else:
+    def __init__(self, infohash, status, error=None, duration=0.0):
+        self.infohash = infohash
+        self.status = status
+        self.error = error
+        self.duration = duration
+
+    @property
+    def moved(self):
+        return self.status == "moved"
+
+    def __repr__(self):
+        return f"MoveTorrentResult(infohash={self.infohash!r}, status={self.status!r}, error={self.error!r})"
+
+
+def call_client(client, method, *args, **kwargs):
+    return getattr(client, method)(*args, **kwargs)
+
+
+def transfer_torrent(
+    infohash,
+    source_torrent,
+    target_infohashes,
+    source_client,
+    target_client,
+    fast_resume=False,
+    call=call_client,
+):
+    """
+    Moves a torrent when the torrents on both clients are already known,
+    every client method is called through call.
+    """
+    if source_torrent is None:
         raise FailedToExecuteException(f"Infohash {infohash} was not found on source")
 
-    target_torrents = target_client.list()
-    if any(t for t in target_torrents if t.infohash == infohash):
+    if infohash in target_infohashes:
         raise FailedToExecuteException(f"Infohash {infohash} was found on target")
 
     if source_torrent.state == TorrentState.ERROR:
         raise FailedToExecuteException("Cannot move a torrent in an error state")
 
     try:
-        torrent_data = bdecode(source_client.retrieve_torrentfile(infohash))
+        torrent_data = bdecode(
+            call(source_client, "retrieve_torrentfile", infohash), lazy=True
+        )
     except BTFailure:
         raise FailedToExecuteException("Unable to decode retrieved torrent")
 
     # if multifile and path ends with 'name', add without skip_name, otherwise add with name and path trimmed
-    download_path = source_client.get_download_path(infohash)
+    download_path = call(source_client, "get_download_path", infohash)
     if (
         b"files" in torrent_data[b"info"]
         and download_path.name == torrent_data[b"info"][b"name"].decode()
@@ -43,9 +78,11 @@ def move_torrent(
         add_name_to_folder = False
 
     if source_torrent.state == TorrentState.ACTIVE:
-        source_client.stop(infohash)
+        call(source_client, "stop", infohash)
     try:
-        target_client.add(
+        call(
+            target_client,
+            "add",
             torrent_data,
             download_path,
             fast_resume=fast_resume,
@@ -56,7 +93,100 @@ def move_torrent(
     except FailedToExecuteException:
         logger.exception("Failed to add torrent to the new client")
         if source_torrent.state == TorrentState.ACTIVE:
-            source_client.start(infohash)
+            call(source_client, "start", infohash)
         raise FailedToExecuteException("Failed to add torrent to new client")
 
-    source_client.remove(infohash)
+    call(source_client, "remove", infohash)
+
+
+def move_torrent(infohash, source_client, target_client, fast_resume=False):
+    source_client.test_connection()
+    target_client.test_connection()
+
+    for source_torrent in source_client.list():
+        if source_torrent.infohash == infohash:
+            break
+    else:
+        source_torrent = None
+
+    target_infohashes = {t.infohash for t in target_client.list()}
+    transfer_torrent(
+        infohash,
+        source_torrent,
+        target_infohashes,
+        source_client,
+        target_client,
+        fast_resume=fast_resume,
+    )
+
+
+def move_torrents(
+    infohashes,
+    source_client,
+    target_client,
+    fast_resume=False,
+    concurrency=4,
+    journal_path=None,
+):
+    """
+    Moves many torrents from source_client to target_client and returns
+    a MoveTorrentResult for every infohash.
+
+    The torrents on both clients are listed once. concurrency torrents are
+    moved at the same time, while a client is only called by one of them at a time,
+    so one torrent can be added to the target while the next is retrieved from the source.
+
+    journal_path: file that records moved torrents, a migration that was
+      interrupted can be run again with the same journal and skips them
+    """
+    source_client.test_connection()
+    target_client.test_connection()
+
+    source_torrents = {t.infohash: t for t in source_client.list(fields=["state"])}
+    target_infohashes = {t.infohash for t in target_client.list(fields=[])}
+
+    locks = {id(client): threading.Lock() for client in (source_client, target_client)}
+
+    def call(client, method, *args, **kwargs):
+        with locks[id(client)]:
+            return getattr(client, method)(*args, **kwargs)
+
+    journal = journal_path and MoveJournal(journal_path)
+
+    def move(infohash):
+        if journal and infohash in journal:
+            return MoveTorrentResult(infohash, "skipped")
+
+        start = time.monotonic()
+        try:
+            transfer_torrent(
+                infohash,
+                source_torrents.get(infohash),
+                target_infohashes,
+                source_client,
+                target_client,
+                fast_resume=fast_resume,
+                call=call,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to move {infohash}: {e!r}")
+            return MoveTorrentResult(
+                infohash, "failed", str(e), time.monotonic() - start
+            )
+
+        if journal:
+            journal.add(infohash)
+        logger.info(f"Moved {infohash}")
+        return MoveTorrentResult(infohash, "moved", duration=time.monotonic() - start)
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(move, infohashes))
+    finally:
+        if journal:
+            journal.close()
+
+    if journal and all(result.status != "failed" for result in results):
+        journal.path.unlink()
+
+    return results
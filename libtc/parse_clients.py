@@ -1,4 +1,4 @@
-from .clients import TORRENT_CLIENT_MAPPING, parse_libtc_url
+from .clients import get_client_mapping, parse_libtc_url
 
 
 def parse_clients_from_toml_dict(toml_dict):
@@ -11,7 +11,7 @@ def parse_clients_from_toml_dict(toml_dict):
             client = parse_libtc_url(client_url)
         else:
             client_type = config.pop("client_type")
-            client_cls = TORRENT_CLIENT_MAPPING[client_type]
+            client_cls = get_client_mapping()[client_type]
             client = client_cls(**config)
         clients[name] = {
             "display_name": display_name,
@@ -0,0 +1,218 @@
+"""
+Places existing files in the layout a torrent expects without copying the data,
+e.g. to cross-seed the same content from a torrent with another layout.
+"""
+
+import errno
+import logging
+import os
+from pathlib import Path
+
+from .torrent import TorrentFile
+from .utils import copy_file, get_relative_file_path, map_existing_files
+from .verify import verify_file
+
+logger = logging.getLogger(__name__)
+
+# ioctl that makes a file share the data of another file, Linux only
+FICLONE = 0x40049409
+
+# Errors that mean a file cannot be placed with a method but maybe with the next one
+UNSUPPORTED_PLACEMENT_ERRORS = (
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EMLINK,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOSYS,
+)
+
+PLACEMENT_METHODS = ["reflink", "hardlink", "copy"]
+
+
+class PlacementResult:
+    __slots__ = (
+        "placed",
+        "existing",
+        "missing",
+    )
+
+    def __init__(self, placed, existing, missing):
+        self.placed = placed
+        self.existing = existing
+        self.missing = missing
+
+    def __repr__(self):
+        return f"PlacementResult(placed={len(self.placed)}, existing={len(self.existing)}, missing={len(self.missing)})"
+
+
+def reflink_file(source_file, target_file):
+    import fcntl
+
+    source_fd = os.open(source_file, os.O_RDONLY)
+    try:
+        target_fd = os.open(target_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(target_fd, FICLONE, source_fd)
+        except OSError:
+            os.close(target_fd)
+            os.unlink(target_file)
+            raise
+        os.close(target_fd)
+    finally:
+        os.close(source_fd)
+
+
+def place_file(source_file, target_file, methods=PLACEMENT_METHODS):
+    """
+    Places source_file at target_file with the first of methods that works,
+    returns the method used.
+    """
+    for method in methods:
+        try:
+            if method == "reflink":
+                reflink_file(source_file, target_file)
+            elif method == "hardlink":
+                os.link(source_file, target_file)
+            elif method == "copy":
+                copy_file(Path(source_file), Path(target_file))
+            else:
+                raise ValueError(f"Unknown placement method {method!r}")
+        except ImportError:  # no fcntl
+            continue
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_PLACEMENT_ERRORS:
+                raise
+            logger.debug(f"Unable to {method} {source_file!r}: {e!r}")
+            continue
+        return method
+    raise OSError(
+        errno.EOPNOTSUPP, f"Unable to place file with any of {methods!r}", target_file
+    )
+
+
+def scan_files(path):
+    """Returns all files in path as TorrentFile relative to path."""
+    files = []
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            files.append(
+                TorrentFile(
+                    os.path.relpath(file_path, path), os.path.getsize(file_path), 100.0
+                )
+            )
+    return files
+
+
+def match_files(target_files, source_files):
+    """
+    Matches the files of a torrent with source files of the same size
+    and the same path, or else the same name.
+
+    target_files is a list of (path, size) and source_files a list of TorrentFile,
+    returns the matching source file, or None, for every target file and
+    the source files that were not matched by size.
+    """
+    candidates = {}
+    for f in source_files:
+        candidates.setdefault(f.size, []).append(f)
+
+    matches = []
+    for path, size in target_files:
+        path = Path(path)
+        sized = candidates.get(size, [])
+        match = None
+        for f in sized:
+            if Path(f.path) == path:
+                match = f
+                break
+        else:
+            for f in sized:
+                if Path(f.path).name == path.name:
+                    match = f
+                    break
+        if match is not None:
+            sized.remove(match)
+        matches.append(match)
+    return matches, candidates
+
+
+def find_verified_file(torrent, source_path, candidates, offset, size):
+    """
+    Returns the first of candidates with the data of the torrent file at offset,
+    checked against the pieces entirely inside the file.
+    Files without such a piece cannot be checked and are never returned.
+    """
+    for f in candidates:
+        result = verify_file(torrent, source_path / f.path, offset, size)
+        if result.checked and result.ok:
+            return f
+    return None
+
+
+def place_torrent(
+    torrent,
+    source_path,
+    destination_path,
+    source_files=None,
+    add_name_to_folder=True,
+    methods=PLACEMENT_METHODS,
+):
+    """
+    Places the files of a torrent in destination_path from matching files in source_path.
+
+    source_files: files in source_path as TorrentFile, e.g. from get_files of
+      the torrent that has the data, all files in source_path by default
+    methods: placement methods to try in order, reflink shares the data
+      without a link, hardlink needs the same filesystem and copy always works
+
+    Source files are matched by size and path or name. A source file that
+    only matches by size is placed if its pieces match the torrent.
+    Files that already exist with the right size are left alone and
+    files that exist with another size are reported as missing.
+    Afterwards the torrent can be added with destination_path and add_name_to_folder.
+    """
+    source_path = Path(source_path)
+    destination_path = Path(destination_path)
+    if source_files is None:
+        source_files = scan_files(source_path)
+
+    files = map_existing_files(
+        torrent, destination_path, add_name_to_folder=add_name_to_folder
+    )
+    for fp, _, _, _ in files:  # nothing is placed if a path leaves destination_path
+        get_relative_file_path(os.path.relpath(fp, destination_path))
+    existing, needed, offset = [], [], 0
+    for fp, f, size, exists in files:
+        if exists:
+            existing.append(fp)
+        else:
+            needed.append((fp, f, size, offset))
+        offset += size
+    matches, unmatched = match_files(
+        [(f, size) for _, f, size, _ in needed], source_files
+    )
+
+    placed, missing = [], []
+    for (fp, f, size, offset), match in zip(needed, matches):
+        if os.path.lexists(fp):  # never replace other data
+            missing.append(fp)
+            continue
+        if match is None:
+            match = find_verified_file(
+                torrent, source_path, unmatched.get(size, []), offset, size
+            )
+            if match is None:
+                missing.append(fp)
+                continue
+            unmatched[size].remove(match)
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        method = place_file(
+            source_path / get_relative_file_path(match.path), fp, methods
+        )
+        logger.debug(f"Placed {fp!r} with {method}")
+        placed.append((fp, method))
+
+    return PlacementResult(placed, existing, missing)
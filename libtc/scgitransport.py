@@ -18,9 +18,10 @@ License:
     The license only applies to THIS file.
 """
 
+import asyncio
 import socket
-from io import BytesIO
-from xmlrpc.client import Transport
+import threading
+from xmlrpc.client import ExpatParser, Transport, Unmarshaller
 
 
 def encode_netstring(input):
@@ -31,41 +32,357 @@ def encode_header(key, value):
     return key + b"\x00" + value + b"\x00"
 
 
+def create_connection(address):
+    if isinstance(address, str):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # The header and body of a request are sent separately
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    try:
+        s.connect(address)
+    except OSError:
+        s.close()
+        raise
+    return s
+
+
+def is_connection_alive(s):
+    """Check if the other end of an idle connection has hung up."""
+    try:
+        return s.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) != b""
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+
+
+class SCGIConnectionPool:
+    """
+    Keeps a bounded number of idle connections per address around for reuse.
+
+    An address is either a socket path or a (host, port) tuple.
+    Servers that close the connection after every reply, like rTorrent normally does,
+    are detected and then get one connection per request.
+    """
+
+    def __init__(self, max_connections=4):
+        self.max_connections = max_connections
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}
+        self._no_keep_alive = set()
+        self._lock = threading.Lock()
+
+    def get(self, address):
+        """Returns a tuple of connection and if it was reused."""
+        with self._lock:
+            idle = self._idle.get(address, [])
+            while idle:
+                s = idle.pop()
+                if is_connection_alive(s):
+                    self.hits += 1
+                    return s, True
+                s.close()
+                self._no_keep_alive.add(address)
+            self.misses += 1
+        return create_connection(address), False
+
+    def put(self, address, s):
+        with self._lock:
+            if address not in self._no_keep_alive:
+                idle = self._idle.setdefault(address, [])
+                if len(idle) < self.max_connections:
+                    idle.append(s)
+                    return
+        s.close()
+
+    def discard(self, address, s):
+        """Throw away a connection the server closed while we were using it."""
+        s.close()
+        with self._lock:
+            self._no_keep_alive.add(address)
+
+    @property
+    def open_connections(self):
+        with self._lock:
+            return sum(len(idle) for idle in self._idle.values())
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "open": self.open_connections,
+        }
+
+    def close(self):
+        with self._lock:
+            for idle in self._idle.values():
+                for s in idle:
+                    s.close()
+            self._idle = {}
+
+
+def parse_headers(header_data):
+    headers = {}
+    for line in header_data.split(b"\r\n"):
+        key, sep, value = line.partition(b":")
+        if sep:
+            headers[key.strip().lower()] = value.strip()
+    return headers
+
+
+def read_response(s, chunk_size=65536):
+    """
+    Reads a SCGI response from a socket.
+
+    The response is received straight into a growing bytearray and the body is
+    returned as a memoryview into it, together with if the connection can be used
+    for another request. A connection is only reusable when the server tells the
+    length of the body.
+    """
+    buf = bytearray(chunk_size)
+    size = 0
+    header_end = -1
+    while header_end == -1:
+        if size == len(buf):
+            buf[size:] = bytes(len(buf))
+        n = s.recv_into(memoryview(buf)[size:])
+        if not n:
+            return memoryview(b""), False
+        header_end = buf.find(b"\r\n\r\n", max(0, size - 3), size + n)
+        size += n
+
+    body_start = header_end + 4
+    content_length = parse_headers(bytes(buf[:header_end])).get(b"content-length")
+    if content_length is None:
+        while True:
+            if size == len(buf):
+                buf[size:] = bytes(len(buf))
+            n = s.recv_into(memoryview(buf)[size:])
+            if not n:
+                break
+            size += n
+        return memoryview(buf)[body_start:size], False
+
+    response_end = body_start + int(content_length)
+    if response_end > len(buf):
+        buf[len(buf) :] = bytes(response_end - len(buf))
+    while size < response_end:
+        n = s.recv_into(memoryview(buf)[size:response_end])
+        if not n:
+            return memoryview(buf)[body_start:size], False
+        size += n
+    return memoryview(buf)[body_start:response_end], True
+
+
+def iter_response(s, chunk_size=65536):
+    """
+    Yields the body of a SCGI response in chunks as they are received.
+
+    The chunks are memoryviews into a buffer that is reused for the next chunk,
+    so they must be consumed before asking for more.
+    """
+    buf = bytearray(chunk_size)
+    size = 0
+    header_end = -1
+    while header_end == -1:
+        if size == len(buf):
+            buf[size:] = bytes(len(buf))
+        n = s.recv_into(memoryview(buf)[size:])
+        if not n:
+            return
+        header_end = buf.find(b"\r\n\r\n", max(0, size - 3), size + n)
+        size += n
+
+    remaining = parse_headers(bytes(buf[:header_end])).get(b"content-length")
+    if remaining is not None:
+        remaining = int(remaining)
+    chunk = memoryview(buf)[header_end + 4 : size]
+    while remaining is None or remaining > 0:
+        if not chunk:
+            n = s.recv_into(buf)
+            if not n:
+                return
+            chunk = memoryview(buf)[:n]
+        if remaining is not None:
+            chunk = chunk[:remaining]
+            remaining -= len(chunk)
+        yield chunk
+        chunk = None
+
+
+async def async_open_connection(address):
+    if isinstance(address, str):
+        return await asyncio.open_unix_connection(address)
+    return await asyncio.open_connection(*address)
+
+
+async def async_iter_response(reader, chunk_size=65536):
+    """Yields the body of a SCGI response in chunks as they are received."""
+    try:
+        header_data = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return
+    remaining = parse_headers(header_data).get(b"content-length")
+    if remaining is not None:
+        remaining = int(remaining)
+
+    while remaining is None or remaining > 0:
+        if remaining is None:
+            chunk = await reader.read(chunk_size)
+        else:
+            chunk = await reader.read(min(chunk_size, remaining))
+            remaining -= len(chunk)
+        if not chunk:
+            return
+        yield chunk
+
+
+class MulticallUnmarshaller(Unmarshaller):
+    """
+    Unmarshaller for a multicall result that takes every row out
+    as soon as it is parsed instead of building the complete result.
+    """
+
+    def __init__(self):
+        Unmarshaller.__init__(self)
+        self.rows = []
+
+    def end_array(self, data):
+        Unmarshaller.end_array(self, data)
+        if len(self._marks) == 1:
+            self.rows.append(self._stack.pop())
+
+    dispatch = dict(Unmarshaller.dispatch)
+    dispatch["array"] = end_array
+
+    def pop_rows(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
 class SCGITransport(Transport):
     def __init__(self, *args, **kwargs):
         self.socket_path = kwargs.pop("socket_path", "")
+        self.chunk_size = kwargs.pop("chunk_size", 65536)
+        pool = kwargs.pop("pool", None)
+        max_connections = kwargs.pop("max_connections", 4)
+        self.pool = pool or SCGIConnectionPool(max_connections)
         Transport.__init__(self, *args, **kwargs)
 
+    def get_address(self, host):
+        if self.socket_path:
+            return self.socket_path
+        host, port = host.split(":")
+        return (host, int(port))
+
+    def build_header(self, handler, content_length):
+        header = encode_header(b"CONTENT_LENGTH", str(content_length).encode())
+        header += encode_header(b"SCGI", b"1")
+        header += encode_header(b"REQUEST_METHOD", b"POST")
+        header += encode_header(b"REQUEST_URI", handler.encode())
+        return encode_netstring(header)
+
+    def build_request(self, handler, request_body):
+        return self.build_header(handler, len(request_body)) + request_body
+
     def single_request(self, host, handler, request_body, verbose=False):
         self.verbose = verbose
-        if self.socket_path:
-            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            s.connect(self.socket_path)
+        address = self.get_address(host)
+        header = self.build_header(handler, len(request_body))
+
+        while True:
+            s, reused = self.pool.get(address)
+            try:
+                # The body is sent on its own so it is not copied behind the header
+                s.sendall(header)
+                s.sendall(request_body)
+                response_body, reusable = read_response(s, self.chunk_size)
+            except OSError:
+                if not reused:
+                    s.close()
+                    raise
+                self.pool.discard(address, s)
+                continue
+
+            if reused and not response_body:
+                self.pool.discard(address, s)
+                continue
+            break
+
+        if reusable:
+            self.pool.put(address, s)
         else:
-            host, port = host.split(":")
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((host, int(port)))
+            s.close()
 
-        request = encode_header(b"CONTENT_LENGTH", str(len(request_body)).encode())
-        request += encode_header(b"SCGI", b"1")
-        request += encode_header(b"REQUEST_METHOD", b"POST")
-        request += encode_header(b"REQUEST_URI", handler.encode())
+        return self.parse_body(response_body)
 
-        request = encode_netstring(request)
-        request += request_body
+    def parse_body(self, body):
+        p, u = self.getparser()
+        p.feed(body)
+        p.close()
+        return u.close()
 
-        s.send(request)
+    def stream_rows(self, host, handler, request_body):
+        """
+        Send a multicall request and yield the rows of the result while
+        the response is still being received.
 
-        response = b""
-        while True:
-            r = s.recv(1024)
-            if not r:
-                break
-            response += r
+        The connection is not pooled as the caller might not consume all rows.
+        """
+        s = create_connection(self.get_address(host))
+        try:
+            s.sendall(self.build_request(handler, request_body))
+            unmarshaller = MulticallUnmarshaller()
+            parser = ExpatParser(unmarshaller)
+            for chunk in iter_response(s, self.chunk_size):
+                parser.feed(chunk)
+                yield from unmarshaller.pop_rows()
+            parser.close()
+            unmarshaller.close()
+            yield from unmarshaller.pop_rows()
+        finally:
+            s.close()
+
+    async def _async_send(self, host, handler, request_body):
+        reader, writer = await async_open_connection(self.get_address(host))
+        writer.write(self.build_request(handler, request_body))
+        await writer.drain()
+        return reader, writer
+
+    async def async_request(self, host, handler, request_body):
+        """Send a request with asyncio and return the parsed response."""
+        reader, writer = await self._async_send(host, handler, request_body)
+        try:
+            p, u = self.getparser()
+            async for chunk in async_iter_response(reader, self.chunk_size):
+                p.feed(chunk)
+            p.close()
+            return u.close()
+        finally:
+            writer.close()
 
-        response_body = BytesIO(b"\r\n\r\n".join(response.split(b"\r\n\r\n")[1:]))
+    async def async_stream_rows(self, host, handler, request_body):
+        """Same as `stream_rows` but with asyncio."""
+        reader, writer = await self._async_send(host, handler, request_body)
+        try:
+            unmarshaller = MulticallUnmarshaller()
+            parser = ExpatParser(unmarshaller)
+            async for chunk in async_iter_response(reader, self.chunk_size):
+                parser.feed(chunk)
+                for row in unmarshaller.pop_rows():
+                    yield row
+            parser.close()
+            unmarshaller.close()
+            for row in unmarshaller.pop_rows():
+                yield row
+        finally:
+            writer.close()
 
-        return self.parse_response(response_body)
+    def close(self):
+        self.pool.close()
+        Transport.close(self)
 
 
 if not hasattr(Transport, "single_request"):
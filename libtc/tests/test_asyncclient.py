@@ -0,0 +1,112 @@
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from libtc import (
+    AsyncClient,
+    AsyncRTorrentClient,
+    FailedToExecuteException,
+    RTorrentClient,
+    TorrentState,
+    make_async_client,
+)
+from libtc.clients.tests import utils_testclient
+
+from .test_liltorrent import TORRENT_LIST
+from .utils_scgiserver import SCGIServer
+
+
+@pytest.fixture
+def scgi_server():
+    with tempfile.TemporaryDirectory() as tmp_path:
+        server = SCGIServer(Path(tmp_path) / "rpc.socket", False)
+        yield server
+        server.close()
+
+
+def test_async_client():
+    client = utils_testclient.TestClient()
+    client._inject_torrent(TORRENT_LIST[0], [], Path("/download/path"))
+    async_client = make_async_client(client)
+    assert isinstance(async_client, AsyncClient)
+
+    async def run():
+        assert await async_client.test_connection()
+        assert await async_client.list() == [TORRENT_LIST[0]]
+        await async_client.stop(TORRENT_LIST[0].infohash)
+        with pytest.raises(FailedToExecuteException):
+            await async_client.stop("b" * 40)
+
+    asyncio.run(run())
+    assert client._action_queue == [("stop", {"infohash": TORRENT_LIST[0].infohash})]
+
+
+def test_async_client_serializes_calls():
+    client = utils_testclient.TestClient()
+    running, max_running = 0, 0
+
+    def list(fields=None):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        time.sleep(0.05)
+        running -= 1
+        return []
+
+    client.list = list
+    async_client = make_async_client(client, ThreadPoolExecutor(4))
+
+    async def run():
+        await asyncio.gather(*[async_client.list() for _ in range(4)])
+
+    asyncio.run(run())
+    asyncio.run(run())
+    assert max_running == 1
+
+
+def test_async_rtorrent_client(scgi_server):
+    def multicall(target, view, *commands):
+        return [
+            [
+                f"{i:040X}",
+                f"torrent {i}",
+                1000,
+                1,
+                "",
+                1000,
+                100,
+                1590000000,
+                [],
+                10,
+                0,
+                "",
+            ]
+            for i in range(10)
+        ]
+
+    scgi_server.dispatcher.register_function(multicall, "d.multicall2")
+    scgi_server.dispatcher.register_function(
+        lambda infohash, target, *commands: [["file.txt", 10, 1, 1]], "f.multicall"
+    )
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+    async_client = make_async_client(client)
+    assert isinstance(async_client, AsyncRTorrentClient)
+
+    async def run():
+        return await asyncio.gather(
+            async_client.test_connection(),
+            async_client.list(),
+            async_client.get_files("a" * 40),
+        )
+
+    connected, torrents, files = asyncio.run(run())
+    assert connected
+    assert len(torrents) == 10
+    assert torrents[0].infohash == "0" * 40
+    assert torrents[0].state == TorrentState.ACTIVE
+    assert files[0].path == "file.txt"
+    assert files[0].progress == 100.0
@@ -0,0 +1,148 @@
+from io import BytesIO
+
+import pytest
+
+from libtc import BTFailure, bdecode, bencode
+from libtc.bencode import Bencached, bencode_into, iterencode
+
+
+def test_bdecode():
+    data = {
+        b"announce": b"http://example.com/announce",
+        b"info": {
+            b"files": [
+                {b"length": 0, b"path": [b"a" * 9, b"b" * 10]},
+                {b"length": -12, b"path": [b"c" * 99, b"d" * 100, b""]},
+            ],
+            b"name": b"test",
+        },
+        b"list": [1, b"", [], {}, [[b"x"]]],
+    }
+    assert bdecode(bencode(data)) == data
+    assert bdecode(b"i-5e") == -5
+    assert bdecode(b"4:spam") == b"spam"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"i01e",
+        b"i-0e",
+        b"l01:ae",
+        b"d1:ai1e",
+        b"d1:ai01ee",
+        b"di1ei1ee",
+        b"lxe",
+        b"l1e",
+        b"d1e",
+        b"i1ei2e",
+        b"ie",
+        b"i-e",
+        b"i08e",
+        b"i--5e",
+        b"i8-5e",
+        b"03:abc",
+        b"00:",
+        b"li08ee",
+        b"l03:abce",
+        b"l00:e",
+        b"d1:aiee",
+        b"d1:ai--5ee",
+        b"d1:a03:abce",
+        b"d1:ali8-5eee",
+        b"d1:ad1:b00:ee",
+    ],
+)
+@pytest.mark.parametrize("lazy", [False, True])
+def test_bdecode_invalid(data, lazy):
+    with pytest.raises(BTFailure):
+        bdecode(data, lazy=lazy)
+
+
+def test_bdecode_lazy():
+    data = {
+        b"announce": b"http://example.com/announce",
+        b"info": {
+            b"files": [{b"length": 10, b"path": [b"a", b"b"]}],
+            b"name": b"test",
+            b"pieces": b"x" * 20000,
+        },
+    }
+    encoded = bencode(data)
+    torrent = bdecode(encoded, lazy=True)
+    assert torrent == data
+    assert isinstance(torrent[b"info"][b"pieces"], memoryview)
+    assert torrent[b"info"][b"pieces"].obj is encoded
+    assert torrent[b"info"][b"files"][0][b"path"] == [b"a", b"b"]
+    assert bytes(torrent[b"info"].raw()) == bencode(data[b"info"])
+    assert bencode(torrent) == encoded
+    assert bencode({**torrent, b"comment": b"c"}) == bencode({**data, b"comment": b"c"})
+
+    with pytest.raises(BTFailure):
+        bdecode(encoded[:-1], lazy=True)
+    with pytest.raises(BTFailure):
+        bdecode(b"d1:ai01ee", lazy=True)[b"a"]
+
+
+def test_iterencode():
+    data = {
+        b"info": {b"name": b"test", b"pieces": b"x" * 100000},
+        b"files": [{b"length": i, b"path": [b"a", b"b" * i]} for i in range(2000)],
+    }
+    encoded = bencode(data)
+    chunks = list(iterencode(data))
+    assert b"".join(chunks) == encoded
+    assert data[b"info"][b"pieces"] in chunks
+
+    lazy_data = bdecode(encoded, lazy=True)
+    assert b"".join(iterencode(lazy_data)) == encoded
+    assert b"".join(iterencode({**lazy_data})) == encoded
+
+    fileobj = BytesIO()
+    bencode_into(data, fileobj)
+    assert fileobj.getvalue() == encoded
+
+
+def test_bdecode_lazy_modify():
+    data = {
+        b"info": {b"name": b"test", b"pieces": b"x" * 20000},
+        b"rtorrent": {b"directory": b"/a", b"state": 1},
+        b"trackers": [[b"http://a"], [b"http://b"]],
+    }
+    torrent = bdecode(bencode(data), lazy=True)
+    assert not torrent.is_modified()
+
+    torrent[b"rtorrent"][b"directory"] = b"/b"
+    torrent[b"trackers"][-1].append(b"http://c")
+    del torrent[b"trackers"][0]
+    torrent[b"libtorrent_resume"] = {b"bitfield": 10}
+    data[b"rtorrent"][b"directory"] = b"/b"
+    data[b"trackers"] = [[b"http://b", b"http://c"]]
+    data[b"libtorrent_resume"] = {b"bitfield": 10}
+
+    assert torrent.is_modified()
+    assert not torrent[b"info"].is_modified()
+    assert torrent == data
+    assert bencode(torrent) == bencode(data)
+    assert b"".join(iterencode(torrent)) == bencode(data)
+
+
+def test_bdecode_bencached():
+    info = bencode({b"name": b"test", b"length": 10})
+    data = b"d8:announce3:url4:info" + info + b"e"
+    torrent = bdecode(data, bencached=[b"info"])
+    assert torrent[b"announce"] == b"url"
+    assert isinstance(torrent[b"info"], Bencached)
+    assert torrent[b"info"].bencoded == info
+    assert bdecode(torrent[b"info"].bencoded) == bdecode(data)[b"info"]
+
+    torrent[b"comment"] = b"added"
+    expected = bdecode(data)
+    expected[b"comment"] = b"added"
+    assert bencode(torrent) == bencode(expected)
+    assert b"".join(iterencode(torrent)) == bencode(torrent)
+
+    assert bdecode(b"l4:infoe", bencached=[b"info"]) == [b"info"]
+    with pytest.raises(BTFailure):
+        bdecode(b"d4:infod4:name", bencached=[b"info"])
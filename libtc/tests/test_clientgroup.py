@@ -0,0 +1,75 @@
+import time
+from pathlib import Path
+
+from libtc import ClientGroup, FailedToExecuteException, TorrentData
+from libtc.clients.tests import utils_testclient
+
+from .test_liltorrent import TORRENT_LIST
+
+
+class SlowClient(utils_testclient.TestClient):
+    def list(self):
+        time.sleep(1)
+        return super().list()
+
+
+class BrokenClient(utils_testclient.TestClient):
+    def list(self):
+        raise FailedToExecuteException("Broken")
+
+
+def test_client_group_list():
+    clients = {}
+    for name, client_cls in [
+        ("working", utils_testclient.TestClient),
+        ("slow", SlowClient),
+        ("broken", BrokenClient),
+    ]:
+        client = client_cls()
+        for t in TORRENT_LIST:
+            t = TorrentData(**{k: getattr(t, k) for k in TorrentData.__slots__})
+            client._inject_torrent(t, [], Path("/download/path"))
+        clients[name] = {"display_name": name, "client": client}
+
+    result = ClientGroup(clients, timeout=0.2).list()
+    assert [(t.client_name, t.infohash) for t in result.torrents] == [
+        ("working", t.infohash) for t in TORRENT_LIST
+    ]
+    assert set(result.errors) == {"slow", "broken"}
+    assert str(result.errors["broken"]) == "Broken"
+    assert set(result.latencies) == {"working", "slow", "broken"}
+    assert result.latencies["working"] < 0.2
+
+
+def test_client_group_timeout_per_client():
+    class SomewhatSlowClient(utils_testclient.TestClient):
+        def list(self):
+            time.sleep(0.1)
+            return super().list()
+
+    clients = {f"client{i}": SomewhatSlowClient() for i in range(3)}
+    result = ClientGroup(clients, timeout=0.3, max_workers=1).list()
+    assert result.errors == {}
+    assert set(result.latencies) == set(clients)
+
+
+def test_client_group_skip_running_call():
+    calls = []
+
+    class CountingSlowClient(SlowClient):
+        def list(self):
+            calls.append(time.monotonic())
+            return super().list()
+
+    group = ClientGroup({"slow": CountingSlowClient()}, timeout=0.1)
+    result = group.list()
+    assert str(result.errors["slow"]) == "Timed out after 0.1 seconds"
+
+    result = group.list()
+    assert str(result.errors["slow"]) == "Previous call is still running"
+    assert len(calls) == 1
+
+    time.sleep(1)
+    result = group.list()
+    assert str(result.errors["slow"]) == "Timed out after 0.1 seconds"
+    assert len(calls) == 2
@@ -0,0 +1,221 @@
+import hashlib
+
+import pytest
+
+from libtc import (
+    DelugeClient,
+    QBittorrentClient,
+    TorrentState,
+    TransmissionClient,
+    bencode,
+)
+
+TORRENT = {
+    b"info": {
+        b"name": b"test.bin",
+        b"length": 10,
+        b"piece length": 16384,
+        b"pieces": b"x" * 20,
+    }
+}
+
+
+class FakeDelugeCore:
+    def __init__(self):
+        self.requested_keys = []
+        self.added = []
+        self.resumed = []
+
+    def resume_torrent(self, torrent_ids):
+        self.resumed.extend(torrent_ids)
+
+    def add_torrent_file(self, filename, filedump, options):
+        self.added.append(options)
+        return hashlib.sha1(bencode(TORRENT[b"info"])).hexdigest()
+
+    def get_torrents_status(self, filter, keys):
+        self.requested_keys.append(keys)
+        status = {
+            "hash": "a" * 40,
+            "name": "torrent a",
+            "total_size": 1000,
+            "state": "Paused",
+            "progress": 100.0,
+            "total_uploaded": 10,
+            "time_added": 1590000000,
+            "tracker_host": "example.com",
+            "upload_payload_rate": 0,
+            "download_payload_rate": 0,
+            "label": "tv",
+        }
+        assert keys, "Deluge returns all keys when asked for none"
+        if "id" in filter and "a" * 40 not in filter["id"]:
+            return {}
+        return {"a" * 40: {key: status[key] for key in keys}}
+
+
+class FakeDelugeRPCClient:
+    def __init__(self, core):
+        self.core = core
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+def test_deluge_list_fields(monkeypatch):
+    core = FakeDelugeCore()
+    monkeypatch.setattr(
+        DelugeClient, "client", property(lambda self: FakeDelugeRPCClient(core))
+    )
+    client = DelugeClient("localhost", 58846, "user", "pass")
+
+    torrents = client.list()
+    assert torrents[0].state == TorrentState.STOPPED
+    assert torrents[0].label == "tv"
+
+    torrents = client.list(fields=[])
+    assert core.requested_keys[-1] == ["hash"]
+    assert torrents[0].infohash == "a" * 40
+    assert not hasattr(torrents[0], "name")
+
+    torrents = client.list(fields=["name", "state"])
+    assert core.requested_keys[-1] == ["hash", "name", "state"]
+    assert torrents[0].name == "torrent a"
+    assert not hasattr(torrents[0], "tracker")
+
+
+def test_transmission_list_fields():
+    requested_fields = []
+
+    def call(method, ids=None, fields=()):
+        assert method == "torrent-get"
+        requested_fields.append(fields)
+        torrent = {
+            "hashString": "a" * 40,
+            "name": "torrent a",
+            "sizeWhenDone": 1000,
+            "status": 6,
+            "error": 0,
+            "percentDone": 1,
+            "uploadedEver": 10,
+            "addedDate": 1590000000,
+            "trackers": [{"announce": "http://tracker.example.com/announce"}],
+            "rateUpload": 0,
+            "rateDownload": 0,
+        }
+        return {"torrents": [{field: torrent[field] for field in fields}]}
+
+    client = TransmissionClient("http://localhost:9091/transmission/rpc")
+    client.call = call
+
+    torrents = client.list()
+    assert torrents[0].state == TorrentState.ACTIVE
+    assert torrents[0].tracker == "example.com"
+
+    torrents = client.list(fields=[])
+    assert requested_fields[-1] == ["hashString"]
+    assert not hasattr(torrents[0], "name")
+
+    torrents = client.list_active(fields=["progress", "state"])
+    assert requested_fields[-1] == ["hashString", "status", "error", "percentDone"]
+    assert torrents[0].progress == 100
+    assert not hasattr(torrents[0], "tracker")
+
+
+@pytest.mark.parametrize(
+    "fast_resume,seed_mode", [(True, True), (False, False), ("verify", False)]
+)
+def test_deluge_add_fast_resume(monkeypatch, tmp_path, fast_resume, seed_mode):
+    core = FakeDelugeCore()
+    monkeypatch.setattr(
+        DelugeClient, "client", property(lambda self: FakeDelugeRPCClient(core))
+    )
+    client = DelugeClient("localhost", 58846, "user", "pass")
+    client.add(TORRENT, tmp_path, fast_resume=fast_resume)
+    assert core.added[-1]["seed_mode"] is seed_mode
+
+
+@pytest.mark.parametrize(
+    "fast_resume,skip_checking",
+    [(True, "true"), (False, "false"), ("verify", "false")],
+)
+def test_qbittorrent_add_fast_resume(tmp_path, fast_resume, skip_checking):
+    calls = []
+    client = QBittorrentClient("http://localhost:8080", "user", "pass")
+    client.call = lambda method, url, **kwargs: calls.append(kwargs)
+    client.add(TORRENT, tmp_path, fast_resume=fast_resume)
+    assert calls[-1]["data"]["skip_checking"] == skip_checking
+
+
+def test_deluge_start_many_uppercase(monkeypatch):
+    core = FakeDelugeCore()
+    monkeypatch.setattr(
+        DelugeClient, "client", property(lambda self: FakeDelugeRPCClient(core))
+    )
+    client = DelugeClient("localhost", 58846, "user", "pass")
+    assert client.start_many(["A" * 40, "b" * 40]) == {"A" * 40: True, "b" * 40: False}
+    assert core.resumed == ["a" * 40]
+
+
+def test_qbittorrent_many_in_chunks(monkeypatch):
+    monkeypatch.setattr("libtc.clients.qbittorrent.MANY_CHUNK_SIZE", 2)
+    calls = []
+
+    class Response:
+        def __init__(self, data):
+            self.data = data
+
+        def json(self):
+            return self.data
+
+    def call(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        hashes = kwargs["data"]["hashes"].split("|")
+        return Response([{"hash": h} for h in hashes if h != "c" * 40])
+
+    client = QBittorrentClient("http://localhost:8080", "user", "pass")
+    client.call = call
+    infohashes = ["A" * 40, "b" * 40, "c" * 40]
+    assert client.stop_many(infohashes) == {
+        "A" * 40: True,
+        "b" * 40: True,
+        "c" * 40: False,
+    }
+    assert [(method, url) for method, url, _ in calls] == [
+        ("post", "/api/v2/torrents/info"),
+        ("post", "/api/v2/torrents/pause"),
+        ("post", "/api/v2/torrents/info"),
+    ]
+    assert calls[0][2] == {"data": {"hashes": "a" * 40 + "|" + "b" * 40}}
+    assert calls[1][2] == {"data": {"hashes": "a" * 40 + "|" + "b" * 40}}
+    assert calls[2][2] == {"data": {"hashes": "c" * 40}}
+
+
+def test_qbittorrent_list_active():
+    calls = []
+
+    class Response:
+        def json(self):
+            return [
+                {
+                    "hash": "a" * 40,
+                    "name": "torrent a",
+                    "state": "stalledUP",
+                    "upspeed": 0,
+                    "dlspeed": 0,
+                }
+            ]
+
+    def call(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        return Response()
+
+    client = QBittorrentClient("http://localhost:8080", "user", "pass")
+    client.call = call
+    torrents = client.list_active(fields=["name", "state"])
+    assert calls == [("get", "/api/v2/torrents/info", {"params": {"filter": "active"}})]
+    assert [(t.infohash, t.name) for t in torrents] == [("a" * 40, "torrent a")]
+    assert torrents[0].state == TorrentState.ACTIVE
@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+from libtc.contentindex import ContentIndex
+
+
+def create_torrent(files, piece_length=1024):
+    data = b"".join(content for _, content in files)
+    return {
+        b"info": {
+            b"name": b"Some.Show.S01",
+            b"piece length": piece_length,
+            b"pieces": b"".join(
+                hashlib.sha1(data[i : i + piece_length]).digest()
+                for i in range(0, len(data), piece_length)
+            ),
+            b"files": [
+                {b"path": path.encode().split(b"/"), b"length": len(content)}
+                for path, content in files
+            ],
+        }
+    }
+
+
+def write_files(path, files):
+    for name, content in files:
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(content)
+
+
+def test_find_torrent(tmp_path):
+    files = [
+        ("Some.Show.S01E01.mkv", os.urandom(3000)),
+        ("Subs/Some.Show.S01E01.srt", os.urandom(100)),
+    ]
+    torrent = create_torrent(files)
+    data_path = tmp_path / "data"
+    write_files(data_path / "tv" / "Some.Show.S01", files)
+    write_files(data_path / "renamed", files[:1])
+    write_files(
+        data_path / "other" / "Some.Show.S01", [(files[0][0], os.urandom(3000))]
+    )
+
+    with ContentIndex(tmp_path / "index.sqlite", [data_path]) as index:
+        index.update()
+        matches = index.find_torrent(torrent)
+        assert [
+            (m.destination_path, m.add_name_to_folder, m.minimum_expected_data)
+            for m in matches
+        ] == [
+            (data_path / "tv", True, "full"),
+            (data_path / "renamed", False, "partial"),
+        ]
+        assert matches[1].found_files == matches[1].missing_files == 1
+
+        assert len(index.find_torrent(torrent, verify=False)) == 3
+
+        write_files(data_path / "renamed", files[1:])
+        (data_path / "tv" / "Some.Show.S01" / files[0][0]).unlink()
+        index.update()
+        matches = index.find_torrent(torrent)
+        assert [(m.destination_path, m.minimum_expected_data) for m in matches] == [
+            (data_path / "renamed", "full")
+        ]
+
+
+def test_update_incremental(tmp_path):
+    data_path = tmp_path / "data"
+    write_files(data_path, [("a/1.bin", b"x"), ("b/2.bin", b"xx")])
+    with ContentIndex(tmp_path / "index.sqlite", [data_path]) as index:
+        index.update()
+        assert index.get_file_sizes([str(data_path / "a" / "1.bin")]) == {
+            str(data_path / "a" / "1.bin"): 1
+        }
+
+    with ContentIndex(tmp_path / "index.sqlite", [data_path]) as index:
+        scanned = []
+        scan_directory = index._scan_directory
+        index._scan_directory = lambda *args: scanned.append(args[0]) or (
+            scan_directory(*args)
+        )
+        index.update()
+        assert scanned == []
+
+        write_files(data_path, [("b/3.bin", b"xxx")])
+        os.rename(data_path / "a", data_path / "c")
+        index.update()
+        assert sorted(scanned) == [
+            str(data_path),
+            str(data_path / "b"),
+            str(data_path / "c"),
+        ]
+        paths = [
+            str(data_path / p) for p in ["a/1.bin", "b/2.bin", "b/3.bin", "c/1.bin"]
+        ]
+        assert index.get_file_sizes(paths) == {
+            paths[1]: 2,
+            paths[2]: 3,
+            paths[3]: 1,
+        }
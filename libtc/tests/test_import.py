@@ -0,0 +1,92 @@
+import subprocess
+import sys
+
+import libtc
+
+HEAVY_MODULES = [
+    "asyncio",
+    "deluge_client",
+    "publicsuffixlist",
+    "pytz",
+    "requests",
+    "tabulate",
+    "xmlrpc.client",
+]
+
+
+def get_imported_modules(code):
+    """Returns the modules imported by running code, as reported by -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and line.count("|") == 2:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def test_import_is_lazy():
+    modules = get_imported_modules("import libtc, libtc.__main__")
+    assert "libtc" in modules
+    for module in HEAVY_MODULES:
+        assert module not in modules
+
+
+def test_import_single_client():
+    modules = get_imported_modules("from libtc import TransmissionClient")
+    assert "requests" in modules
+    assert "libtc.clients.deluge" not in modules
+    assert "deluge_client" not in modules
+
+
+def test_client_mapping():
+    assert sorted(libtc.TORRENT_CLIENT_MAPPING) == [
+        "deluge",
+        "fakeclient",
+        "liltorrent",
+        "qbittorrent",
+        "rtorrent",
+        "transmission",
+    ]
+    for identifier, client_cls in libtc.TORRENT_CLIENT_MAPPING.items():
+        assert client_cls.identifier == identifier
+    assert libtc.DelugeClient is libtc.TORRENT_CLIENT_MAPPING["deluge"]
+
+
+def test_client_mapping_dict_api():
+    mapping = libtc.TORRENT_CLIENT_MAPPING
+    original = mapping.copy()
+    assert type(mapping) is dict
+    assert len(original) == 6
+    assert libtc.clients.TORRENT_CLIENT_MAPPING is mapping
+    try:
+        assert mapping.setdefault("deluge", None) is libtc.DelugeClient
+        mapping["custom"] = mapping.pop("fakeclient")
+        del mapping["deluge"]
+        mapping.update({"other": libtc.FakeClient})
+        assert sorted(libtc.TORRENT_CLIENT_MAPPING) == [
+            "custom",
+            "liltorrent",
+            "other",
+            "qbittorrent",
+            "rtorrent",
+            "transmission",
+        ]
+        clients = libtc.parse_clients_from_toml_dict(
+            {
+                "clients": {
+                    "fake": {"client_type": "custom", "seed": 1, "num_torrents": 1}
+                }
+            }
+        )
+        assert isinstance(clients["fake"]["client"], libtc.FakeClient)
+
+        mapping.clear()
+        assert libtc.TORRENT_CLIENT_MAPPING == {}
+    finally:
+        mapping.clear()
+        mapping.update(original)
@@ -61,10 +61,11 @@ class DummyClient(BaseClient):
     def __init__(self):
         self._call_log = []
 
-    def list(self):
+    def list(self, fields=None):
+        self._call_log.append(("list", fields))
         return TORRENT_LIST
 
-    def list_active(self):
+    def list_active(self, fields=None):
         return [TORRENT_LIST[0]]
 
     def start(self, infohash):
@@ -146,6 +147,8 @@ def test_bad_apikey(client):
 def test_list(client):
     r = client.get("/list", headers=GLOBAL_CONFIG["headers"])
 
+    # Older clients create TorrentData from every key
+    assert all(set(t) == set(TorrentData.list_fields) for t in json.loads(r.data))
     torrents = [TorrentData.unserialize(t) for t in json.loads(r.data)]
     assert len(torrents) == len(TORRENT_LIST)
     for t_1, t_2 in zip(torrents, TORRENT_LIST):
@@ -153,6 +156,15 @@ def test_list(client):
             assert getattr(t_1, key) == getattr(t_2, key)
 
 
+def test_list_fields(client):
+    client.get("/list", headers=GLOBAL_CONFIG["headers"])
+    client.get("/list?fields=name,size", headers=GLOBAL_CONFIG["headers"])
+    assert GLOBAL_CONFIG["client"]._call_log == [
+        ("list", None),
+        ("list", ["name", "size"]),
+    ]
+
+
 def test_list_active(client):
     r = client.get("/list_active", headers=GLOBAL_CONFIG["headers"])
     torrents = [TorrentData.unserialize(t) for t in json.loads(r.data)]
@@ -226,3 +238,26 @@ def test_get_files(client):
     for t_1, t_2 in zip(torrents, TORRENT_FILE_LIST):
         for key in t_1.__slots__:
             assert getattr(t_1, key) == getattr(t_2, key)
+
+
+def test_start_many(client):
+    r = client.post(
+        "/start_many",
+        data={"infohash": ["0123456789abcdef", "fedcba9876543210"]},
+        headers=GLOBAL_CONFIG["headers"],
+    )
+    assert json.loads(r.data) == {"0123456789abcdef": True, "fedcba9876543210": True}
+    assert GLOBAL_CONFIG["client"]._call_log == [
+        ("start", "0123456789abcdef"),
+        ("start", "fedcba9876543210"),
+    ]
+
+
+def test_remove_many(client):
+    r = client.post(
+        "/remove_many",
+        data={"infohash": ["0123456789abcdef"]},
+        headers=GLOBAL_CONFIG["headers"],
+    )
+    assert json.loads(r.data) == {"0123456789abcdef": True}
+    assert GLOBAL_CONFIG["client"]._call_log[0] == ("remove", "0123456789abcdef")
@@ -0,0 +1,207 @@
+from pathlib import Path
+
+from libtc import QBittorrentClient, TorrentData, TransmissionClient
+from libtc.clients.tests import utils_testclient
+
+from .test_liltorrent import TORRENT_LIST
+
+
+def copy_torrent(torrent, **kwargs):
+    data = {k: getattr(torrent, k) for k in TorrentData.__slots__}
+    data.update(kwargs)
+    return TorrentData(**data)
+
+
+def test_list_changes():
+    client = utils_testclient.TestClient()
+    client._inject_torrent(copy_torrent(TORRENT_LIST[0]), [], Path("/"))
+
+    changes = client.list_changes()
+    assert [t.infohash for t in changes.added] == [TORRENT_LIST[0].infohash]
+    assert changes.updated == changes.removed == []
+
+    changes = client.list_changes(changes.token)
+    assert changes.added == changes.updated == changes.removed == []
+
+    client._torrents = {}
+    client._inject_torrent(copy_torrent(TORRENT_LIST[0], uploaded=100), [], Path("/"))
+    client._inject_torrent(copy_torrent(TORRENT_LIST[1]), [], Path("/"))
+    changes = client.list_changes(changes.token)
+    assert [t.infohash for t in changes.added] == [TORRENT_LIST[1].infohash]
+    assert [t.uploaded for t in changes.updated] == [100]
+    assert changes.removed == []
+
+    del client._torrents[TORRENT_LIST[0].infohash]
+    token = changes.token
+    changes = client.list_changes(token)
+    assert changes.removed == [TORRENT_LIST[0].infohash]
+
+    changes = client.list_changes("unknown")
+    assert [t.infohash for t in changes.added] == [TORRENT_LIST[1].infohash]
+
+
+class JSONResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def qbittorrent_torrent(name, **kwargs):
+    torrent = {
+        "name": name,
+        "state": "uploading",
+        "tracker": "",
+        "size": 1000,
+        "progress": 1,
+        "uploaded": 0,
+        "added_on": 1590000000,
+        "upspeed": 0,
+        "dlspeed": 0,
+        "category": "",
+    }
+    torrent.update(kwargs)
+    return torrent
+
+
+def test_qbittorrent_list_changes():
+    responses = [
+        {
+            "rid": 1,
+            "full_update": True,
+            "torrents": {
+                "a" * 40: qbittorrent_torrent("a"),
+                "b" * 40: qbittorrent_torrent("b"),
+            },
+        },
+        {
+            "rid": 2,
+            "torrents": {"a" * 40: {"upspeed": 10}, "c" * 40: qbittorrent_torrent("c")},
+            "torrents_removed": ["b" * 40],
+        },
+    ]
+    rids = []
+
+    def call(method, url, params):
+        assert url == "/api/v2/sync/maindata"
+        rids.append(params["rid"])
+        return JSONResponse(responses.pop(0))
+
+    client = QBittorrentClient("http://localhost:8080/", "admin", "adminadmin")
+    client.call = call
+
+    changes = client.list_changes()
+    assert sorted(t.infohash for t in changes.added) == ["a" * 40, "b" * 40]
+
+    changes = client.list_changes(changes.token)
+    assert [t.infohash for t in changes.added] == ["c" * 40]
+    assert [(t.infohash, t.name, t.upload_rate) for t in changes.updated] == [
+        ("a" * 40, "a", 10)
+    ]
+    assert changes.removed == ["b" * 40]
+    assert changes.token == "2"
+    assert rids == [0, 1]
+
+
+def test_qbittorrent_sync_list():
+    responses = [
+        {
+            "rid": 1,
+            "full_update": True,
+            "torrents": {
+                "a" * 40: qbittorrent_torrent("a"),
+                "b" * 40: qbittorrent_torrent("b"),
+            },
+        },
+        {"rid": 2, "torrents": {"b" * 40: {"dlspeed": 10}}},
+        {"rid": 3, "torrents_removed": ["a" * 40]},
+        {
+            "rid": 4,
+            "full_update": True,
+            "torrents": {"c" * 40: qbittorrent_torrent("c")},
+        },
+    ]
+    client = QBittorrentClient("http://localhost:8080/", "admin", "adminadmin")
+    client.call = lambda method, url, params: JSONResponse(responses.pop(0))
+
+    assert sorted(t.infohash for t in client.list()) == ["a" * 40, "b" * 40]
+    token = client._sync.token
+    assert [t.download_rate for t in client.list() if t.infohash == "b" * 40] == [10]
+
+    changes = client.list_changes(token)
+    assert changes.added == []
+    assert [t.infohash for t in changes.updated] == ["b" * 40]
+    assert changes.removed == ["a" * 40]
+
+    changes = client.list_changes(changes.token)
+    assert [t.infohash for t in changes.added] == ["c" * 40]
+    assert changes.removed == ["b" * 40]
+
+
+def transmission_torrent(tid, name, **kwargs):
+    torrent = {
+        "id": tid,
+        "hashString": name * 40,
+        "name": name,
+        "sizeWhenDone": 1000,
+        "status": 6,
+        "error": 0,
+        "percentDone": 1,
+        "uploadedEver": 0,
+        "addedDate": 1590000000,
+        "trackers": [],
+        "rateUpload": 0,
+        "rateDownload": 0,
+    }
+    torrent.update(kwargs)
+    return torrent
+
+
+def test_transmission_list_changes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("libtc.clients.transmission.time.monotonic", lambda: now[0])
+    responses = [
+        {"torrents": [transmission_torrent(1, "a"), transmission_torrent(2, "b")]},
+        {
+            "torrents": [
+                transmission_torrent(1, "a", rateUpload=10),
+                transmission_torrent(3, "c"),
+            ],
+            "removed": [2, 4],
+        },
+        {"torrents": [transmission_torrent(1, "a", rateUpload=10)]},
+        {"torrents": [transmission_torrent(1, "a")]},
+    ]
+    calls = []
+
+    def call(method, ids=None, fields=()):
+        assert method == "torrent-get"
+        assert "id" in fields
+        calls.append(ids)
+        return responses.pop(0)
+
+    client = TransmissionClient("http://localhost:9091/transmission/rpc")
+    client.call = call
+
+    changes = client.list_changes()
+    assert sorted(t.infohash for t in changes.added) == ["a" * 40, "b" * 40]
+    assert changes.updated == changes.removed == []
+
+    now[0] += 30
+    changes = client.list_changes(changes.token)
+    assert [t.infohash for t in changes.added] == ["c" * 40]
+    assert [(t.infohash, t.upload_rate) for t in changes.updated] == [("a" * 40, 10)]
+    assert changes.removed == ["b" * 40]
+
+    # Outside the recently active window everything is listed and compared
+    now[0] += 61
+    changes = client.list_changes(changes.token)
+    assert changes.added == changes.updated == []
+    assert changes.removed == ["c" * 40]
+
+    changes = client.list_changes("unknown")
+    assert [t.infohash for t in changes.added] == ["a" * 40]
+    assert changes.updated == changes.removed == []
+
+    assert calls == [None, "recently-active", None, None]
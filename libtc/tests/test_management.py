@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+from libtc import TorrentData, TorrentState, bencode, move_torrents
+from libtc.exceptions import FailedToExecuteException
+
+
+class MemoryClient:
+    def __init__(self, torrents=None, fail_add=()):
+        self.torrents = {t.infohash: t for t in torrents or []}
+        self.fail_add = fail_add
+        self.calls = []
+        self.list_calls = 0
+        self._active_calls = 0
+        self.max_active_calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self, *call):
+        with self._lock:
+            self._active_calls += 1
+            self.max_active_calls = max(self.max_active_calls, self._active_calls)
+            self.calls.append(call)
+        time.sleep(0.001)  # gives overlapping calls time to show up
+        with self._lock:
+            self._active_calls -= 1
+
+    def test_connection(self):
+        return True
+
+    def list(self, fields=None):
+        self.list_calls += 1
+        return list(self.torrents.values())
+
+    def retrieve_torrentfile(self, infohash):
+        self._call("retrieve_torrentfile", infohash)
+        return bencode({b"info": {b"name": infohash.encode(), b"length": 10}})
+
+    def get_download_path(self, infohash):
+        self._call("get_download_path", infohash)
+        return Path("/data") / infohash
+
+    def start(self, infohash):
+        self._call("start", infohash)
+
+    def stop(self, infohash):
+        self._call("stop", infohash)
+
+    def add(self, torrent, destination_path, stopped=False, **kwargs):
+        self._call("add", torrent[b"info"][b"name"].decode(), stopped)
+        infohash = torrent[b"info"][b"name"].decode()
+        if infohash in self.fail_add:
+            raise FailedToExecuteException("Failed to add")
+        self.torrents[infohash] = create_torrent_data(
+            infohash, stopped and TorrentState.STOPPED or TorrentState.ACTIVE
+        )
+
+    def remove(self, infohash):
+        self._call("remove", infohash)
+        del self.torrents[infohash]
+
+
+def create_torrent_data(infohash, state):
+    return TorrentData(infohash, infohash, 10, state, 100.0, 0, None, "", 0, 0, "")
+
+
+def test_move_torrents(tmp_path):
+    states = [TorrentState.ACTIVE, TorrentState.STOPPED, TorrentState.ERROR]
+    source_client = MemoryClient(
+        [create_torrent_data(f"{i:040x}", states[i % 3]) for i in range(30)]
+    )
+    target_client = MemoryClient(
+        [create_torrent_data(f"{3:040x}", TorrentState.ACTIVE)],
+        fail_add=[f"{6:040x}"],
+    )
+    infohashes = [f"{i:040x}" for i in range(30)] + ["f" * 40]
+    journal_path = tmp_path / "journal"
+    journal_path.write_text(json.dumps(f"{1:040x}") + "\n")
+
+    results = move_torrents(
+        infohashes,
+        source_client,
+        target_client,
+        concurrency=8,
+        journal_path=journal_path,
+    )
+    assert source_client.list_calls == target_client.list_calls == 1
+    assert source_client.max_active_calls == target_client.max_active_calls == 1
+    assert [r.infohash for r in results] == infohashes
+
+    outcomes = {r.infohash: (r.status, r.error) for r in results}
+    assert outcomes[f"{0:040x}"] == ("moved", None)
+    assert outcomes[f"{1:040x}"] == ("skipped", None)
+    assert outcomes[f"{2:040x}"] == (
+        "failed",
+        "Cannot move a torrent in an error state",
+    )
+    assert outcomes[f"{3:040x}"] == (
+        "failed",
+        f"Infohash {3:040x} was found on target",
+    )
+    assert outcomes[f"{6:040x}"] == ("failed", "Failed to add torrent to new client")
+    assert outcomes["f" * 40] == (
+        "failed",
+        f"Infohash {'f' * 40} was not found on source",
+    )
+
+    for i in [4, 5] + list(range(7, 30)):
+        infohash = f"{i:040x}"
+        if i % 3 == 2:
+            assert infohash in source_client.torrents
+        else:
+            assert infohash not in source_client.torrents
+            assert target_client.torrents[infohash].state == states[i % 3]
+    assert ("start", f"{6:040x}") in source_client.calls
+    assert f"{6:040x}" in source_client.torrents
+
+    assert journal_path.exists()
+    moved = {json.loads(line) for line in journal_path.read_text().splitlines()}
+    assert moved == {r.infohash for r in results if r.moved} | {f"{1:040x}"}
@@ -0,0 +1,139 @@
+import hashlib
+import os
+
+import pytest
+
+from libtc.placement import place_file, place_torrent
+from libtc.torrent import TorrentFile
+
+
+def create_source(path):
+    files = {
+        "Some.Show.S01E01/Some.Show.S01E01.mkv": os.urandom(1000),
+        "Some.Show.S01E02/Some.Show.S01E02.mkv": os.urandom(1000),
+        "Some.Show.S01E02/Some.Show.S01E02.nfo": os.urandom(10),
+    }
+    for name, data in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(data)
+    return files
+
+
+def create_torrent(files):
+    data = (
+        files["Some.Show.S01E01/Some.Show.S01E01.mkv"]
+        + files["Some.Show.S01E02/Some.Show.S01E02.mkv"]
+        + os.urandom(20)
+    )
+    return {
+        b"info": {
+            b"name": b"Some.Show.S01",
+            b"piece length": 250,
+            b"pieces": b"".join(
+                hashlib.sha1(data[i : i + 250]).digest()
+                for i in range(0, len(data), 250)
+            ),
+            b"files": [
+                {b"path": [b"Some.Show.S01E01.mkv"], b"length": 1000},
+                {b"path": [b"Some.Show.S01E02.mkv"], b"length": 1000},
+                {b"path": [b"Subs", b"Some.Show.S01E02.srt"], b"length": 20},
+            ],
+        }
+    }
+
+
+@pytest.mark.parametrize("methods", [["hardlink"], ["copy"], None])
+def test_place_torrent(tmp_path, methods):
+    source_path, destination_path = tmp_path / "source", tmp_path / "destination"
+    files = create_source(source_path)
+    kwargs = {"methods": methods} if methods else {}
+
+    result = place_torrent(
+        create_torrent(files), source_path, destination_path, **kwargs
+    )
+    assert [fp.name for fp in result.missing] == ["Some.Show.S01E02.srt"]
+    assert len(result.placed) == 2
+    for name in ["Some.Show.S01E01", "Some.Show.S01E02"]:
+        source_file = source_path / name / f"{name}.mkv"
+        target_file = destination_path / "Some.Show.S01" / f"{name}.mkv"
+        assert target_file.read_bytes() == files[f"{name}/{name}.mkv"]
+        if methods == ["hardlink"]:
+            assert os.path.samefile(source_file, target_file)
+        elif methods == ["copy"]:
+            assert not os.path.samefile(source_file, target_file)
+
+    result = place_torrent(
+        create_torrent(files), source_path, destination_path, **kwargs
+    )
+    assert not result.placed
+    assert len(result.existing) == 2
+
+
+def test_place_torrent_source_files(tmp_path):
+    source_path, destination_path = tmp_path / "source", tmp_path / "destination"
+    files = create_source(source_path)
+    result = place_torrent(
+        create_torrent(files),
+        source_path,
+        destination_path,
+        source_files=[
+            TorrentFile("Some.Show.S01E02/Some.Show.S01E02.mkv", 1000, 100.0)
+        ],
+        add_name_to_folder=False,
+        methods=["hardlink"],
+    )
+    assert [fp for fp, _ in result.placed] == [
+        destination_path / "Some.Show.S01E02.mkv"
+    ]
+    assert [fp.name for fp in result.missing] == [
+        "Some.Show.S01E01.mkv",
+        "Some.Show.S01E02.srt",
+    ]
+
+
+def test_place_torrent_verified_size_match(tmp_path):
+    source_path, destination_path = tmp_path / "source", tmp_path / "destination"
+    files = create_source(source_path)
+    (source_path / "Some.Show.S01E01").rename(source_path / "renamed")
+    (source_path / "renamed" / "Some.Show.S01E01.mkv").rename(
+        source_path / "renamed" / "episode.mkv"
+    )
+
+    result = place_torrent(
+        create_torrent(files), source_path, destination_path, methods=["hardlink"]
+    )
+    assert sorted(fp.name for fp, _ in result.placed) == [
+        "Some.Show.S01E01.mkv",
+        "Some.Show.S01E02.mkv",
+    ]
+    assert os.path.samefile(
+        destination_path / "Some.Show.S01" / "Some.Show.S01E01.mkv",
+        source_path / "renamed" / "episode.mkv",
+    )
+
+
+@pytest.mark.parametrize("absolute", [False, True])
+def test_place_torrent_outside_destination(tmp_path, absolute):
+    source_path, destination_path = tmp_path / "source", tmp_path / "destination"
+    files = create_source(source_path)
+    torrent = create_torrent(files)
+    parent = os.fsencode(tmp_path) if absolute else b".."
+    torrent[b"info"][b"files"][0][b"path"] = [parent, b"Some.Show.S01E01.mkv"]
+
+    with pytest.raises(Exception):
+        place_torrent(
+            torrent,
+            source_path,
+            destination_path,
+            add_name_to_folder=False,
+            methods=["copy"],
+        )
+    assert not (tmp_path / "Some.Show.S01E01.mkv").exists()
+    assert not destination_path.exists()
+
+
+def test_place_file_fallback(tmp_path):
+    (tmp_path / "source").write_bytes(b"data")
+    method = place_file(tmp_path / "source", tmp_path / "target")
+    assert method in ["reflink", "hardlink"]
+    assert (tmp_path / "target").read_bytes() == b"data"
@@ -0,0 +1,48 @@
+import random
+
+from libtc.clients.rtorrent import bitfield_to_string, build_bitfield
+
+
+def legacy_bitfield(piece_length, pieces, files):
+    bitfield = [True] * pieces
+    current_position = 0
+    for size, exists in files:
+        last_position = current_position + size
+        first_piece = current_position // piece_length
+        last_piece = (last_position + piece_length - 1) // piece_length
+        for piece in range(first_piece, last_piece):
+            bitfield[piece] *= exists
+        current_position = last_position
+    return bitfield
+
+
+def legacy_bitfield_to_string(bitfield):
+    retval = bytearray((len(bitfield) + 7) // 8)
+    for piece, bit in enumerate(bitfield):
+        if bit:
+            retval[piece // 8] |= 1 << (7 - piece % 8)
+    return bytes(retval)
+
+
+def test_build_bitfield():
+    rng = random.Random(0)
+    for _ in range(200):
+        piece_length = rng.choice([1, 7, 16, 1024])
+        files = [
+            (rng.choice([0, 1, piece_length, rng.randrange(5000)]), rng.random() > 0.3)
+            for _ in range(rng.randrange(1, 20))
+        ]
+        pieces = (sum(size for size, _ in files) + piece_length - 1) // piece_length
+        expected = legacy_bitfield(piece_length, pieces, files)
+        bitfield = build_bitfield(piece_length, pieces, files)
+        assert list(bitfield) == [int(bit) for bit in expected]
+        assert (0 not in bitfield) == all(expected)
+        assert bitfield_to_string(bitfield) == legacy_bitfield_to_string(expected)
+        assert bitfield_to_string(expected) == legacy_bitfield_to_string(expected)
+
+
+def test_bitfield_to_string():
+    assert bitfield_to_string([]) == b""
+    assert bitfield_to_string([True]) == b"\x80"
+    assert bitfield_to_string([False] * 8 + [True]) == b"\x00\x80"
+    assert bitfield_to_string(bytearray(b"\x01") * 16) == b"\xff\xff"
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from xmlrpc.client import Fault, ServerProxy, dumps
+
+import pytest
+
+from libtc import RTorrentClient, TorrentState, bdecode, bencode, verify
+from libtc.scgitransport import SCGIConnectionPool, SCGITransport
+
+from .utils_scgiserver import SCGIServer
+
+ROWS = [[f"{i:040x}", f"torrent {i}", [["http://example.com/"]]] for i in range(500)]
+
+
+@pytest.fixture(params=[True, False])
+def scgi_server(request):
+    with tempfile.TemporaryDirectory() as tmp_path:
+        server = SCGIServer(Path(tmp_path) / "rpc.socket", request.param)
+        server.dispatcher.register_function(lambda n: "x" * n, "big")
+        server.dispatcher.register_function(lambda: ROWS, "rows")
+        yield server
+        server.close()
+
+
+def test_pool_reuse(scgi_server):
+    transport = SCGITransport(socket_path=scgi_server.sock.getsockname())
+    proxy = ServerProxy("http://1", transport=transport)
+    for _ in range(5):
+        assert proxy.system.pid() == 1234
+    assert proxy.big(100000) == "x" * 100000
+
+    stats = transport.pool.stats()
+    if scgi_server.keep_alive:
+        assert scgi_server.connections == 1
+        assert stats["hits"] == 5
+        assert stats["misses"] == 1
+        assert stats["open"] == 1
+    else:
+        assert scgi_server.connections == 6
+        assert stats["open"] == 0
+
+    transport.close()
+    assert transport.pool.stats()["open"] == 0
+
+
+def test_shared_pool(scgi_server):
+    pool = SCGIConnectionPool(max_connections=2)
+    transports = [
+        SCGITransport(
+            socket_path=scgi_server.sock.getsockname(), pool=pool, max_connections=2
+        )
+        for _ in range(2)
+    ]
+    for transport in transports:
+        assert transport.pool is pool
+        proxy = ServerProxy("http://1", transport=transport)
+        assert proxy.system.pid() == 1234
+
+
+def test_stream_rows(scgi_server):
+    transport = SCGITransport(
+        socket_path=scgi_server.sock.getsockname(), chunk_size=1024
+    )
+    rows = transport.stream_rows("1", "/RPC2", dumps((), "rows").encode())
+    first_row = next(rows)
+    assert first_row == ROWS[0]
+    assert [first_row] + list(rows) == ROWS
+
+
+def test_stream_rows_body_after_headers(scgi_server):
+    scgi_server.body_delay = 0.1
+    transport = SCGITransport(socket_path=scgi_server.sock.getsockname())
+    assert list(transport.stream_rows("1", "/RPC2", dumps((), "rows").encode())) == (
+        ROWS
+    )
+    proxy = ServerProxy("http://1", transport=transport)
+    assert proxy.system.pid() == 1234
+
+
+def test_stream_rows_fault(scgi_server):
+    transport = SCGITransport(socket_path=scgi_server.sock.getsockname())
+    with pytest.raises(Fault):
+        list(transport.stream_rows("1", "/RPC2", dumps((), "missing").encode()))
+
+
+def test_rtorrent_iter_list(scgi_server):
+    requested_commands = []
+
+    def multicall(target, view, *commands):
+        assert view == "main"
+        requested_commands.append(commands)
+        return [
+            [
+                {
+                    "d.hash=": f"{i:040X}",
+                    "d.name=": f"torrent {i}",
+                    "d.is_active=": i % 2,
+                    "d.message=": "",
+                    "d.size_bytes=": 1000,
+                    "d.completed_bytes=": 500,
+                    "d.up.total=": 100,
+                    "d.up.rate=": 10,
+                    "d.down.rate=": 0,
+                    "d.timestamp.finished=": 1590000000,
+                    "t.multicall=,t.url=": [
+                        ["http://tracker.example.com:8080/announce"]
+                    ],
+                    "d.custom1=": "label",
+                }[command]
+                for command in commands
+            ]
+            for i in range(100)
+        ]
+
+    scgi_server.dispatcher.register_function(multicall, "d.multicall2")
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+    torrents = list(client.iter_list())
+    assert len(torrents) == 100
+    assert torrents[1].infohash == f"{1:040x}"
+    assert torrents[0].state == TorrentState.STOPPED
+    assert torrents[1].state == TorrentState.ACTIVE
+    assert torrents[1].progress == 50.0
+    assert torrents[1].tracker == "example.com"
+    assert [t.infohash for t in client.list()] == [t.infohash for t in torrents]
+
+    torrents = client.list(fields=["name"])
+    assert requested_commands[-1] == ("d.hash=", "d.name=")
+    assert torrents[1].name == "torrent 1"
+    assert not hasattr(torrents[1], "tracker")
+
+
+def test_rtorrent_start_many(scgi_server):
+    started = []
+
+    def start(infohash):
+        if infohash == "b" * 40:
+            raise Exception("Could not find info-hash.")
+        started.append(infohash)
+        return 0
+
+    scgi_server.dispatcher.register_function(start, "d.start")
+    scgi_server.dispatcher.register_multicall_functions()
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+    assert client.start_many(["a" * 40, "b" * 40, "c" * 40]) == {
+        "a" * 40: True,
+        "b" * 40: False,
+        "c" * 40: True,
+    }
+    assert started == ["a" * 40, "c" * 40]
+
+
+def test_rtorrent_add(scgi_server):
+    loaded = []
+    scgi_server.dispatcher.register_function(
+        lambda *args: loaded.append(args) or 0, "load.raw_start"
+    )
+    torrent = {
+        b"announce": b"http://example.com/announce",
+        b"info": {b"length": 10, b"name": b"test", b"pieces": b"x" * 100000},
+    }
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+    client.add(torrent, Path("/nonexistent"))
+    target, torrent_data, directory = loaded[0]
+    assert target == ""
+    assert torrent_data.data == bencode(torrent)
+    assert directory == 'd.directory.set="/nonexistent"'
+
+
+def test_rtorrent_add_fast_resume_verify(scgi_server, tmp_path):
+    loaded = []
+    scgi_server.dispatcher.register_function(
+        lambda *args: loaded.append(args) or 0, "load.raw_start"
+    )
+    data = os.urandom(10 * 1024)
+    (tmp_path / "test").mkdir()
+    (tmp_path / "test" / "a.bin").write_bytes(data[:3000])
+    (tmp_path / "test" / "b.bin").write_bytes(data[3000:5000] + b"x" + data[5001:])
+    torrent = {
+        b"info": {
+            b"name": b"test",
+            b"piece length": 1024,
+            b"pieces": b"".join(
+                hashlib.sha1(data[i : i + 1024]).digest()
+                for i in range(0, len(data), 1024)
+            ),
+            b"files": [
+                {b"path": [b"a.bin"], b"length": 3000},
+                {b"path": [b"b.bin"], b"length": len(data) - 3000},
+            ],
+        }
+    }
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+
+    client.add(torrent, tmp_path, fast_resume=True)
+    resume = bdecode(loaded[-1][1].data)[b"libtorrent_resume"]
+    assert resume[b"bitfield"] == 10
+    assert [f[b"completed"] for f in resume[b"files"]] == [1, 1]
+
+    client.add(torrent, tmp_path, fast_resume="verify")
+    resume = bdecode(loaded[-1][1].data)[b"libtorrent_resume"]
+    assert resume[b"bitfield"] == b"\xf7\xc0"
+    assert [f[b"completed"] for f in resume[b"files"]] == [3, 7]
+    assert all(b"mtime" in f for f in resume[b"files"])
+
+
+def test_rtorrent_add_verified_hashes_once(scgi_server, tmp_path, monkeypatch):
+    loaded = []
+    scgi_server.dispatcher.register_function(
+        lambda *args: loaded.append(args) or 0, "load.raw_start"
+    )
+    data = os.urandom(3000)
+    (tmp_path / "test.bin").write_bytes(data)
+    torrent = {
+        b"info": {
+            b"name": b"test.bin",
+            b"piece length": 1024,
+            b"pieces": b"".join(
+                hashlib.sha1(data[i : i + 1024]).digest()
+                for i in range(0, len(data), 1024)
+            ),
+            b"length": len(data),
+        }
+    }
+    hashed = []
+    original_hash_pieces = verify.hash_pieces
+
+    def hash_pieces(pieces, max_failures=None):
+        pieces = list(pieces)
+        hashed.extend(index for index, _, _ in pieces)
+        return original_hash_pieces(pieces, max_failures)
+
+    monkeypatch.setattr(verify, "hash_pieces", hash_pieces)
+    client = RTorrentClient(f"scgi://{scgi_server.sock.getsockname()}")
+
+    client.add(
+        torrent, tmp_path, fast_resume="verify", minimum_expected_data="verified"
+    )
+    resume = bdecode(loaded[-1][1].data)[b"libtorrent_resume"]
+    assert resume[b"bitfield"] == 3
+    assert [f[b"completed"] for f in resume[b"files"]] == [3]
+    assert sorted(hashed) == [0, 1, 2]
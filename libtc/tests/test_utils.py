@@ -0,0 +1,186 @@
+import base64
+import errno
+import hashlib
+import json
+import os
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from libtc import BTFailure, bdecode, bencode
+from libtc.clients.transmission import encode_add_request
+from libtc.torrent import TorrentFile
+from libtc.utils import (
+    Base64Writer,
+    calculate_minimum_expected_data,
+    find_existing_files,
+    get_tracker_domain,
+    infohash_from_bytes,
+    map_existing_files,
+    move_files,
+)
+
+
+def test_get_tracker_domain_cache():
+    get_tracker_domain.cache_clear()
+    assert get_tracker_domain("http://tracker.example.com:8080/announce") == (
+        "example.com"
+    )
+    assert get_tracker_domain("udp://tracker.example.com:1337") == "example.com"
+    assert get_tracker_domain("https://example.co.uk/announce?k=1") == ("example.co.uk")
+
+    cache_info = get_tracker_domain.cache_info()
+    assert cache_info.hits == 1
+    assert cache_info.misses == 2
+    assert cache_info.currsize == 2
+
+    get_tracker_domain.cache_clear()
+    assert get_tracker_domain.cache_info().currsize == 0
+
+
+def test_infohash_from_bytes():
+    info = b"d4:name4:test6:lengthi10ee"
+    data = b"d8:announce3:url4:info" + info + b"e"
+    assert infohash_from_bytes(data) == hashlib.sha1(info).hexdigest()
+    assert infohash_from_bytes(data) != (
+        hashlib.sha1(bencode(bdecode(data)[b"info"])).hexdigest()
+    )
+
+    with pytest.raises(BTFailure):
+        infohash_from_bytes(b"d8:announce3:urle")
+    with pytest.raises(BTFailure):
+        infohash_from_bytes(b"li1ee")
+
+
+def test_base64_writer():
+    data = os.urandom(10000)
+    for lines, encode in [(False, base64.b64encode), (True, base64.encodebytes)]:
+        fileobj = BytesIO()
+        with Base64Writer(fileobj, lines=lines) as writer:
+            for i in range(0, len(data), 1000):
+                writer.write(data[i : i + 1000])
+        assert fileobj.getvalue() == encode(data)
+
+
+@pytest.mark.parametrize(
+    "arguments",
+    [{}, {"download-dir": '/some "path"'}, {"download-dir": "/path", "paused": True}],
+)
+def test_transmission_encode_add_request(arguments):
+    torrent = {b"info": {b"name": b"test", b"pieces": os.urandom(1000)}}
+    request = json.loads(encode_add_request(torrent, arguments).getvalue())
+    assert request["method"] == "torrent-add"
+    metainfo = request["arguments"].pop("metainfo")
+    assert request["arguments"] == arguments
+    assert base64.b64decode(metainfo) == bencode(torrent)
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{}, {"workers": 4}, {"scandir": True}, {"workers": 4, "scandir": True}]
+)
+def test_map_existing_files(tmp_path, kwargs):
+    files = [[b"a", b"%02i.mkv" % i] for i in range(20)]
+    files += [[b"b", b"1.nfo"], [b"c", b"1.nfo"], [b"d", b"1.nfo"]]
+    torrent = {
+        b"info": {
+            b"name": b"test",
+            b"files": [{b"path": p, b"length": 10} for p in files],
+        }
+    }
+    for p in files[:18:2] + files[20:21]:
+        fp = tmp_path.joinpath("test", *[os.fsdecode(part) for part in p])
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fp.write_bytes(b"x" * 10)
+    (tmp_path / "test" / "a" / "02.mkv").write_bytes(b"x" * 5)
+    (tmp_path / "test" / "a" / "01.mkv").mkdir()
+    (tmp_path / "test" / "c").write_bytes(b"")
+
+    result = map_existing_files(torrent, tmp_path, **kwargs)
+    assert [f for _, f, _, _ in result] == [
+        Path(os.sep.join(os.fsdecode(part) for part in p)) for p in files
+    ]
+    assert [exists for _, _, _, exists in result] == [
+        i in (0, 4, 6, 8, 10, 12, 14, 16, 20) for i in range(len(files))
+    ]
+    assert find_existing_files(torrent, tmp_path, **kwargs) == (9, 14, 90, 140)
+    assert calculate_minimum_expected_data(torrent, tmp_path, **kwargs) == "partial"
+    assert calculate_minimum_expected_data(torrent, tmp_path / "x", **kwargs) == "none"
+
+
+def create_files(path, count=10):
+    files = []
+    for i in range(count):
+        f = TorrentFile(f"folder {i % 3}/file {i}.bin", 1000 + i, 100.0)
+        (path / f.path).parent.mkdir(parents=True, exist_ok=True)
+        (path / f.path).write_bytes(os.urandom(f.size))
+        files.append(f)
+    return files
+
+
+@pytest.mark.parametrize("cross_device", [False, True])
+def test_move_files(tmp_path, monkeypatch, cross_device):
+    if cross_device:
+
+        def rename(src, dst):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(os, "rename", rename)
+
+    source_path, target_path = tmp_path / "source" / "test", tmp_path / "target"
+    files = create_files(source_path)
+    contents = {f.path: (source_path / f.path).read_bytes() for f in files}
+    os.utime(source_path / files[0].path, (1590000000, 1590000000))
+
+    reports = []
+    progress = move_files(
+        source_path, target_path, files, workers=4, progress=reports.append
+    )
+    assert progress.moved_files == progress.total_files == 10
+    assert progress.moved_bytes == progress.total_bytes == sum(f.size for f in files)
+    assert reports[-1] is progress
+    assert progress.bytes_per_second > 0
+
+    assert not source_path.exists()
+    for f in files:
+        assert (target_path / f.path).read_bytes() == contents[f.path]
+    assert (target_path / files[0].path).stat().st_mtime == 1590000000
+    assert not list(target_path.rglob("*.part"))
+
+
+def test_move_files_journal(tmp_path, monkeypatch):
+    def rename(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "rename", rename)
+
+    source_path, target_path = tmp_path / "source", tmp_path / "target"
+    files = create_files(source_path)
+    contents = {f.path: (source_path / f.path).read_bytes() for f in files}
+    journal_path = tmp_path / "journal"
+
+    # An interrupted move where the first file is done and the second is partially copied
+    (target_path / "folder 0").mkdir(parents=True)
+    (target_path / "folder 1").mkdir(parents=True)
+    (source_path / files[0].path).replace(target_path / files[0].path)
+    journal_path.write_text(json.dumps(files[0].path) + "\n")
+    (target_path / (files[1].path + ".part")).write_bytes(contents[files[1].path][:500])
+
+    progress = move_files(source_path, target_path, files, journal_path=journal_path)
+    assert progress.total_files == progress.moved_files == 9
+    assert not journal_path.exists()
+    assert not source_path.exists()
+    for f in files:
+        assert (target_path / f.path).read_bytes() == contents[f.path]
+
+
+def test_move_files_outside_target(tmp_path):
+    files = create_files(tmp_path / "source", count=2)
+    for path in ["../escape.bin", "folder 0/../../escape.bin", "/escape.bin"]:
+        with pytest.raises(Exception):
+            move_files(
+                tmp_path / "source",
+                tmp_path / "target",
+                files + [TorrentFile(path, 10, 100.0)],
+            )
+    assert not list((tmp_path / "target").iterdir())
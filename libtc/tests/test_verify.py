@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+import pytest
+
+from libtc.utils import calculate_minimum_expected_data, has_minimum_expected_data
+from libtc.verify import verify_file, verify_torrent
+
+
+def create_torrent(path, piece_length=1024):
+    files = [(b"a.bin", 3000), (b"empty.bin", 0), (b"b.bin", 1), (b"c.bin", 5000)]
+    data = b""
+    for name, size in files:
+        content = os.urandom(size)
+        (path / "test").mkdir(exist_ok=True)
+        (path / "test" / os.fsdecode(name)).write_bytes(content)
+        data += content
+    pieces = b"".join(
+        hashlib.sha1(data[i : i + piece_length]).digest()
+        for i in range(0, len(data), piece_length)
+    )
+    return {
+        b"info": {
+            b"name": b"test",
+            b"piece length": piece_length,
+            b"pieces": pieces,
+            b"files": [{b"path": [name], b"length": size} for name, size in files],
+        }
+    }
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_verify_torrent(tmp_path, monkeypatch, processes):
+    monkeypatch.setattr("libtc.verify.TASK_SIZE", 2048)
+    torrent = create_torrent(tmp_path)
+    result = verify_torrent(torrent, tmp_path, processes=processes)
+    assert result.ok
+    assert result.total == result.checked == 8
+
+    with open(tmp_path / "test" / "c.bin", "r+b") as f:
+        f.seek(2000)
+        f.write(b"corrupt")
+    result = verify_torrent(torrent, tmp_path, processes=processes)
+    assert not result.ok
+    assert result.failed == [4]
+
+    (tmp_path / "test" / "a.bin").unlink()
+    result = verify_torrent(torrent, tmp_path, processes=processes)
+    assert result.failed == [0, 1, 2, 4]
+
+    result = verify_torrent(torrent, tmp_path, processes=processes, max_failures=2)
+    assert result.failed == [0, 1]
+
+    result = verify_torrent(torrent, tmp_path, processes=processes, sample=50, seed=1)
+    assert result.checked == 4
+    assert set(result.failed) <= {0, 1, 2, 4}
+
+
+def test_verify_file(tmp_path):
+    torrent = create_torrent(tmp_path)
+    (tmp_path / "test" / "c.bin").rename(tmp_path / "other.bin")
+
+    result = verify_file(torrent, tmp_path / "other.bin", 3001, 5000)
+    assert result.ok
+    assert result.checked == 5
+
+    result = verify_file(torrent, tmp_path / "other.bin", 0, 3000)
+    assert not result.ok
+    assert result.checked == 1
+
+    result = verify_file(torrent, tmp_path / "test" / "b.bin", 3000, 1)
+    assert result.checked == 0
+
+
+def test_calculate_minimum_expected_data_verify(tmp_path):
+    torrent = create_torrent(tmp_path)
+    assert calculate_minimum_expected_data(torrent, tmp_path, verify=True) == (
+        "verified"
+    )
+
+    with open(tmp_path / "test" / "a.bin", "r+b") as f:
+        f.write(b"corrupt")
+    assert calculate_minimum_expected_data(torrent, tmp_path) == "full"
+    assert calculate_minimum_expected_data(torrent, tmp_path, verify=True) == "full"
+
+    assert has_minimum_expected_data("full", "verified")
+    assert has_minimum_expected_data("verified", "verified")
+    assert not has_minimum_expected_data("verified", "full")
@@ -0,0 +1,69 @@
+import socket
+import threading
+import time
+from xmlrpc.server import SimpleXMLRPCDispatcher
+
+
+class SCGIServer:
+    def __init__(self, path, keep_alive):
+        self.keep_alive = keep_alive
+        self.connections = 0
+        # Seconds between sending the headers and the body of a response
+        self.body_delay = 0
+        self.dispatcher = SimpleXMLRPCDispatcher(allow_none=True)
+        self.dispatcher.register_function(lambda: 1234, "system.pid")
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(str(path))
+        self.sock.listen(5)
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def read_request(self, conn, buf):
+        while b":" not in buf:
+            r = conn.recv(1024)
+            if not r:
+                return None, b""
+            buf += r
+        length, buf = buf.split(b":", 1)
+        header_length = int(length) + 1
+        while len(buf) < header_length:
+            buf += conn.recv(1024)
+        headers, buf = buf[: header_length - 1], buf[header_length:]
+        headers = headers.split(b"\x00")
+        headers = dict(zip(headers[::2], headers[1::2]))
+        content_length = int(headers[b"CONTENT_LENGTH"])
+        while len(buf) < content_length:
+            buf += conn.recv(1024)
+        return buf[:content_length], buf[content_length:]
+
+    def handle(self, conn):
+        buf = b""
+        with conn:
+            while True:
+                body, buf = self.read_request(conn, buf)
+                if body is None:
+                    return
+                response = self.dispatcher._marshaled_dispatch(body)
+                headers = b"Status: 200 OK\r\nContent-Type: text/xml\r\n"
+                if self.keep_alive:
+                    headers += b"Content-Length: %i\r\n" % len(response)
+                if self.body_delay:
+                    conn.sendall(headers + b"\r\n")
+                    time.sleep(self.body_delay)
+                    conn.sendall(response)
+                else:
+                    conn.sendall(headers + b"\r\n" + response)
+                if not self.keep_alive:
+                    return
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self.sock.close()
@@ -1,6 +1,19 @@
 from datetime import datetime
 
-import pytz
+
+def resolve_fields(fields):
+    """
+    Returns the `TorrentData` fields to fetch for a list call,
+    infohash is always included.
+    """
+    if fields is None:
+        return TorrentData.list_fields
+    fields = set(fields)
+    unknown_fields = fields - set(TorrentData.list_fields)
+    if unknown_fields:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    fields.add("infohash")
+    return [field for field in TorrentData.list_fields if field in fields]
 
 
 class TorrentData:
@@ -16,7 +29,10 @@ class TorrentData:
         "upload_rate",
         "download_rate",
         "label",
+        "client_name",
     )
+    # The fields that come from the torrent client
+    list_fields = __slots__[:-1]
 
     def __init__(
         self,
@@ -31,6 +47,7 @@ class TorrentData:
         upload_rate,
         download_rate,
         label,
+        client_name=None,
     ):
         self.infohash = infohash
         self.name = name
@@ -43,22 +60,57 @@ class TorrentData:
         self.upload_rate = upload_rate
         self.download_rate = download_rate
         self.label = label
+        self.client_name = client_name
 
     def __repr__(self):
-        return f"TorrentData(infohash={self.infohash!r}, name={self.name!r})"
+        return f"TorrentData(infohash={self.infohash!r}, name={getattr(self, 'name', None)!r})"
+
+    @classmethod
+    def with_fields(cls, **kwargs):
+        """
+        Create a `TorrentData` with only the given fields set,
+        used when a list is limited to some fields.
+        """
+        torrent = cls.__new__(cls)
+        torrent.client_name = None
+        for k, v in kwargs.items():
+            setattr(torrent, k, v)
+        return torrent
 
     def serialize(self):
-        data = {k: getattr(self, k) for k in self.__slots__}
-        data["added"] = data["added"].isoformat().split(".")[0].split("+")[0]
+        data = {k: getattr(self, k) for k in self.list_fields if hasattr(self, k)}
+        if "added" in data:
+            data["added"] = data["added"].isoformat().split(".")[0].split("+")[0]
         return data
 
     @classmethod
     def unserialize(cls, data):
         data = dict(data)
-        data["added"] = datetime.strptime(data["added"], "%Y-%m-%dT%H:%M:%S").replace(
-            tzinfo=pytz.UTC
-        )
-        return cls(**data)
+        if "added" in data:
+            import pytz
+
+            data["added"] = datetime.strptime(
+                data["added"], "%Y-%m-%dT%H:%M:%S"
+            ).replace(tzinfo=pytz.UTC)
+        return cls.with_fields(**data)
+
+
+class TorrentChanges:
+    __slots__ = (
+        "added",
+        "updated",
+        "removed",
+        "token",
+    )
+
+    def __init__(self, added, updated, removed, token):
+        self.added = added
+        self.updated = updated
+        self.removed = removed
+        self.token = token
+
+    def __repr__(self):
+        return f"TorrentChanges(added={len(self.added)}, updated={len(self.updated)}, removed={len(self.removed)})"
 
 
 class TorrentState:
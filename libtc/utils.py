@@ -1,9 +1,18 @@
+import base64
+import errno
+import hashlib
+import json
 import os
 import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from urllib.parse import urlparse
 
-import publicsuffixlist
+from .bencode import BTFailure, LazyDict, bdecode
 
 
 def is_legal_path(path):
@@ -13,7 +22,96 @@ def is_legal_path(path):
     return True
 
 
-def map_existing_files(torrent, path, add_name_to_folder=True):
+# Errors that mean a path is not a file, the same ones Path.is_file ignores
+IGNORED_STAT_ERRORS = (errno.ENOENT, errno.ENOTDIR, errno.EBADF, errno.ELOOP)
+
+# Directories with at least this many files are listed instead of stat'ing every file
+SCANDIR_MINIMUM_FILES = 16
+
+
+def get_file_size(path):
+    """Returns the size of path if it is a file, otherwise None."""
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        if e.errno not in IGNORED_STAT_ERRORS:
+            raise
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return st.st_size
+
+
+def get_file_sizes_in_directory(path, names):
+    """Returns the size of the files in names that are files in path and None for the rest."""
+    try:
+        with os.scandir(path) as it:
+            entries = {entry.name: entry for entry in it}
+    except OSError as e:
+        if e.errno not in IGNORED_STAT_ERRORS:
+            raise
+        return [None] * len(names)
+
+    sizes = []
+    for name in names:
+        entry = entries.get(name)
+        if entry is not None and entry.is_file():
+            sizes.append(entry.stat().st_size)
+        else:
+            sizes.append(None)
+    return sizes
+
+
+def get_file_sizes(paths, workers=None, scandir=False):
+    """
+    Returns the size of every path that is a file and None for the rest.
+
+    With workers, the stat calls are made from a thread pool, which helps on
+    network filesystems where every call waits for a round trip.
+    With scandir, directories with many of the files are listed once and
+    missing files are found without a stat call. The names must then match
+    the directory listing exactly, so do not use it on case-insensitive filesystems.
+    """
+    paths = [os.fspath(path) for path in paths]
+    single_files = list(range(len(paths)))
+    directories = []
+    if scandir:
+        files_in_directory = {}
+        for i, path in enumerate(paths):
+            directory, name = os.path.split(path)
+            files_in_directory.setdefault(directory, []).append((i, name))
+
+        single_files = []
+        for directory, files in files_in_directory.items():
+            if len(files) >= SCANDIR_MINIMUM_FILES:
+                directories.append((directory, files))
+            else:
+                single_files += [i for i, _ in files]
+
+    executor = workers and ThreadPoolExecutor(max_workers=workers)
+    map_func = executor.map if executor else map
+    try:
+        sizes = [None] * len(paths)
+        single_file_sizes = map_func(get_file_size, [paths[i] for i in single_files])
+        directory_sizes = map_func(
+            get_file_sizes_in_directory,
+            [directory for directory, _ in directories],
+            [[name for _, name in files] for _, files in directories],
+        )
+        for i, size in zip(single_files, single_file_sizes):
+            sizes[i] = size
+        for (_, files), file_sizes in zip(directories, directory_sizes):
+            for (i, _), size in zip(files, file_sizes):
+                sizes[i] = size
+    finally:
+        if executor:
+            executor.shutdown()
+    return sizes
+
+
+def map_existing_files(
+    torrent, path, add_name_to_folder=True, workers=None, scandir=False
+):
     name = torrent[b"info"][b"name"].decode()
 
     files = []
@@ -27,15 +125,16 @@ def map_existing_files(torrent, path, add_name_to_folder=True):
     else:
         files.append((path / name, name, torrent[b"info"][b"length"]))
 
-    result = []
-
-    for fp, f, size in files:
-        result.append((fp, f, size, fp.is_file() and fp.stat().st_size == size))
-
-    return result
+    sizes = get_file_sizes([fp for fp, _, _ in files], workers=workers, scandir=scandir)
+    return [
+        (fp, f, size, actual_size == size)
+        for (fp, f, size), actual_size in zip(files, sizes)
+    ]
 
 
-def find_existing_files(torrent, path, add_name_to_folder=True):
+def find_existing_files(
+    torrent, path, add_name_to_folder=True, workers=None, scandir=False
+):
     """
     Checks if the files in a torrent exist,
     returns a tuple of found files, missing files, size found, size missing.
@@ -43,10 +142,14 @@ def find_existing_files(torrent, path, add_name_to_folder=True):
 
     found, missing, found_size, missing_size = 0, 0, 0, 0
 
-    for fp, f, size, found in map_existing_files(
-        torrent, path, add_name_to_folder=add_name_to_folder
+    for fp, f, size, exists in map_existing_files(
+        torrent,
+        path,
+        add_name_to_folder=add_name_to_folder,
+        workers=workers,
+        scandir=scandir,
     ):
-        if found:
+        if exists:
             found += 1
             found_size += size
         else:
@@ -56,39 +159,295 @@ def find_existing_files(torrent, path, add_name_to_folder=True):
     return found, missing, found_size, missing_size
 
 
-def calculate_minimum_expected_data(torrent, path, add_name_to_folder=True):
+def calculate_minimum_expected_data(
+    torrent, path, add_name_to_folder=True, workers=None, scandir=False, verify=False
+):
+    """
+    Returns how much of the data of a torrent exists: none, partial or full.
+
+    With verify, full data is also hashed and "verified" is returned if it matches.
+    """
     found, missing, found_size, missing_size = find_existing_files(
-        torrent, path, add_name_to_folder=add_name_to_folder
+        torrent,
+        path,
+        add_name_to_folder=add_name_to_folder,
+        workers=workers,
+        scandir=scandir,
     )
     if not found_size:
         return "none"
     elif found_size and missing_size:
         return "partial"
-    else:
-        return "full"
+    elif verify:
+        from .verify import verify_torrent
+
+        result = verify_torrent(
+            torrent, path, add_name_to_folder=add_name_to_folder, max_failures=1
+        )
+        if result.ok:
+            return "verified"
+    return "full"
 
 
 def has_minimum_expected_data(expected_data, actual_data):
     if expected_data == "none":
         return True
-    elif expected_data == "partial" and actual_data in ["partial", "full"]:
+    elif expected_data == "partial" and actual_data in ["partial", "full", "verified"]:
+        return True
+    elif expected_data == "full" and actual_data in ["full", "verified"]:
         return True
-    elif expected_data == actual_data == "full":
+    elif expected_data == actual_data == "verified":
         return True
     return False
 
 
+def infohash_from_bytes(data):
+    """
+    Returns the infohash of a bencoded torrent.
+
+    The info dict is hashed as it is in data, so it is not encoded again and
+    the infohash is also correct for torrents that are not encoded canonically.
+    """
+    torrent = bdecode(data, lazy=True)
+    if not isinstance(torrent, LazyDict) or b"info" not in torrent:
+        raise BTFailure("torrent has no info dict")
+    return hashlib.sha1(torrent.raw(b"info")).hexdigest()
+
+
+_public_suffix_list = None
+
+
+def get_public_suffix_list():
+    # Takes significant time to instantiate (~100ms), so only do it once and when needed
+    global _public_suffix_list
+    if _public_suffix_list is None:
+        import publicsuffixlist
+
+        _public_suffix_list = publicsuffixlist.PublicSuffixList()
+    return _public_suffix_list
+
+
+@lru_cache(maxsize=4096)
+def get_hostname_domain(hostname):
+    return get_public_suffix_list().privatesuffix(hostname)
+
+
 def get_tracker_domain(tracker):
+    """
+    Returns the registered domain of a tracker url.
+
+    The lookups are cached by hostname, see `get_tracker_domain.cache_info()`
+    for hits and misses and `get_tracker_domain.cache_clear()` to empty it.
+    """
     url = urlparse(tracker)
-    return get_tracker_domain.psl.privatesuffix(url.hostname)
+    return get_hostname_domain(url.hostname)
+
 
+get_tracker_domain.cache_info = get_hostname_domain.cache_info
+get_tracker_domain.cache_clear = get_hostname_domain.cache_clear
 
-# Takes significant time to instantiate (~100ms), so only do it once
-get_tracker_domain.psl = publicsuffixlist.PublicSuffixList()
 
+# Chunk size when files are copied to another filesystem
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
 
-def move_files(source_path, target_path, files, preserve_parent_folder=False):
-    """Move a file mapping from source_path to target_path and preserve permission et.al."""
+# Errors that mean copy_file_range or sendfile cannot be used for a pair of files
+UNSUPPORTED_COPY_ERRORS = (
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+)
+
+
+class MoveProgress:
+    __slots__ = (
+        "total_files",
+        "total_bytes",
+        "moved_files",
+        "moved_bytes",
+        "started",
+        "_lock",
+    )
+
+    def __init__(self, total_files, total_bytes):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.moved_files = 0
+        self.moved_bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, moved_bytes, moved_files=0):
+        with self._lock:
+            self.moved_bytes += moved_bytes
+            self.moved_files += moved_files
+
+    @property
+    def bytes_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return elapsed and self.moved_bytes / elapsed
+
+    def __repr__(self):
+        return f"MoveProgress(files={self.moved_files}/{self.total_files}, bytes={self.moved_bytes}/{self.total_bytes}, bytes_per_second={self.bytes_per_second:.0f})"
+
+
+def iter_copy_file(source_fd, target_fd, position, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Copies a file from position to the end and yields the size of every chunk.
+
+    copy_file_range is tried first, then sendfile and at last read and write.
+    The target must be positioned at position.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                n = os.copy_file_range(
+                    source_fd, target_fd, chunk_size, offset_src=position
+                )
+                if not n:
+                    return
+                position += n
+                yield n
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_COPY_ERRORS:
+                raise
+
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                n = os.sendfile(target_fd, source_fd, position, chunk_size)
+                if not n:
+                    return
+                position += n
+                yield n
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_COPY_ERRORS:
+                raise
+
+    while True:
+        os.lseek(source_fd, position, os.SEEK_SET)
+        data = os.read(source_fd, chunk_size)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            n = os.write(target_fd, view)
+            view = view[n:]
+        position += len(data)
+        yield len(data)
+
+
+def copy_file(source_file, target_file, on_copied=None):
+    """
+    Copies source_file to target_file through a partial file next to the target.
+
+    A partial file left by an interrupted copy is continued where it stopped.
+    """
+    partial_file = os.fspath(target_file) + ".part"
+    source_fd = os.open(source_file, os.O_RDONLY)
+    try:
+        target_fd = os.open(partial_file, os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            position = os.lseek(target_fd, 0, os.SEEK_END)
+            if position > os.fstat(source_fd).st_size:
+                os.ftruncate(target_fd, 0)
+                position = os.lseek(target_fd, 0, os.SEEK_SET)
+            elif on_copied and position:
+                on_copied(position)
+            for n in iter_copy_file(source_fd, target_fd, position):
+                if on_copied:
+                    on_copied(n)
+        finally:
+            os.close(target_fd)
+    finally:
+        os.close(source_fd)
+    shutil.copystat(source_file, partial_file)
+    os.replace(partial_file, target_file)
+
+
+def move_file(source_file, target_file, on_copied=None):
+    """Renames a file and copies it instead if it is on another filesystem."""
+    try:
+        os.rename(source_file, target_file)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file(source_file, target_file, on_copied)
+        os.unlink(source_file)
+        return False
+    return True
+
+
+class MoveJournal:
+    """
+    Records the files or torrents a move has finished in a file so the move
+    can be started again after an interruption and skip them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.moved = set()
+        if self.path.exists():
+            with self.path.open("r") as f:
+                self.moved = {json.loads(line) for line in f if line.endswith("\n")}
+        self._f = self.path.open("a")
+        self._lock = threading.Lock()
+
+    def add(self, path):
+        with self._lock:
+            self._f.write(json.dumps(str(path)) + "\n")
+            self._f.flush()
+
+    def __contains__(self, path):
+        return str(path) in self.moved
+
+    def close(self):
+        self._f.close()
+
+
+def get_relative_file_path(path):
+    """Normalizes the path of a file in a torrent and makes sure it stays inside the torrent."""
+    path = os.path.normpath(path)
+    if (
+        os.path.isabs(path)
+        or path in (os.curdir, os.pardir)
+        or path.startswith(os.pardir + os.sep)
+    ):
+        raise Exception()
+    return path
+
+
+def plan_folders(file_paths):
+    """Returns the folders needed for relative file paths, parents before their children."""
+    folders = set()
+    for path in file_paths:
+        folder = os.path.dirname(path)
+        while folder and folder not in folders:
+            folders.add(folder)
+            folder = os.path.dirname(folder)
+    return sorted(folders, key=lambda folder: folder.count(os.sep))
+
+
+def move_files(
+    source_path,
+    target_path,
+    files,
+    preserve_parent_folder=False,
+    workers=1,
+    journal_path=None,
+    progress=None,
+):
+    """
+    Move a file mapping from source_path to target_path and preserve permission et.al.
+
+    Files on another filesystem are copied and then removed.
+
+    workers: number of files to move at the same time
+    journal_path: file that records moved files, a move that was interrupted
+      can be run again with the same journal and continues where it stopped
+    progress: called with a MoveProgress while files are moved
+    """
     source_path = Path(source_path)
     target_path = Path(target_path)
 
@@ -96,47 +455,71 @@ def move_files(source_path, target_path, files, preserve_parent_folder=False):
         target_path.mkdir()
         shutil.copystat(source_path, target_path)
 
-    potential_removal_folders = set()
+    files = list(files)
+    file_paths = [get_relative_file_path(f.path) for f in files]
+    folders = plan_folders(file_paths)
+    for folder in folders:
+        try:
+            (target_path / folder).mkdir()
+        except FileExistsError:
+            continue
+        shutil.copystat(source_path / folder, target_path / folder)
+
+    potential_removal_folders = {source_path / folder for folder in folders}
     if not preserve_parent_folder:
         potential_removal_folders.add(source_path)
 
-    for f in files:
-        source_file = source_path / f.path
-        target_file = target_path / f.path
-
-        while not target_file.parent.exists():
-            source_file_parent = source_file.parent
-            target_file_parent = target_file.parent
-
-            while not (
-                target_file_parent.parent.exists() and not target_file_parent.exists()
-            ):
-                source_file_parent = source_file_parent.parent
-                target_file_parent = target_file_parent.parent
-
-            if target_path not in Path(os.path.abspath(target_file_parent)).parents:
-                raise Exception()
-            target_file_parent.mkdir()
-            shutil.copystat(source_file_parent, target_file_parent)
+    journal = journal_path and MoveJournal(journal_path)
+    # Plain strings as the paths are only passed on to os functions
+    source_root, target_root = os.fspath(source_path), os.fspath(target_path)
+    moves = [
+        (f, os.path.join(source_root, path), os.path.join(target_root, path))
+        for f, path in zip(files, file_paths)
+        if not (journal and f.path in journal)
+    ]
 
-        source_parent_folder = source_file.parent
-        while (
-            source_path in source_parent_folder.parents
-            and source_parent_folder not in potential_removal_folders
-        ):
-            potential_removal_folders.add(source_parent_folder)
-            source_parent_folder = source_parent_folder.parent
+    move_progress = MoveProgress(len(moves), sum(f.size for f, _, _ in moves))
 
-        if target_path not in Path(os.path.abspath(target_file)).parents:
-            raise Exception()
+    def on_copied(n):
+        move_progress.add(n)
+        if progress:
+            progress(move_progress)
 
-        source_file.rename(target_file)
+    def move(args):
+        f, source_file, target_file = args
+        if journal and not os.path.exists(source_file) and os.path.exists(target_file):
+            # Moved right before an interruption but not recorded
+            move_progress.add(f.size, 1)
+        elif move_file(source_file, target_file, on_copied):
+            move_progress.add(f.size, 1)
+        else:
+            move_progress.add(0, 1)
+        if journal:
+            journal.add(f.path)
+        if progress:
+            progress(move_progress)
+
+    try:
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(move, moves))
+        else:
+            for args in moves:
+                move(args)
+    finally:
+        if journal:
+            journal.close()
 
     potential_removal_folders = sorted(potential_removal_folders, reverse=True)
     for folder in potential_removal_folders:
         if not list(folder.iterdir()):
             folder.rmdir()
 
+    if journal:
+        journal.path.unlink()
+
+    return move_progress
+
 
 class TorrentProblems:
     INVALID_PATH_SEGMENT = [b"", b".", b"..", b"/", b"\\"]
@@ -182,6 +565,46 @@ class TorrentProblems:
     EMOJIS = []  # TODO: add emojis that e.g. transmission chokes on
 
 
+class Base64Writer:
+    """
+    File-like object that base64 encodes what is written to it into fileobj.
+
+    With lines the output is split into lines like `base64.encodebytes` does,
+    as used by XML-RPC. The end of the data is only written when closed.
+    """
+
+    def __init__(self, fileobj, lines=False):
+        self.fileobj = fileobj
+        if lines:
+            self._encode = base64.encodebytes
+            self._block_size = 57
+        else:
+            self._encode = base64.b64encode
+            self._block_size = 3
+        self._pending = b""
+
+    def write(self, data):
+        if self._pending:
+            data = self._pending + data
+        else:
+            data = memoryview(data)
+        end = len(data) - len(data) % self._block_size
+        if end:
+            self.fileobj.write(self._encode(data[:end]))
+        self._pending = bytes(data[end:])
+
+    def close(self):
+        if self._pending:
+            self.fileobj.write(self._encode(self._pending))
+            self._pending = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 def rewrite_path(path, path_mapping):
     for k, v in path_mapping.items():
         try:
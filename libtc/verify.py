@@ -0,0 +1,219 @@
+"""Checks local data against the piece hashes of a torrent."""
+
+import hashlib
+import math
+import mmap
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .utils import map_existing_files
+
+# Roughly how much data each task hashes
+TASK_SIZE = 64 * 1024 * 1024
+
+
+class VerificationResult:
+    __slots__ = (
+        "total",
+        "checked",
+        "failed",
+    )
+
+    def __init__(self, total, checked, failed):
+        self.total = total
+        self.checked = checked
+        self.failed = failed
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def __repr__(self):
+        return f"VerificationResult(total={self.total}, checked={self.checked}, failed={len(self.failed)})"
+
+
+def iter_piece_segments(files, piece_length):
+    """
+    Yields the segments of every piece as a list of (path, offset, length)
+    together with if all the files the piece is part of exist.
+
+    files is a list of (path, size, exists) in torrent order.
+    """
+    segments, piece_left, complete = [], piece_length, True
+    for path, size, exists in files:
+        offset = 0
+        while offset < size:
+            length = min(size - offset, piece_left)
+            segments.append((path, offset, length))
+            complete = complete and exists
+            offset += length
+            piece_left -= length
+            if not piece_left:
+                yield segments, complete
+                segments, piece_left, complete = [], piece_length, True
+    if segments:
+        yield segments, complete
+
+
+def hash_pieces(pieces, max_failures=None):
+    """
+    Hashes pieces of (index, expected hash, segments) and returns the number
+    of pieces checked and the indexes of the ones that did not match.
+
+    Files are memory mapped and kept open for the pieces after it.
+    """
+    checked, failed = 0, []
+    views = {}
+    try:
+        for index, expected, segments in pieces:
+            checked += 1
+            h = hashlib.sha1()
+            try:
+                for path, offset, length in segments:
+                    view = views.get(path)
+                    if view is None:
+                        with open(path, "rb") as f:
+                            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        view = views[path] = memoryview(m)
+                    h.update(view[offset : offset + length])
+            except (OSError, ValueError):  # the file is gone or truncated
+                matches = False
+            else:
+                matches = h.digest() == expected
+
+            if not matches:
+                failed.append(index)
+                if max_failures is not None and len(failed) >= max_failures:
+                    break
+    finally:
+        for view in views.values():
+            m = view.obj
+            view.release()
+            m.close()
+    return checked, failed
+
+
+def verify_file(torrent, path, offset, size):
+    """
+    Hashes the pieces that are entirely inside a file of a torrent,
+    e.g. to check a file found by size alone.
+
+    path: the local file
+    offset: where the file starts in the torrent
+    size: size of the file in the torrent
+
+    Pieces shared with other files are not checked.
+    """
+    info = torrent[b"info"]
+    piece_length = info[b"piece length"]
+    hashes = bytes(info[b"pieces"])
+    total = len(hashes) // 20
+    if b"files" in info:
+        torrent_size = sum(f[b"length"] for f in info[b"files"])
+    else:
+        torrent_size = info[b"length"]
+
+    pieces = []
+    for index in range(math.ceil(offset / piece_length), total):
+        start = index * piece_length
+        end = min(start + piece_length, torrent_size)
+        if end > offset + size:
+            break
+        pieces.append(
+            (
+                index,
+                hashes[index * 20 : index * 20 + 20],
+                [(os.fspath(path), start - offset, end - start)],
+            )
+        )
+
+    checked, failed = hash_pieces(pieces, max_failures=1)
+    return VerificationResult(total, checked, failed)
+
+
+def verify_torrent(
+    torrent,
+    path,
+    add_name_to_folder=True,
+    sample=100,
+    max_failures=None,
+    processes=None,
+    seed=None,
+):
+    """
+    Hashes the local data of a torrent and compares it with the piece hashes.
+
+    sample: percentage of the pieces to check, picked at random
+    max_failures: stop when this many pieces have failed
+    processes: number of processes that hash pieces, defaults to the number of cores,
+      0 hashes in this process
+    seed: seed for picking the sampled pieces
+    """
+    info = torrent[b"info"]
+    piece_length = info[b"piece length"]
+    hashes = bytes(info[b"pieces"])
+    total = len(hashes) // 20
+
+    selected = None
+    if sample < 100:
+        selected = set(
+            random.Random(seed).sample(
+                range(total), min(total, math.ceil(total * sample / 100))
+            )
+        )
+
+    files = [
+        (os.fspath(fp), size, exists)
+        for fp, _, size, exists in map_existing_files(
+            torrent, path, add_name_to_folder=add_name_to_folder
+        )
+    ]
+
+    checked, failed, tasks, task = 0, [], [], []
+    pieces_per_task = max(1, TASK_SIZE // piece_length)
+    for index, (segments, complete) in enumerate(
+        iter_piece_segments(files, piece_length)
+    ):
+        if index >= total:
+            break
+        if selected is not None and index not in selected:
+            continue
+        if not complete:
+            checked += 1
+            failed.append(index)
+            if max_failures is not None and len(failed) >= max_failures:
+                return VerificationResult(total, checked, failed)
+            continue
+        task.append((index, hashes[index * 20 : index * 20 + 20], segments))
+        if len(task) >= pieces_per_task:
+            tasks.append(task)
+            task = []
+    if task:
+        tasks.append(task)
+
+    def add_result(result):
+        nonlocal checked
+        task_checked, task_failed = result
+        checked += task_checked
+        failed.extend(task_failed)
+        return max_failures is not None and len(failed) >= max_failures
+
+    if processes == 0 or len(tasks) <= 1:
+        for task in tasks:
+            task_max_failures = max_failures and max_failures - len(failed)
+            if add_result(hash_pieces(task, task_max_failures)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            pending = {
+                executor.submit(hash_pieces, task, max_failures) for task in tasks
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                if any([add_result(future.result()) for future in done]):
+                    for future in pending:
+                        future.cancel()
+                    break
+
+    return VerificationResult(total, checked, sorted(failed))
@@ -29,6 +29,7 @@ setup(
         "tabulate~=0.8.7",
         "publicsuffixlist~=0.7.3",
     ],
+    python_requires=">=3.7",
     tests_require=["pytest",],
     extras_require={"liltorrent": ["Flask~=1.1.2", "waitress~=1.4.3"]},
     classifiers=[
@@ -37,7 +38,6 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",